@@ -5,9 +5,10 @@ take when exploring push policies
 from typing import Dict, List
 
 import gym
+import numpy as np
 
 from blaze.config.environment import PushGroup
-from blaze.logger import logger
+from blaze.logger import Lazy, logger
 from .action import (
     Action,
     ActionIDType,
@@ -34,15 +35,30 @@ class PushActionSpace(gym.spaces.Tuple):
     PushActionSpace defines the valid set of possible push actions and faciliates the
     selection and management of actions as the agent explores. As actions are
     used, PushActionSpace should be notified so that subsequent action selections
-    do not result in repeated or invalid Actions
+    do not result in repeated or invalid Actions.
+
+    The resources of each pushable group are kept in (group, source ID) boolean masks: `resource_mask`
+    marks the resources of each group and `push_mask` the ones that have not been used yet. A push
+    action (g, s, p) is valid if both s and p are resources of group g and s < p, so validity is checked
+    with two lookups and sampling draws from the nonzero entries of a row.
     """
 
     def __init__(self, push_groups: List[PushGroup]):
         push_groups = get_pushable_groups(push_groups)
         self.max_group_id = max(push_groups.keys())
         self.max_source_id = max(r.source_id for group in push_groups.values() for r in group.resources)
-        self.group_id_to_source_id = {i: set(r.source_id for r in g.resources) for (i, g) in push_groups.items()}
         self.group_id_to_resource_map = {i: {r.source_id: r for r in g.resources} for (i, g) in push_groups.items()}
+        # the (group ID, source ID) of each resource in a pushable group, by the resource's order
+        self.order_to_push_id = {r.order: (i, r.source_id) for (i, g) in push_groups.items() for r in g.resources}
+
+        self.resource_mask = np.zeros((self.max_group_id + 1, self.max_source_id + 1), dtype=bool)
+        for (i, g) in push_groups.items():
+            self.resource_mask[i, [r.source_id for r in g.resources]] = True
+        self.max_group_source_id = np.array(
+            [max(resources.keys()) for resources in self.group_id_to_resource_map.values()]
+        )
+        self.push_mask = self.resource_mask.copy()
+        self.group_sizes = self.push_mask.sum(axis=1)
 
         super().__init__(
             (
@@ -56,22 +72,24 @@ class PushActionSpace(gym.spaces.Tuple):
         self.np_random.seed(seed)
         super().seed(seed)
 
+    @property
+    def group_id_to_source_id(self) -> Dict[int, set]:
+        """ Returns the source IDs that have not been used yet in each group that still has actions """
+        return {g: set(np.flatnonzero(self.push_mask[g]).tolist()) for g in np.flatnonzero(self.group_sizes).tolist()}
+
     def sample(self) -> PushActionIDType:
         if self.empty():
             return NOOP_PUSH_ACTION_ID
 
         # Choose a push group
-        g = self.np_random.choice(list(self.group_id_to_source_id.keys()))
+        g = self.np_random.choice(np.flatnonzero(self.group_sizes))
 
-        # Choose a push URL
-        p = 0
-        valid_push = list(self.group_id_to_source_id[g])
-        while p == 0:
-            p = self.np_random.choice(valid_push)
+        # Choose a push URL, which needs at least one valid source before it
+        valid = np.flatnonzero(self.push_mask[g])
+        p = self.np_random.choice(valid[1:])
 
         # Choose a source URL
-        valid_sources = [r for r in self.group_id_to_source_id[g] if r < p]
-        s = self.np_random.choice(valid_sources)
+        s = self.np_random.choice(valid[valid < p])
 
         return g, s, p
 
@@ -81,10 +99,11 @@ class PushActionSpace(gym.spaces.Tuple):
 
         g, s, p = x
         return (
-            g in self.group_id_to_source_id
-            and s in self.group_id_to_resource_map[g].keys()
-            and p in self.group_id_to_resource_map[g].keys()
-            and s < p
+            0 <= g <= self.max_group_id
+            and 0 <= s < p <= self.max_source_id
+            and self.group_sizes[g] > 0
+            and self.resource_mask[g, s]
+            and self.resource_mask[g, p]
         )
 
     def decode_action_id(self, action_id: PushActionIDType) -> Action:
@@ -93,13 +112,13 @@ class PushActionSpace(gym.spaces.Tuple):
             return Action()
 
         g, s, p = action_id
-        while g not in self.group_id_to_source_id and g >= 0:
-            g -= 1
-
-        if g < 0:
+        # fall back to the closest group before g that still has actions
+        valid_groups = np.flatnonzero(self.group_sizes[: max(0, g + 1)])
+        if valid_groups.size == 0:
             return Action()
+        g = int(valid_groups[-1])
 
-        p = p % (max(self.group_id_to_resource_map[g].keys()) + 1)
+        p = p % (self.max_group_source_id[g] + 1)
         if p == 0:
             return Action()
         s = s % p
@@ -111,12 +130,30 @@ class PushActionSpace(gym.spaces.Tuple):
             push=self.group_id_to_resource_map[g][p],
         )
 
+    @property
+    def action_mask(self) -> np.ndarray:
+        """
+        Returns a boolean mask over the values of each of the (group, source, push) components, concatenated,
+        marking the values that are part of at least one valid action. If there are no valid actions, only
+        the no-op value of each component is marked
+        """
+        if self.empty():
+            return np.concatenate([np.arange(space.n) == 0 for space in self.spaces])
+
+        push_mask = self.push_mask[self.group_sizes > 0]
+        # a source is valid if a resource after it in the same group can still be pushed
+        last_source_id = self.max_source_id - np.argmax(push_mask[:, ::-1], axis=1)
+        source_mask = push_mask & (np.arange(self.max_source_id + 1) < last_source_id[:, None])
+        # a resource is valid to push if a resource before it in the same group is still valid
+        push_mask = push_mask & (np.cumsum(push_mask, axis=1) > 1)
+        return np.concatenate([self.group_sizes > 0, source_mask.any(axis=0), push_mask.any(axis=0)])
+
     def empty(self):
         """ Returns True if there are no more valid actions in the action space """
         return len(self) == 0
 
     def __len__(self):
-        return sum(map(len, self.group_id_to_source_id.values()))
+        return int(self.group_sizes.sum())
 
     def use_action(self, action: Action):
         """
@@ -128,19 +165,17 @@ class PushActionSpace(gym.spaces.Tuple):
             return
         if action.is_push:
             g, _, p = action.action_id
+        elif action.push.order in self.order_to_push_id:
+            g, p = self.order_to_push_id[action.push.order]
         else:
-            g = 0
-            _, p = action.action_id
-            for group_id, resources in self.group_id_to_resource_map.items():
-                for res in resources.values():
-                    if res.order == p:
-                        g = group_id
-                        break
+            return
 
-        if g in self.group_id_to_source_id:
-            self.group_id_to_source_id[g] -= {p}
-            if len(self.group_id_to_source_id[g]) == 1:
-                del self.group_id_to_source_id[g]
+        if self.push_mask[g, p]:
+            self.push_mask[g, p] = False
+            self.group_sizes[g] -= 1
+            if self.group_sizes[g] == 1:
+                self.push_mask[g] = False
+                self.group_sizes[g] = 0
 
 
 class PreloadActionSpace(gym.spaces.Tuple):
@@ -148,14 +183,19 @@ class PreloadActionSpace(gym.spaces.Tuple):
     PreloadActionSpace defines the valid set of possible preload actions and faciliates the
     selection and management of actions as the agent explores. As actions are
     used, PreloadctionSpace should be notified so that subsequent action selections
-    do not result in repeated or invalid Actions
+    do not result in repeated or invalid Actions.
+
+    The resources are kept in boolean masks by order: `source_mask` marks the orders of all resources and
+    `preload_mask` the ones that can still be preloaded.
     """
 
     def __init__(self, push_groups: List[PushGroup]):
         self.order_to_resource_map = {r.order: r for group in push_groups for r in group.resources}
-        self.preload_list = sorted([r.order for group in push_groups for r in group.resources if r.order != 0])
-        self.source_list = sorted([r.order for group in push_groups for r in group.resources])
-        self.max_order = self.source_list[-1]
+        self.max_order = max(self.order_to_resource_map.keys())
+        self.source_mask = np.zeros(self.max_order + 1, dtype=bool)
+        self.source_mask[list(self.order_to_resource_map.keys())] = True
+        self.preload_mask = self.source_mask.copy()
+        self.preload_mask[0] = False
 
         super().__init__((gym.spaces.Discrete(self.max_order + 1), gym.spaces.Discrete(self.max_order + 1)))
 
@@ -163,16 +203,25 @@ class PreloadActionSpace(gym.spaces.Tuple):
         self.np_random.seed(seed)
         super().seed(seed)
 
+    @property
+    def preload_list(self) -> List[int]:
+        """ Returns the orders of the resources that can still be preloaded """
+        return np.flatnonzero(self.preload_mask).tolist()
+
+    @property
+    def source_list(self) -> List[int]:
+        """ Returns the orders of all resources """
+        return np.flatnonzero(self.source_mask).tolist()
+
     def sample(self) -> PreloadActionIDType:
         if self.empty():
             return NOOP_PRELOAD_ACTION_ID
 
         # choose a preload URL
-        preload = self.np_random.choice(self.preload_list)
+        preload = self.np_random.choice(np.flatnonzero(self.preload_mask))
 
         # choose a source URL
-        valid_sources = [r for r in self.source_list if r < preload]
-        source = self.np_random.choice(valid_sources)
+        source = self.np_random.choice(np.flatnonzero(self.source_mask[:preload]))
         return source, preload
 
     def contains(self, x: PreloadActionIDType):
@@ -199,21 +248,35 @@ class PreloadActionSpace(gym.spaces.Tuple):
             push=self.order_to_resource_map[preload],
         )
 
+    @property
+    def action_mask(self) -> np.ndarray:
+        """
+        Returns a boolean mask over the values of the (source, preload) components, concatenated, marking
+        the values that are part of at least one valid action. If there are no valid actions, only the
+        no-op value of each component is marked
+        """
+        if self.empty():
+            return np.concatenate([np.arange(space.n) == 0 for space in self.spaces])
+
+        last_preload = self.max_order - np.argmax(self.preload_mask[::-1])
+        source_mask = self.source_mask & (np.arange(self.max_order + 1) < last_preload)
+        return np.concatenate([source_mask, self.preload_mask])
+
     def use_action(self, action: Action):
         """
         Marks the given action as used. It removes the pushed resource from the list
         of pushable resources, effectively removing a subset of the actions to prevent
         pushing the same resource twice. If the action was a noop, it doesn't do anything
         """
-        if not action.is_noop:
-            self.preload_list = [r for r in self.preload_list if r != action.push.order]
+        if not action.is_noop and action.push.order <= self.max_order:
+            self.preload_mask[action.push.order] = False
 
     def empty(self):
         """ Returns true if there are no more valid actions in the action space """
-        return not self.preload_list
+        return not self.preload_mask.any()
 
     def __len__(self):
-        return len(self.preload_list)
+        return int(self.preload_mask.sum())
 
 
 class ActionSpace(gym.spaces.Tuple):
@@ -270,6 +333,21 @@ class ActionSpace(gym.spaces.Tuple):
         # The case where preload is disabled and action_type is 2 will never happen
         return NOOP_ACTION_ID
 
+    @property
+    def action_mask(self) -> np.ndarray:
+        """
+        Returns a boolean mask over the values of each component of the action space, concatenated in the
+        order of the components, that marks the values that are part of at least one valid action. Masked
+        policies can use it to avoid choosing pushes and preloads that were already used
+        """
+        push_valid = not self.disable_push and not self.push_space.empty()
+        preload_valid = not self.disable_preload and not self.preload_space.empty()
+        action_type_mask = [True] + [
+            push_valid if (action_type // 5) + 1 == 1 and not self.disable_push else preload_valid
+            for action_type in range(1, self.num_action_types)
+        ]
+        return np.concatenate([action_type_mask, self.push_space.action_mask, self.preload_space.action_mask])
+
     def decode_action(self, action: ActionIDType) -> Action:
         """ Decodes the given action ID into an Action object """
         # Temporary for compatibility:
@@ -287,16 +365,16 @@ class ActionSpace(gym.spaces.Tuple):
                 return self.push_space.decode_action_id(push_id)
             return self.preload_space.decode_action_id(preload_id)
         except KeyError:
-            logger.with_namespace("action_space").warn("picked out of bounds action", action=action)
+            logger.namespaced("action_space").warn("picked out of bounds action", action=action)
             return Action()
 
     def use_action(self, action: Action):
         """ Marks the action as used in both the push and preload spaces """
         self.push_space.use_action(action)
         self.preload_space.use_action(action)
-        logger.with_namespace("action_space").info(
+        logger.namespaced("action_space").info(
             "used_action",
-            action=repr(action),
+            action=Lazy(lambda: repr(action)),
             new_push_size=len(self.push_space),
             new_preload_size=len(self.preload_space),
         )
@@ -3,10 +3,16 @@ import json
 import sys
 
 from blaze.action import Policy
-from blaze.config.client import get_client_environment_from_parameters, get_default_client_environment
+from blaze.config import manifest
+from blaze.config.client import (
+    get_client_environment_from_parameters,
+    get_client_environment_grid,
+    get_default_client_environment,
+)
 from blaze.config.config import get_config
-from blaze.config.environment import EnvironmentConfig
 from blaze.evaluator.simulator import Simulator
+from blaze.evaluator.simulator.stats import SimulationStats
+from blaze.evaluator.simulator.vector_simulator import VectorSimulator
 from blaze.logger import logger as log
 from blaze.preprocess.record import get_page_load_time_in_replay_server, get_speed_index_in_replay_server
 
@@ -71,7 +77,7 @@ def page_load_time(args):
             policy_dict = json.load(policy_file)
         policy = Policy.from_dict(policy_dict)
 
-    env_config = EnvironmentConfig.load_file(args.from_manifest)
+    env_config = manifest.load_file(args.from_manifest)
     config = get_config(env_config)
 
     log.info("calculating page load time", manifest=args.from_manifest, url=env_config.request_url)
@@ -130,3 +136,112 @@ def page_load_time(args):
             indent=4,
         )
     )
+
+
+@command.argument(
+    "--from_manifest", help="The training manifest files to profile the simulator with", nargs="+", required=True
+)
+@command.argument("--policy", help="The file path to a JSON-formatted push/preload policy to simulate")
+@command.argument("--latency", help="The round trip latency to use (ms)", type=int, default=None)
+@command.argument("--bandwidth", help="The link bandwidth to use (kbps)", type=int, default=None)
+@command.argument("--cpu_slowdown", help="The CPU slowdown factor to use (1, 2, or 4)", type=int, default=None)
+@command.argument("--iterations", help="The number of times to simulate each manifest", type=int, default=1)
+@command.command
+def profile_simulator(args):
+    """
+    Simulates the page load of each given manifest and prints a breakdown of the work done by the
+    simulator and the time spent in each phase, with the most expensive manifests first
+    """
+    if args.iterations < 1:
+        log.critical("provided iterations must be at least 1")
+        sys.exit(1)
+
+    default_client_env = get_default_client_environment()
+    client_env = get_client_environment_from_parameters(
+        args.bandwidth or default_client_env.bandwidth,
+        args.latency or default_client_env.latency,
+        args.cpu_slowdown or default_client_env.cpu_slowdown,
+    )
+
+    policy = None
+    if args.policy:
+        log.debug("reading policy", push_policy=args.policy)
+        with open(args.policy, "r") as policy_file:
+            policy = Policy.from_dict(json.load(policy_file))
+
+    results = []
+    for manifest_file in args.from_manifest:
+        log.info("profiling simulator", manifest=manifest_file)
+        env_config = manifest.load_file(manifest_file)
+        sim = Simulator(env_config)
+        stats = SimulationStats()
+        plt = 0
+        for _ in range(args.iterations):
+            plt = sim.simulate_load_time(client_env, policy)
+            stats.merge(sim.stats)
+        results.append(
+            {
+                "manifest": manifest_file,
+                "url": env_config.request_url,
+                "num_resources": len(sim.graph),
+                "plt": plt,
+                "stats": stats.as_dict(),
+            }
+        )
+
+    results.sort(key=lambda result: result["stats"]["total_ms"], reverse=True)
+    print(json.dumps({"client_env": client_env._asdict(), "iterations": args.iterations, "results": results}, indent=4))
+
+
+@command.argument("--from_manifest", help="The training manifest file to simulate", required=True)
+@command.argument("--policy", help="The file path to a JSON-formatted push/preload policy to simulate")
+@command.argument("--bandwidths", help="The link bandwidths to simulate (kbps)", type=int, nargs="+")
+@command.argument("--latencies", help="The round trip latencies to simulate (ms)", type=int, nargs="+")
+@command.argument("--cpu_slowdowns", help="The CPU slowdown factors to simulate (1, 2, or 4)", type=int, nargs="+")
+@command.argument(
+    "--resolution",
+    help="The number of bandwidths and latencies to split each network range into, when they are not given",
+    type=int,
+    default=4,
+)
+@command.argument("--speed_index", help="Simulate the above-the-fold time instead of the PLT", action="store_true")
+@command.command
+def simulate_grid(args):
+    """
+    Simulates the page load time of a manifest for every combination of the given bandwidths, latencies,
+    and CPU slowdowns in a single vectorized pass, and prints the grid of page load times indexed by
+    (bandwidth, latency, CPU slowdown). By default, the grid covers the network ranges that client
+    environments are sampled from
+    """
+    if args.resolution < 1:
+        log.critical("provided resolution must be at least 1")
+        sys.exit(1)
+
+    client_envs = get_client_environment_grid(args.resolution)
+    bandwidths = args.bandwidths or sorted(set(client_env.bandwidth for client_env in client_envs))
+    latencies = args.latencies or sorted(set(client_env.latency for client_env in client_envs))
+    cpu_slowdowns = args.cpu_slowdowns or sorted(set(client_env.cpu_slowdown for client_env in client_envs))
+
+    policy = None
+    if args.policy:
+        log.debug("reading policy", push_policy=args.policy)
+        with open(args.policy, "r") as policy_file:
+            policy = Policy.from_dict(json.load(policy_file))
+
+    env_config = manifest.load_file(args.from_manifest)
+    log.info("simulating grid", url=env_config.request_url, size=len(bandwidths) * len(latencies) * len(cpu_slowdowns))
+    sim = VectorSimulator(env_config)
+    plt = sim.simulate_grid(bandwidths, latencies, cpu_slowdowns, policy=policy, use_aft=args.speed_index)
+    print(
+        json.dumps(
+            {
+                "url": env_config.request_url,
+                "metric": "speed_index" if args.speed_index else "plt",
+                "bandwidths": bandwidths,
+                "latencies": latencies,
+                "cpu_slowdowns": cpu_slowdowns,
+                "plt": plt.tolist(),
+            },
+            indent=4,
+        )
+    )
@@ -3,9 +3,9 @@ import json
 
 import grpc
 
+from blaze.config import manifest
 from blaze.config.client import get_client_environment_from_parameters
 from blaze.config.config import get_config
-from blaze.config.environment import EnvironmentConfig
 from blaze.evaluator.analyzer import get_num_rewards
 from blaze.evaluator.simulator import Simulator
 from blaze.logger import logger as log
@@ -38,9 +38,9 @@ def query(args):
     channel = grpc.insecure_channel(f"{args.host}:{args.port}")
     client = Client(channel)
 
-    manifest = EnvironmentConfig.load_file(args.manifest)
+    env_config = manifest.load_file(args.manifest)
     client_env = get_client_environment_from_parameters(args.bandwidth, args.latency, args.cpu_slowdown)
-    policy = client.get_policy(url=manifest.request_url, client_env=client_env, manifest=manifest)
+    policy = client.get_policy(url=env_config.request_url, client_env=client_env, manifest=env_config)
 
     print(json.dumps(policy.as_dict, indent=4))
 
@@ -86,17 +86,17 @@ def evaluate(args):
     """
     log.info("evaluating model...", model=args.model, location=args.location, manifest=args.manifest)
     client_env = get_client_environment_from_parameters(args.bandwidth, args.latency, args.cpu_slowdown)
-    manifest = EnvironmentConfig.load_file(args.manifest)
+    env_config = manifest.load_file(args.manifest)
 
     cached_urls = set(
         res.url
-        for group in manifest.push_groups
+        for group in env_config.push_groups
         for res in group.resources
         if args.cache_time is not None and res.cache_time > args.cache_time
     )
 
     log.debug("using cached resources", cached_urls=cached_urls)
-    config = get_config(manifest, client_env, args.reward_func).with_mutations(
+    config = get_config(env_config, client_env, args.reward_func).with_mutations(
         cached_urls=cached_urls, use_aft=args.use_aft
     )
 
@@ -125,7 +125,7 @@ def evaluate(args):
         }
 
     if args.run_simulator:
-        sim = Simulator(manifest)
+        sim = Simulator(env_config)
         sim_plt = sim.simulate_load_time(client_env)
         push_plt = sim.simulate_load_time(client_env, policy)
         data["simulator"] = {"without_policy": sim_plt, "with_policy": push_plt}
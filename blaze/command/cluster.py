@@ -3,7 +3,7 @@
 import glob
 import json
 
-from blaze.config.environment import EnvironmentConfig
+from blaze.config import manifest
 from blaze.evaluator.cluster import AgglomerativeCluster
 from blaze.evaluator.cluster.distance import create_apted_distance_function
 from blaze.logger import logger
@@ -21,7 +21,7 @@ def cluster(args):
 
     def read_file(fpath):
         log.debug("reading file...", file=fpath)
-        return EnvironmentConfig.load_file(fpath)
+        return manifest.load_file(fpath)
 
     files = list(map(read_file, glob.iglob(f"{args.folder}/*")))
     distance_func = create_apted_distance_function(args.apted_port)
@@ -1,7 +1,7 @@
 """ Implements the commands for viewing and manipulating the training manifest """
 import os
 
-from blaze.config.environment import EnvironmentConfig
+from blaze.config import manifest
 from blaze.evaluator.simulator import Simulator
 from blaze.logger import logger as log
 from blaze.preprocess.url import Url
@@ -16,7 +16,7 @@ from . import command
 def view_manifest(args):
     """ View the prepared manifest from `blaze preprocess` """
     log.info("loading manifest", manifest_file=args.manifest_file)
-    env_config = EnvironmentConfig.load_file(args.manifest_file)
+    env_config = manifest.load_file(args.manifest_file)
 
     print("[[ Request URL ]]\n{}\n".format(env_config.request_url))
     print("[[ Replay Dir ]]\n{}\n".format(env_config.replay_dir))
@@ -72,7 +72,7 @@ def update_manifest(args):
         replay_dir_folder_name=args.replay_dir_folder_name,
         save_as=save_as,
     )
-    env_config = EnvironmentConfig.load_file(args.manifest_file)
+    env_config = manifest.load_file(args.manifest_file)
 
     new_replay_dir = env_config.replay_dir
     if args.replay_dir_path_prefix:
@@ -82,4 +82,22 @@ def update_manifest(args):
         new_replay_dir = os.path.join(os.path.dirname(new_replay_dir), args.replay_dir_folder_name)
 
     new_env_config = env_config._replace(replay_dir=new_replay_dir)
-    new_env_config.save_file(save_as)
+    manifest.dump(new_env_config, save_as)
+
+
+@command.argument("manifest_file", help="The manifest file to convert")
+@command.argument(
+    "--save_as",
+    help="Save the converted manifest in the specified location. This option does not modify the original manifest",
+)
+@command.command
+def convert_manifest(args):
+    """
+    Convert a manifest file saved by an earlier version of blaze to the binary manifest format, which can be
+    memory-mapped and sent to the policy server. This will replace the manifest file, unless --save_as is
+    specified, in which case the original one is left unmodified.
+    """
+    save_as = args.save_as or args.manifest_file
+    log.info("Converting manifest", manifest_file=args.manifest_file, save_as=save_as)
+    env_config = manifest.convert(args.manifest_file, save_as)
+    log.info("Converted manifest", resources=len(env_config.har_resources), groups=len(env_config.push_groups))
@@ -2,6 +2,7 @@
 from typing import List
 
 from blaze.chrome.devtools import capture_har_in_replay_server
+from blaze.config import manifest
 from blaze.config.client import get_default_client_environment
 from blaze.config.config import get_config
 from blaze.config.environment import EnvironmentConfig, PushGroup
@@ -84,7 +85,7 @@ def preprocess(args):
     env_config = EnvironmentConfig(
         replay_dir=args.record_dir, request_url=args.website, push_groups=push_groups, har_resources=har_resources
     )
-    env_config.save_file(args.output)
+    manifest.dump(env_config, args.output)
     log.info("successfully prepared website for training", output=args.output)
 
 
@@ -8,6 +8,7 @@ import traceback
 from typing import Callable, List, Optional, Set, Tuple
 
 from blaze.action import Policy
+from blaze.config import manifest as manifest_format
 from blaze.config.client import (
     get_client_environment_from_parameters,
     get_default_client_environment,
@@ -33,7 +34,7 @@ def random_push_policy(args):
     Outputs a random push policy for the given recorded website
     """
     log.info("generating a random policy", policy_type=args.policy_type)
-    env_config = EnvironmentConfig.load_file(args.from_manifest)
+    env_config = manifest_format.load_file(args.from_manifest)
 
     weight = 0 if args.policy_type == "preload" else 1 if args.policy_type == "push" else None
     policy = _random_push_preload_policy_generator(weight)(env_config)
@@ -78,7 +79,7 @@ def test_push(args):
         weight = 0 if args.policy_type == "preload" else 1 if args.policy_type == "push" else None
         cached_urls = set()
         if args.user_data_dir:
-            filestore = FileStore(EnvironmentConfig.load_file(args.from_manifest).replay_dir)
+            filestore = FileStore(manifest_format.load_file(args.from_manifest).replay_dir)
             for f in filestore.cacheable_files:
                 cached_urls.add(f"http://{f.host}{f.uri}")
                 cached_urls.add(f"https://{f.host}{f.uri}")
@@ -204,7 +205,7 @@ def _test_push(
     cache_time: Optional[int],
     user_data_dir: Optional[str],
 ):
-    env_config = EnvironmentConfig.load_file(manifest)
+    env_config = manifest_format.load_file(manifest)
     default_client_env = get_default_client_environment()
     client_env = get_client_environment_from_parameters(
         bandwidth or default_client_env.bandwidth,
@@ -234,10 +235,11 @@ def _test_push(
         policies = [policy_generator(env_config) for _ in range(iterations)]
 
     sim = Simulator(env_config)
+    results = sim.simulate_batch([None, *policies], [client_env])
     data["simulator"] = {
-        "without_policy": sim.simulate_load_time(client_env),
+        "without_policy": float(results.plt_ms[0, 0, 0]),
         "with_policy": [
-            {"plt": sim.simulate_load_time(client_env, policy), "policy": policy.as_dict} for policy in policies
+            {"plt": float(results.plt_ms[i + 1, 0, 0]), "policy": policy.as_dict} for (i, policy) in enumerate(policies)
         ],
     }
 
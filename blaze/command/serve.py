@@ -1,7 +1,10 @@
 """ Implements the command for serving a trained policy """
+import json
 import time
 import os
 
+from blaze.config import manifest
+from blaze.config.client import get_client_environment_grid
 from blaze.config.config import get_config
 from blaze.config.serve import ServeConfig
 from blaze.evaluator.analyzer import get_num_rewards
@@ -10,6 +13,23 @@ from blaze.logger import logger as log
 from . import command
 
 
+def load_model(model_name: str, location: str):
+    """ Returns the SavedModel of the given RL technique at the given location """
+    # check that the passed model location exists
+    if not os.path.exists(location) or not os.path.isfile(location):
+        raise IOError("The model location must be a valid file")
+
+    # lazy load import statements
+    if model_name == "A3C":
+        from blaze.model import a3c as model
+    if model_name == "APEX":
+        from blaze.model import apex as model
+    if model_name == "PPO":
+        from blaze.model import ppo as model
+
+    return model.get_model(location)
+
+
 @command.argument("location", help="The path to the saved model")
 @command.argument(
     "--model",
@@ -19,8 +39,48 @@ from . import command
 )
 @command.argument("--host", help="The host to bind the gRPC server to", default="0.0.0.0")
 @command.argument("--port", help="The port to bind the gRPC server to", default=24450, type=int)
-@command.argument("--max_workers", help="The maximum number of RPC workers", default=4, type=int)
+@command.argument(
+    "--max_workers", help="The maximum number of RPC workers, and of agents kept loaded", default=4, type=int
+)
+@command.argument(
+    "--batch_window_ms",
+    help="Batch the inference of concurrent requests, waiting this long for requests to join a batch",
+    type=float,
+)
+@command.argument("--max_batch_size", help="The maximum number of requests in a batch", default=64, type=int)
+@command.argument(
+    "--policy_table",
+    help="Answer requests from the policies precomputed by `blaze precompute_policies` in this file when possible",
+)
+@command.argument(
+    "--policy_ttl", help="The number of seconds to serve a computed policy from the cache", default=3600, type=float
+)
+@command.argument(
+    "--manifest_dir",
+    help="Store the manifests registered by clients in this directory, so that they are kept across restarts",
+)
+@command.argument(
+    "--preload_manifest",
+    help="Create all the agents at startup, for the page in this manifest, instead of on the first requests",
+)
+@command.argument(
+    "--sync_server",
+    help="Use the synchronous gRPC server, which answers each request on its own worker thread, "
+    "instead of the asyncio server",
+    action="store_true",
+)
 @command.argument("--reward_func", help="Reward function to use", default=1, choices=list(range(get_num_rewards())))
+@command.argument(
+    "--flat_observation",
+    help="Observe the resources as a single array instead of a dictionary with one entry per resource. "
+    "Must match the option the model was trained with",
+    action="store_true",
+)
+@command.argument(
+    "--action_mask",
+    help="Observe the valid values of each action component. Must match the option the model was trained with",
+    action="store_true",
+)
 @command.command
 def serve(args):
     """
@@ -34,32 +94,49 @@ def serve(args):
         host=args.host,
         port=args.port,
         max_workers=args.max_workers,
+        batch_window_ms=args.batch_window_ms,
+        policy_table=args.policy_table,
+        policy_ttl=args.policy_ttl,
+        manifest_dir=args.manifest_dir,
+        preload_manifest=args.preload_manifest,
+        sync_server=args.sync_server,
         reward_func=args.reward_func,
+        flat_observation=args.flat_observation,
+        action_mask=args.action_mask,
     )
 
-    # check that the passed model location exists
-    if not os.path.exists(args.location) or not os.path.isfile(args.location):
-        raise IOError("The model location must be a valid file")
-
     # lazy load import statements
-    from blaze.serve.server import Server
+    from blaze.serve.server import AsyncServer, Server
+    from blaze.serve.manifest_registry import ManifestRegistry
     from blaze.serve.policy_service import PolicyService
+    from blaze.serve.policy_table import PolicyTable
 
-    if args.model == "A3C":
-        from blaze.model import a3c as model
-    if args.model == "APEX":
-        from blaze.model import apex as model
-    if args.model == "PPO":
-        from blaze.model import ppo as model
+    saved_model = load_model(args.model, args.location)
 
     import ray
 
     ray.init()
 
     serve_config = ServeConfig(host=args.host, port=args.port, max_workers=args.max_workers)
-    saved_model = model.get_model(args.location)
-    server = Server(serve_config)
-    server.set_policy_service(PolicyService(saved_model, config=get_config(reward_func=args.reward_func)))
+    server = Server(serve_config) if args.sync_server else AsyncServer(serve_config)
+    policy_service = PolicyService(
+        saved_model,
+        config=get_config(
+            reward_func=args.reward_func, flat_observation=args.flat_observation, action_mask=args.action_mask
+        ),
+        num_agents=serve_config.max_workers,
+        batch_window_ms=args.batch_window_ms,
+        max_batch_size=args.max_batch_size,
+        policy_table=PolicyTable(args.policy_table) if args.policy_table else None,
+        policy_ttl_s=args.policy_ttl,
+        manifest_registry=ManifestRegistry(args.manifest_dir),
+    )
+    if args.preload_manifest:
+        # agents can compute policies for any page, so the page they are created for does not matter
+        log.info("creating agents...", num_agents=policy_service.agent_pool.size)
+        env_config = manifest.load_file(args.preload_manifest)
+        policy_service.agent_pool.fill(policy_service.config.with_mutations(env_config=env_config, cached_urls=set()))
+    server.set_policy_service(policy_service)
     server.start()
     log.info("started server successfully")
 
@@ -67,6 +144,84 @@ def serve(args):
         while True:
             time.sleep(86400)
     except KeyboardInterrupt:
-        log.info("stopping server")
+        log.info("stopping server", **policy_service.stats)
         server.stop()
         ray.shutdown()
+
+
+@command.argument("location", help="The path to the saved model")
+@command.argument(
+    "--model",
+    help="The RL technique used during training for the saved model",
+    required=True,
+    choices=["A3C", "APEX", "PPO"],
+)
+@command.argument("--manifests", help="The manifest files to precompute policies for", nargs="+", required=True)
+@command.argument("--output", help="The policy table file to store the policies in", required=True)
+@command.argument(
+    "--resolution",
+    help="The number of buckets to split the bandwidth and latency range of each network type into",
+    default=1,
+    type=int,
+)
+@command.argument("--reward_func", help="Reward function to use", default=1, choices=list(range(get_num_rewards())))
+@command.argument(
+    "--flat_observation",
+    help="Observe the resources as a single array instead of a dictionary with one entry per resource. "
+    "Must match the option the model was trained with",
+    action="store_true",
+)
+@command.argument(
+    "--action_mask",
+    help="Observe the valid values of each action component. Must match the option the model was trained with",
+    action="store_true",
+)
+@command.command
+def precompute_policies(args):
+    """
+    Precomputes the policies of a trained model for a grid of client environments for each of the given
+    manifests, and stores them in a policy table that `blaze serve --policy_table` answers requests from.
+    Existing policies in the table are replaced.
+    """
+    client_envs = get_client_environment_grid(args.resolution)
+    log.info(
+        "precomputing policies...",
+        model=args.model,
+        location=args.location,
+        manifests=len(args.manifests),
+        buckets=len(client_envs),
+        output=args.output,
+    )
+
+    # lazy load import statements
+    from blaze.model.model import AgentPool
+    from blaze.serve.batcher import InferenceBatcher
+    from blaze.serve.manifest_cache import get_manifest_digest
+    from blaze.serve.policy_table import PolicyTable
+
+    saved_model = load_model(args.model, args.location)
+
+    import ray
+
+    ray.init()
+
+    table = PolicyTable(args.output)
+    batcher = InferenceBatcher(AgentPool(saved_model), window_ms=0)
+    config = get_config(
+        reward_func=args.reward_func, flat_observation=args.flat_observation, action_mask=args.action_mask
+    )
+    for manifest_file in args.manifests:
+        env_config = manifest.load_file(manifest_file)
+        # the table is indexed by the digest of the manifest bytes that clients send
+        digest = get_manifest_digest(manifest.dumps(env_config))
+        futures = [
+            batcher.submit(config.with_mutations(env_config=env_config, client_env=client_env, cached_urls=set()))
+            for client_env in client_envs
+        ]
+        for (client_env, future) in zip(client_envs, futures):
+            table.put(digest, client_env, json.dumps(future.result().as_dict))
+        log.info("precomputed policies", manifest=manifest_file, digest=digest, url=env_config.request_url)
+
+    batcher.close()
+    table.close()
+    ray.shutdown()
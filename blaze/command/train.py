@@ -3,8 +3,8 @@ import multiprocessing
 import sys
 
 from blaze.evaluator.analyzer import get_num_rewards
+from blaze.config import manifest
 from blaze.config.config import get_config
-from blaze.config.environment import EnvironmentConfig
 from blaze.config.train import TrainConfig
 from blaze.logger import logger as log
 
@@ -18,6 +18,12 @@ from . import command
 @command.argument(
     "--workers", help="Number of workers to use for training", default=multiprocessing.cpu_count() - 1, type=int
 )
+@command.argument(
+    "--envs_per_worker",
+    help="Number of training episodes that each worker steps at once in a vectorized environment",
+    default=1,
+    type=int,
+)
 @command.argument("--timesteps", help="Maximum number of timesteps to train for", default=500000000, type=int)
 @command.argument(
     "--manifest_file",
@@ -28,6 +34,16 @@ from . import command
     "--reward_func", help="Reward function to use", default=1, choices=list(range(get_num_rewards())), type=int
 )
 @command.argument("--use_aft", help="Use AFT at the reward metric", action="store_true")
+@command.argument(
+    "--flat_observation",
+    help="Observe the resources as a single array instead of a dictionary with one entry per resource",
+    action="store_true",
+)
+@command.argument(
+    "--action_mask",
+    help="Observe the valid values of each action component, and train a model that only chooses valid values",
+    action="store_true",
+)
 @command.argument("--resume", help="Resume training from last checkpoint", default=False, action="store_true")
 @command.argument(
     "--no-resume",
@@ -58,7 +74,18 @@ def train(args):
 
     # compute resume flag and initialize training
     resume = False if args.no_resume else True if args.resume else "prompt"
-    train_config = TrainConfig(experiment_name=args.name, num_workers=args.workers, resume=resume)
-    env_config = EnvironmentConfig.load_file(args.manifest_file)
-    config = get_config(env_config, reward_func=args.reward_func, use_aft=args.use_aft)
+    train_config = TrainConfig(
+        experiment_name=args.name,
+        num_workers=args.workers,
+        resume=resume,
+        num_envs_per_worker=args.envs_per_worker,
+    )
+    env_config = manifest.load_file(args.manifest_file)
+    config = get_config(
+        env_config,
+        reward_func=args.reward_func,
+        use_aft=args.use_aft,
+        flat_observation=args.flat_observation,
+        action_mask=args.action_mask,
+    )
     model.train(train_config, config)
@@ -2,7 +2,7 @@
 
 import enum
 import random
-from typing import NamedTuple, Tuple
+from typing import List, NamedTuple, Tuple
 
 
 class NetworkType(enum.IntEnum):
@@ -132,15 +132,24 @@ def get_default_client_environment():
 
 def get_client_environment_from_parameters(bandwidth: int, latency: int, cpu_slowdown: int):
     """
-    Returns a fully configured client environment for valid values of bandwidth, latency, and CPU slowdown
+    Returns a fully configured client environment for valid values of bandwidth, latency, and CPU slowdown,
+    or raises a ValueError if no network has the bandwidth or no device has the CPU slowdown
     """
-    network_type, network_speed = next(
-        (nt, ns)
-        for nt in NetworkType
-        for ns in NetworkSpeed
-        if network_to_bandwidth_range(nt, ns)[0] <= bandwidth <= network_to_bandwidth_range(nt, ns)[1]
+    network = next(
+        (
+            (nt, ns)
+            for nt in NetworkType
+            for ns in NetworkSpeed
+            if network_to_bandwidth_range(nt, ns)[0] <= bandwidth <= network_to_bandwidth_range(nt, ns)[1]
+        ),
+        None,
     )
-    device_speed = next(ds for ds in DeviceSpeed if device_speed_to_cpu_slowdown(ds) == cpu_slowdown)
+    if network is None:
+        raise ValueError(f"no network has a bandwidth of {bandwidth} kbps")
+    device_speed = next((ds for ds in DeviceSpeed if device_speed_to_cpu_slowdown(ds) == cpu_slowdown), None)
+    if device_speed is None:
+        raise ValueError(f"no device has a CPU slowdown of {cpu_slowdown}")
+    (network_type, network_speed) = network
     return ClientEnvironment(
         network_type=network_type,
         network_speed=network_speed,
@@ -149,3 +158,31 @@ def get_client_environment_from_parameters(bandwidth: int, latency: int, cpu_slo
         latency=latency,
         cpu_slowdown=cpu_slowdown,
     )
+
+
+def get_client_environment_grid(resolution: int = 1) -> List[ClientEnvironment]:
+    """
+    Returns client environments covering every combination of network type, network speed, and device
+    speed, with the bandwidth and latency ranges of each split into `resolution` equal parts whose
+    centres are combined
+    """
+    assert resolution > 0
+    grid = {}
+    for network_type in NetworkType:
+        for network_speed in NetworkSpeed:
+            for device_speed in DeviceSpeed:
+                (bw_low, bw_high) = network_to_bandwidth_range(network_type, network_speed)
+                (lat_low, lat_high) = network_to_latency_range(network_type)
+                for i in range(resolution):
+                    for j in range(resolution):
+                        client_env = ClientEnvironment(
+                            network_type=network_type,
+                            network_speed=network_speed,
+                            device_speed=device_speed,
+                            bandwidth=bw_low + (bw_high - bw_low) * (2 * i + 1) // (2 * resolution),
+                            latency=lat_low + (lat_high - lat_low) * (2 * j + 1) // (2 * resolution),
+                            cpu_slowdown=device_speed_to_cpu_slowdown(device_speed),
+                        )
+                        # environments with the same parameters are only included once
+                        grid.setdefault((client_env.bandwidth, client_env.latency, client_env.cpu_slowdown), client_env)
+    return list(grid.values())
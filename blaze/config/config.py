@@ -29,6 +29,12 @@ class Config(NamedTuple):
     reward_func: Optional[int] = None
     use_aft: Optional[bool] = None
     cached_urls: Optional[Set[str]] = None
+    # encode the resources in observations as a single array instead of a dictionary
+    flat_observation: Optional[bool] = None
+    # include a mask of the valid values of each action component in observations, for masked policies
+    action_mask: Optional[bool] = None
+    # the path of a SharedPLTStore that the simulated page load times are shared through between processes
+    plt_store: Optional[str] = None
 
     def items(self):
         """ Return the dictionary items() method for this object """
@@ -44,6 +50,9 @@ class Config(NamedTuple):
             reward_func=kwargs.get("reward_func", self.reward_func),
             use_aft=kwargs.get("use_aft", self.use_aft),
             cached_urls=kwargs.get("cached_urls", self.cached_urls),
+            flat_observation=kwargs.get("flat_observation", self.flat_observation),
+            action_mask=kwargs.get("action_mask", self.action_mask),
+            plt_store=kwargs.get("plt_store", self.plt_store),
         )
 
 
@@ -52,6 +61,8 @@ def get_config(
     client_env: Optional[ClientEnvironment] = None,
     reward_func: Optional[int] = None,
     use_aft: Optional[bool] = None,
+    flat_observation: Optional[bool] = None,
+    action_mask: Optional[bool] = None,
 ) -> Config:
     """
     get_config returns the runtime configuration, taking values from environment variables
@@ -64,4 +75,6 @@ def get_config(
         client_env=client_env,
         reward_func=reward_func,
         use_aft=use_aft,
+        flat_observation=flat_observation,
+        action_mask=action_mask,
     )
@@ -1,7 +1,6 @@
 """ Describes types used to configure the training environment """
 
 import enum
-import pickle
 from typing import List, NamedTuple
 
 
@@ -67,21 +66,3 @@ class EnvironmentConfig(NamedTuple):
     def trainable_push_groups(self):
         """ Returns the subset of push_groups that is trainable """
         return [group for group in self.push_groups if group.trainable]
-
-    def serialize(self) -> bytes:
-        """ Returns a pickled representation of the training manifest """
-        return pickle.dumps(self)
-
-    def save_file(self, file_name: str):
-        """ Serialize the EnvironmentConfig to the given file path """
-        pickle.dump(self, open(file_name, "wb"))
-
-    @staticmethod
-    def load_file(file_name: str) -> "EnvironmentConfig":
-        """ Load an EnvironmentConfig from the given file path """
-        return pickle.load(open(file_name, "rb"))
-
-    @staticmethod
-    def deserialize(data: bytes) -> "EnvironmentConfig":
-        """ Loads pickled byte data into an EnvironmentConfig """
-        return pickle.loads(data)
@@ -0,0 +1,375 @@
+"""
+This module defines a compact, versioned binary format for training manifests (EnvironmentConfigs),
+which can be memory-mapped and read lazily, and does not need to be unpickled.
+
+A manifest file is laid out as follows (all integers are little-endian):
+
+    magic (4 bytes, b"BLZM") | version (uint32) | header length (uint64) | header | sections
+
+The header is UTF-8 JSON with the request URL, the replay directory, the id, name and trainable flag
+of each push group, and the offset, dtype and length of each section. Each section is an array aligned
+to 8 bytes, relative to the end of the header:
+
+  - strings, string_offsets: the UTF-8 bytes of every distinct URL, and the offset at which each one
+    starts (with a final offset marking the end), so each URL is stored once
+  - record.<field>: one column per Resource field other than group_id and source_id, for each distinct
+    resource; the url column holds indices into the string table
+  - har.<field>, group.<field>: the record index, group_id and source_id of the resources in the HAR and
+    of the resources of the push groups in group order, which are usually the same records with a
+    different group_id and source_id
+  - group_offsets: group i has the group resources group_offsets[i] to group_offsets[i + 1]
+
+load_file and deserialize read an EnvironmentConfig from a file or bytes in either this format or a pickle
+saved by an earlier version of blaze.
+"""
+
+import json
+import mmap
+import pickle
+import struct
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .environment import EnvironmentConfig, PushGroup, Resource, ResourceType
+
+MAGIC = b"BLZM"
+VERSION = 1
+PREAMBLE = struct.Struct("<4sIQ")
+ALIGNMENT = 8
+
+# the column dtype of each field of a distinct resource record, in the order of the Resource fields
+RECORD_COLUMNS: List[Tuple[str, type]] = [
+    ("url", np.int32),
+    ("size", np.int64),
+    ("type", np.int8),
+    ("order", np.int32),
+    ("initiator", np.int32),
+    ("execution_ms", np.float64),
+    ("fetch_delay_ms", np.float64),
+    ("time_to_first_byte_ms", np.float64),
+    ("cache_time", np.int64),
+    ("critical", np.bool_),
+]
+# the column dtype of each field of a reference to a resource record
+REFERENCE_COLUMNS: List[Tuple[str, type]] = [("index", np.int32), ("group_id", np.int32), ("source_id", np.int32)]
+REFERENCE_TABLES = ("har", "group")
+# the dtype of every section, which are all required
+SECTION_DTYPES: Dict[str, np.dtype] = {
+    "strings": np.dtype(np.uint8),
+    "string_offsets": np.dtype(np.int64),
+    "group_offsets": np.dtype(np.int64),
+    **{f"record.{field}": np.dtype(dtype) for (field, dtype) in RECORD_COLUMNS},
+    **{f"{table}.{field}": np.dtype(dtype) for table in REFERENCE_TABLES for (field, dtype) in REFERENCE_COLUMNS},
+}
+
+RESOURCE_TYPES = {res_type.value: res_type for res_type in ResourceType}
+
+
+def is_manifest(data: Union[bytes, memoryview]) -> bool:
+    """ Returns True if the given bytes start like a binary manifest """
+    return bytes(data[: len(MAGIC)]) == MAGIC
+
+
+def get_record(res: Resource) -> tuple:
+    """ Returns the fields of the given resource that are stored in its record """
+    return (
+        res.url,
+        res.size,
+        res.type,
+        res.order,
+        res.initiator,
+        res.execution_ms,
+        res.fetch_delay_ms,
+        res.time_to_first_byte_ms,
+        res.cache_time,
+        res.critical,
+    )
+
+
+def dumps(env_config: EnvironmentConfig) -> bytes:
+    """ Encodes the given EnvironmentConfig in the binary manifest format """
+    group_resources = [res for group in env_config.push_groups for res in group.resources]
+    (records, urls) = ({}, {})
+    references = {table: [] for table in REFERENCE_TABLES}
+    for (table, resources) in zip(REFERENCE_TABLES, (env_config.har_resources, group_resources)):
+        for res in resources:
+            index = records.setdefault(get_record(res), len(records))
+            references[table].append((index, res.group_id, res.source_id))
+            urls.setdefault(res.url, len(urls))
+    encoded_urls = [url.encode("utf-8") for url in urls]
+
+    sections: Dict[str, np.ndarray] = {
+        "strings": np.frombuffer(b"".join(encoded_urls), dtype=np.uint8),
+        "string_offsets": np.cumsum([0] + [len(url) for url in encoded_urls], dtype=np.int64),
+        "group_offsets": np.cumsum([0] + [len(group.resources) for group in env_config.push_groups], dtype=np.int64),
+    }
+    record_columns = list(zip(*records)) or [()] * len(RECORD_COLUMNS)
+    record_columns[0] = [urls[url] for url in record_columns[0]]
+    for ((field, dtype), values) in zip(RECORD_COLUMNS, record_columns):
+        sections[f"record.{field}"] = np.array(values, dtype=dtype)
+    for table in REFERENCE_TABLES:
+        reference_columns = list(zip(*references[table])) or [()] * len(REFERENCE_COLUMNS)
+        for ((field, dtype), values) in zip(REFERENCE_COLUMNS, reference_columns):
+            sections[f"{table}.{field}"] = np.array(values, dtype=dtype)
+
+    (layout, offset) = ({}, 0)
+    for (name, array) in sections.items():
+        layout[name] = [offset, array.dtype.str, len(array)]
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+    header = json.dumps(
+        {
+            "request_url": env_config.request_url,
+            "replay_dir": env_config.replay_dir,
+            "groups": [
+                {"id": group.id, "name": group.name, "trainable": group.trainable} for group in env_config.push_groups
+            ],
+            "sections": layout,
+        },
+        separators=(",", ":"),
+    ).encode("utf-8")
+    header += b" " * (-(PREAMBLE.size + len(header)) % ALIGNMENT)
+
+    data = bytearray(PREAMBLE.size + len(header) + offset)
+    PREAMBLE.pack_into(data, 0, MAGIC, VERSION, len(header))
+    data[PREAMBLE.size : PREAMBLE.size + len(header)] = header
+    start = PREAMBLE.size + len(header)
+    for (name, array) in sections.items():
+        section_offset = start + layout[name][0]
+        data[section_offset : section_offset + array.nbytes] = array.tobytes()
+    return bytes(data)
+
+
+def dump(env_config: EnvironmentConfig, file_name: str):
+    """ Saves the given EnvironmentConfig to the given file in the binary manifest format """
+    with open(file_name, "wb") as f:
+        f.write(dumps(env_config))
+
+
+def is_count(value) -> bool:
+    """ Returns True if the given header value is a non-negative integer """
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def check_indices(name: str, indices: np.ndarray, count: int):
+    """ Raises a ValueError unless all the given indices are valid indices into a section of the given count """
+    if len(indices) > 0 and (indices.min() < 0 or indices.max() >= count):
+        raise ValueError(f"invalid manifest: {name} out of range")
+
+
+def check_offsets(name: str, offsets: np.ndarray, count: int, end: int):
+    """ Raises a ValueError unless the given offsets are count + 1 non-decreasing offsets from 0 to end """
+    if count < 0 or len(offsets) != count + 1 or offsets[0] != 0 or offsets[-1] != end or (np.diff(offsets) < 0).any():
+        raise ValueError(f"invalid manifest: {name} do not match their section")
+
+
+class Manifest:
+    """
+    Manifest reads a binary manifest from a buffer, such as a memory-mapped file. The header is parsed
+    when the manifest is opened, and each column is a zero-copy view of the buffer that is only created
+    when it is first accessed. URLs and resource records are decoded on demand.
+
+    Opening a manifest validates its layout and the columns that index into other sections, so that a
+    malformed manifest raises a ValueError when it is opened instead of failing while it is decoded.
+    """
+
+    def __init__(self, buffer: Union[bytes, mmap.mmap]):
+        if len(buffer) < PREAMBLE.size or not is_manifest(buffer):
+            raise ValueError("not a binary manifest")
+        (_, version, header_len) = PREAMBLE.unpack_from(buffer, 0)
+        if version != VERSION:
+            raise ValueError(f"unsupported manifest version {version}, expected {VERSION}")
+        if PREAMBLE.size + header_len > len(buffer):
+            raise ValueError("truncated manifest")
+
+        self.buffer = buffer
+        self.version = version
+        # UnicodeDecodeError and JSONDecodeError are both ValueErrors
+        header = json.loads(bytes(buffer[PREAMBLE.size : PREAMBLE.size + header_len]).decode("utf-8"))
+        if not isinstance(header, dict) or not all(key in header for key in ("request_url", "replay_dir")):
+            raise ValueError("invalid manifest: missing header keys")
+        self.request_url: str = header["request_url"]
+        self.replay_dir: str = header["replay_dir"]
+        self.groups: List[dict] = header.get("groups")
+        self.sections: Dict[str, list] = header.get("sections")
+        self.data_offset = PREAMBLE.size + header_len
+        self.columns: Dict[str, np.ndarray] = {}
+        self._urls: Optional[List[str]] = None
+        self._records: Optional[List[tuple]] = None
+
+        if not isinstance(self.request_url, str) or not isinstance(self.replay_dir, str):
+            raise ValueError("invalid manifest: the request URL and replay directory must be strings")
+        self.validate_groups()
+        self.validate_sections()
+        self.validate_columns()
+
+    def validate_groups(self):
+        """ Raises a ValueError unless the header describes each push group with an id, name and trainable flag """
+        if not isinstance(self.groups, list):
+            raise ValueError("invalid manifest: missing header key groups")
+        for group in self.groups:
+            if (
+                not isinstance(group, dict)
+                or not isinstance(group.get("id"), int)
+                or not isinstance(group.get("name"), str)
+                or not isinstance(group.get("trainable"), bool)
+            ):
+                raise ValueError("invalid manifest: malformed push group")
+
+    def validate_sections(self):
+        """ Raises a ValueError unless every section has the expected dtype and lies within the buffer """
+        if not isinstance(self.sections, dict):
+            raise ValueError("invalid manifest: missing header key sections")
+        for (name, dtype) in SECTION_DTYPES.items():
+            section = self.sections.get(name)
+            if not isinstance(section, list) or len(section) != 3:
+                raise ValueError(f"invalid manifest: missing section {name}")
+            (offset, dtype_str, count) = section
+            if not is_count(offset) or not is_count(count):
+                raise ValueError(f"invalid manifest: section {name} has an invalid offset or length")
+            if dtype_str != dtype.str:
+                raise ValueError(f"invalid manifest: section {name} has dtype {dtype_str}, expected {dtype.str}")
+            if self.data_offset + offset + dtype.itemsize * count > len(self.buffer):
+                raise ValueError("truncated manifest")
+
+        for columns in (
+            [f"record.{field}" for (field, _) in RECORD_COLUMNS],
+            *[[f"{table}.{field}" for (field, _) in REFERENCE_COLUMNS] for table in REFERENCE_TABLES],
+        ):
+            if len({self.sections[name][2] for name in columns}) != 1:
+                raise ValueError(f"invalid manifest: the columns of {columns[0]} have different lengths")
+
+    def validate_columns(self):
+        """ Raises a ValueError unless the columns that index into other sections are within their bounds """
+        num_strings = self.sections["string_offsets"][2] - 1
+        num_records = self.sections["record.url"][2]
+        check_offsets("string offsets", self.view("string_offsets"), num_strings, self.sections["strings"][2])
+        check_offsets("group offsets", self.view("group_offsets"), len(self.groups), self.sections["group.index"][2])
+        check_indices("record URLs", self.view("record.url"), num_strings)
+        check_indices("record indices", self.view("har.index"), num_records)
+        check_indices("record indices", self.view("group.index"), num_records)
+        if not np.isin(self.view("record.type"), list(RESOURCE_TYPES)).all():
+            raise ValueError("invalid manifest: unknown resource type")
+
+    def view(self, name: str) -> np.ndarray:
+        """ Returns a read-only view of the section with the given name, without keeping it """
+        (offset, dtype, count) = self.sections[name]
+        return np.frombuffer(self.buffer, dtype=np.dtype(dtype), count=count, offset=self.data_offset + offset)
+
+    def column(self, name: str) -> np.ndarray:
+        """ Returns the section with the given name, such as "record.size", as a read-only array """
+        array = self.columns.get(name)
+        if array is None:
+            array = self.view(name)
+            self.columns[name] = array
+        return array
+
+    def url(self, index: int) -> str:
+        """ Returns the URL with the given index in the string table """
+        if self._urls is not None:
+            return self._urls[index]
+        offsets = self.column("string_offsets")
+        return self.column("strings")[offsets[index] : offsets[index + 1]].tobytes().decode("utf-8")
+
+    @property
+    def urls(self) -> List[str]:
+        """ Returns all URLs in the string table, decoding them the first time """
+        if self._urls is None:
+            strings = self.column("strings").tobytes()
+            offsets = self.column("string_offsets").tolist()
+            self._urls = [strings[start:end].decode("utf-8") for (start, end) in zip(offsets, offsets[1:])]
+        return self._urls
+
+    @property
+    def records(self) -> List[tuple]:
+        """ Returns the fields of each resource record, decoding them the first time """
+        if self._records is None:
+            columns = [self.column(f"record.{field}").tolist() for (field, _) in RECORD_COLUMNS]
+            urls = self.urls
+            columns[0] = [urls[i] for i in columns[0]]
+            columns[2] = [RESOURCE_TYPES[res_type] for res_type in columns[2]]
+            self._records = list(zip(*columns))
+        return self._records
+
+    @property
+    def num_resources(self) -> int:
+        """ Returns the number of resources in the HAR """
+        return self.sections["har.index"][2]
+
+    def resources(self, table: str, start: int = 0, end: Optional[int] = None) -> List[Resource]:
+        """ Returns the resources in the given table ("har" or "group") from start to end """
+        records = self.records
+        columns = [self.column(f"{table}.{field}")[start:end].tolist() for (field, _) in REFERENCE_COLUMNS]
+        return [
+            # the record fields are (url, size, type, order, initiator, ...) and the Resource fields are
+            # (url, size, type, order, group_id, source_id, initiator, ...)
+            Resource._make((*records[index][:4], group_id, source_id, *records[index][4:]))
+            for (index, group_id, source_id) in zip(*columns)
+        ]
+
+    def push_group(self, index: int) -> PushGroup:
+        """ Returns the push group with the given index """
+        group = self.groups[index]
+        offsets = self.column("group_offsets")
+        return PushGroup(
+            id=group["id"],
+            name=group["name"],
+            resources=self.resources("group", int(offsets[index]), int(offsets[index + 1])),
+            trainable=group["trainable"],
+        )
+
+    def to_environment_config(self) -> EnvironmentConfig:
+        """ Decodes the whole manifest into an EnvironmentConfig """
+        return EnvironmentConfig(
+            replay_dir=self.replay_dir,
+            request_url=self.request_url,
+            push_groups=[self.push_group(i) for i in range(len(self.groups))],
+            har_resources=self.resources("har"),
+        )
+
+
+def loads(data: bytes) -> Manifest:
+    """ Opens the binary manifest in the given bytes, raising a ValueError if it is not one """
+    return Manifest(data)
+
+
+def load(file_name: str) -> Manifest:
+    """ Memory-maps the binary manifest in the given file, raising a ValueError if it is not one """
+    with open(file_name, "rb") as f:
+        return Manifest(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def load_file(file_name: str) -> EnvironmentConfig:
+    """
+    Loads the EnvironmentConfig in the given file, which is memory-mapped if it is in the binary manifest
+    format, or unpickled if it was saved by an earlier version. The whole manifest is decoded; use load
+    to only read the parts of a binary manifest that are needed
+    """
+    with open(file_name, "rb") as f:
+        is_binary = is_manifest(f.read(len(MAGIC)))
+    if is_binary:
+        return load(file_name).to_environment_config()
+    with open(file_name, "rb") as f:
+        return pickle.load(f)
+
+
+def deserialize(data: bytes) -> EnvironmentConfig:
+    """
+    Loads an EnvironmentConfig from bytes in the binary manifest format, or pickled by an earlier version.
+    Pickles can run arbitrary code, so untrusted data should be loaded with loads instead, which only
+    accepts the binary format
+    """
+    if is_manifest(data):
+        return loads(data).to_environment_config()
+    return pickle.loads(data)
+
+
+def convert(file_name: str, save_as: Optional[str] = None) -> EnvironmentConfig:
+    """
+    Converts the manifest in the given file, pickled by an earlier version of blaze, to the binary format,
+    and saves it to save_as, or replaces the original file if save_as is not given
+    """
+    env_config = load_file(file_name)
+    dump(env_config, save_as or file_name)
+    return env_config
@@ -8,3 +8,5 @@ class TrainConfig(NamedTuple):
     experiment_name: str
     num_workers: int
     resume: Union[bool, str] = "prompt"
+    # the number of episodes that each worker steps at once in a VectorEnvironment
+    num_envs_per_worker: int = 1
@@ -1,2 +1,3 @@
 """ Defines the training environment """
 from .environment import Environment
+from .vector_environment import VectorEnvironment
@@ -1,18 +1,18 @@
 """ Defines the environment that the training of the agent occurs in """
 
 import math
-from typing import Optional, Set, Union
+from typing import Optional, Set, Tuple, Union
 
 import gym
 import numpy as np
 
-from blaze.action import ActionIDType, ActionSpace, Policy
+from blaze.action import Action, ActionIDType, ActionSpace, Policy
 from blaze.config import client, Config
 from blaze.config.client import ClientEnvironment
 from blaze.evaluator import Analyzer
-from blaze.logger import logger as log
+from blaze.logger import Lazy, logger as log
 
-from .observation import get_observation, get_observation_space
+from .observation import ObservationEncoder, get_action_mask_size, get_observation_space
 
 PROPORTION_DEPLOYED = 1.0
 NOOP_ACTION_REWARD = 0
@@ -38,7 +38,7 @@ class Environment(gym.Env):
             "initialized trainable push groups", groups=[group.name for group in self.env_config.trainable_push_groups]
         )
 
-        self.observation_space = get_observation_space()
+        self.observation_encoder = ObservationEncoder(self.env_config.push_groups, flat=bool(config.flat_observation))
         self.cached_urls = config.cached_urls or set()
         self.analyzer = Analyzer(self.config, config.reward_func or 0, config.use_aft or False)
 
@@ -48,6 +48,11 @@ class Environment(gym.Env):
         self.initialize_environment(
             self.config.client_env or client.get_random_fast_lte_client_environment(), self.config.cached_urls
         )
+        # the action space has the same shape in every episode, since it is built from the same push groups
+        self.observation_space = get_observation_space(
+            flat=bool(config.flat_observation),
+            action_mask_size=get_action_mask_size(self.action_space) if config.action_mask else 0,
+        )
 
     def seed(self, seed=None):
         self.np_random.seed(seed)
@@ -88,6 +93,7 @@ class Environment(gym.Env):
 
         self.client_environment = client_environment
         self.analyzer.reset(self.client_environment, self.cached_urls)
+        self.observation_encoder.reset(self.client_environment, self.cached_urls)
 
         num_domains_deployed = math.ceil(PROPORTION_DEPLOYED * len(self.env_config.push_groups))
         push_groups = sorted(self.env_config.push_groups, key=lambda g: len(g.resources), reverse=True)[
@@ -98,21 +104,37 @@ class Environment(gym.Env):
         self.policy = Policy(self.action_space)
 
     def step(self, action: ActionIDType):
-        # decode the action and apply it to the policy
+        decoded_action, action_applied = self.apply_action(action)
+        reward = self.get_reward(decoded_action) if action_applied else NOOP_ACTION_REWARD
+        info = {"action": decoded_action, "policy": self.policy.as_dict}
+        return self.observation, reward, not action_applied, info
+
+    def apply_action(self, action: ActionIDType) -> Tuple[Action, bool]:
+        """
+        Decodes the given action and applies it to the policy and the observation
+
+        :return: the decoded action, and whether it changed the policy
+        """
         decoded_action = self.action_space.decode_action(action)
         action_applied = self.policy.apply_action(decoded_action)
 
         # make sure the action isn't used again
-        log.info("trying action", action_id=action, action=repr(decoded_action), steps_taken=self.policy.steps_taken)
+        log.info(
+            "trying action",
+            action_id=action,
+            action=Lazy(lambda: repr(decoded_action)),
+            steps_taken=self.policy.steps_taken,
+        )
         self.action_space.use_action(decoded_action)
-
-        reward = NOOP_ACTION_REWARD
         if action_applied:
-            reward = self.analyzer.get_reward(self.policy)
-            log.info("got reward", action=repr(decoded_action), reward=reward)
+            self.observation_encoder.apply_action(decoded_action)
+        return decoded_action, action_applied
 
-        info = {"action": decoded_action, "policy": self.policy.as_dict}
-        return self.observation, reward, not action_applied, info
+    def get_reward(self, action: Action) -> float:
+        """ Evaluates the current policy after the given action was applied to it """
+        reward = self.analyzer.get_reward(self.policy)
+        log.info("got reward", action=Lazy(lambda: repr(action)), reward=reward)
+        return reward
 
     def render(self, mode="human"):
         return super(Environment, self).render(mode=mode)
@@ -120,4 +142,7 @@ class Environment(gym.Env):
     @property
     def observation(self):
         """ Returns an observation for the current state of the environment """
-        return get_observation(self.client_environment, self.env_config.push_groups, self.policy, self.cached_urls)
+        observation = self.observation_encoder.observation
+        if self.config.action_mask:
+            observation["action_mask"] = self.action_space.action_mask.astype(np.float32)
+        return observation
@@ -3,65 +3,199 @@ This module defines classes and methods related to creating the observation spac
 and generating observations based on some training state
 """
 
-from typing import List, Set
+from typing import Dict, List, Optional, Set
 
 import gym
 import numpy as np
 
-from blaze.action import Policy
+from blaze.action import Action, Policy
 from blaze.config.client import NetworkSpeed, NetworkType, DeviceSpeed, ClientEnvironment
-from blaze.config.environment import PushGroup, ResourceType
+from blaze.config.environment import PushGroup, Resource, ResourceType
 
 MAX_RESOURCES = 200
 MAX_DOMAINS = 200
 MAX_KBYTES = 10000
 
 
-def get_observation_space():
+# the number of values each resource is encoded as
+NUM_RESOURCE_FEATURES = 10
+# the column of each value in an encoded resource
+(
+    ENABLED,
+    CACHED,
+    GROUP_ID,
+    SOURCE_ID,
+    ORDER,
+    INITIATOR,
+    TYPE,
+    SIZE_KB,
+    PUSHED_FROM,
+    PRELOADED_FROM,
+) = range(NUM_RESOURCE_FEATURES)
+
+RESOURCE_FEATURE_SIZES = [
+    # 0 for disabled, 1 for enabled
+    2,
+    # 0 for not cached, 1 for cached
+    2,
+    # the push group (domain) this object is part of
+    MAX_DOMAINS,
+    # the source id (the position of this object relative to the domain) of this object
+    MAX_RESOURCES,
+    # the order (position of this object relative to the top of the page load) of this object, offset by 1
+    MAX_RESOURCES + 1,
+    # the initiator (order, offset by 1, of the object that requested this one)
+    MAX_RESOURCES + 1,
+    # the resource type
+    len(ResourceType),
+    # the size in kilobytes
+    MAX_KBYTES,
+    # the source ID of the resource that pushed this one, offset by 1 so that 0 indicates not pushed
+    MAX_RESOURCES + 1,
+    # the order of the resource that preloaded this one, offset by 1 so that 0 indicates not preloaded
+    MAX_RESOURCES + 1,
+]
+
+
+def get_observation_space(flat: bool = False, action_mask_size: int = 0):
     """
     Returns the default observation space -- a description of valid observations that
     can be made from the environment. It encompasses client information, resources available
     to push, and the resources that are being pushed according to the current push policy
+
+    :param flat: Describe the resources as a single (MAX_RESOURCES, NUM_RESOURCE_FEATURES) array instead
+                 of a dictionary with one entry per resource
+    :param action_mask_size: If nonzero, observations also include the action mask of an action space with
+                             this many values across its components (see ActionSpace.action_mask)
+    """
+    if flat:
+        resources_space = gym.spaces.MultiDiscrete(np.tile(RESOURCE_FEATURE_SIZES, (MAX_RESOURCES, 1)))
+    else:
+        resource_space = gym.spaces.MultiDiscrete(RESOURCE_FEATURE_SIZES)
+        resources_space = gym.spaces.Dict({str(i): resource_space for i in range(MAX_RESOURCES)})
+    spaces = {
+        "client": gym.spaces.Dict(
+            {
+                "network_type": gym.spaces.Discrete(len(NetworkType)),
+                "network_speed": gym.spaces.Discrete(len(NetworkSpeed)),
+                "device_speed": gym.spaces.Discrete(len(DeviceSpeed)),
+                "bandwidth_mbps": gym.spaces.Discrete(100),
+                "latency_ms": gym.spaces.Discrete(1000),
+                "loss": gym.spaces.Box(low=0, high=1, shape=(1,)),
+            }
+        ),
+        "resources": resources_space,
+    }
+    if action_mask_size > 0:
+        spaces["action_mask"] = gym.spaces.Box(low=0, high=1, shape=(action_mask_size,), dtype=np.float32)
+    return gym.spaces.Dict(spaces)
+
+
+def get_action_mask_size(action_space: gym.spaces.Tuple) -> int:
+    """ Returns the number of values across the components of the given action space """
+    return sum(space.n for space in action_space.spaces)
+
+
+def get_client_observation(client_environment: ClientEnvironment):
+    """ Returns the observation of the given client environment """
+    return {
+        "network_speed": client_environment.network_speed.value,
+        "network_type": client_environment.network_type.value,
+        "device_speed": client_environment.device_speed.value,
+        "bandwidth_mbps": client_environment.bandwidth // 1000,
+        "latency_ms": 10 * (client_environment.latency // 10),
+        "loss": np.array([client_environment.loss]),
+    }
+
+
+class ObservationEncoder:
+    """
+    ObservationEncoder keeps the encoded resources of a training episode in a preallocated
+    (MAX_RESOURCES, NUM_RESOURCE_FEATURES) array. The parts of the encoding that only depend on the push
+    groups are computed once, and each applied action only updates the row of the resource it pushes or
+    preloads. Resources with an order of MAX_RESOURCES or more are not observed.
     """
-    resource_space = gym.spaces.MultiDiscrete(
-        [
-            # 0 for disabled, 1 for enabled
-            2,
-            # 0 for not cached, 1 for cached
-            2,
-            # the push group (domain) this object is part of
-            MAX_DOMAINS,
-            # the source id (the position of this object relative to the domain) of this object
-            MAX_RESOURCES,
-            # the order (position of this object relative to the top of the page load) of this object, offset by 1
-            MAX_RESOURCES + 1,
-            # the initiator (order, offset by 1, of the object that requested this one)
-            MAX_RESOURCES + 1,
-            # the resource type
-            len(ResourceType),
-            # the size in kilobytes
-            MAX_KBYTES,
-            # the source ID of the resource that pushed this one, offset by 1 so that 0 indicates not pushed
-            MAX_RESOURCES + 1,
-            # the order of the resource that preloaded this one, offset by 1 so that 0 indicates not preloaded
-            MAX_RESOURCES + 1,
-        ]
-    )
-    return gym.spaces.Dict(
-        {
-            "client": gym.spaces.Dict(
-                {
-                    "network_type": gym.spaces.Discrete(len(NetworkType)),
-                    "network_speed": gym.spaces.Discrete(len(NetworkSpeed)),
-                    "device_speed": gym.spaces.Discrete(len(DeviceSpeed)),
-                    "bandwidth_mbps": gym.spaces.Discrete(100),
-                    "latency_ms": gym.spaces.Discrete(1000),
-                    "loss": gym.spaces.Box(low=0, high=1, shape=(1,)),
-                }
-            ),
-            "resources": gym.spaces.Dict({str(i): resource_space for i in range(MAX_RESOURCES)}),
+
+    def __init__(self, push_groups: List[PushGroup], flat: bool = False):
+        self.flat = flat
+        self.static_resources = np.zeros((MAX_RESOURCES, NUM_RESOURCE_FEATURES), dtype=np.int64)
+        self.url_to_row: Dict[str, int] = {}
+        for group in push_groups:
+            for res in group.resources:
+                if res.order >= MAX_RESOURCES:
+                    continue
+                # for some reason, sometimes res.type is in int instead of a ResourceType
+                res_type = res.type.value if isinstance(res.type, ResourceType) else res.type
+                res_size_kb = min(MAX_KBYTES - 1, res.size // 1000)
+                self.static_resources[res.order] = [
+                    1,
+                    0,
+                    group.id,
+                    res.source_id,
+                    res.order + 1,
+                    res.initiator + 1,
+                    res_type,
+                    res_size_kb,
+                    0,
+                    0,
+                ]
+                self.url_to_row[res.url] = res.order
+        self.resources = self.static_resources.copy()
+        self.client = {}
+
+    def bind(self, resources: np.ndarray):
+        """
+        Moves the encoding into the given preallocated (MAX_RESOURCES, NUM_RESOURCE_FEATURES) array, for
+        instance a row of a batch of observations, and keeps updating it there
+        """
+        np.copyto(resources, self.resources)
+        self.resources = resources
+
+    def reset(self, client_environment: ClientEnvironment, cached_urls: Set[str], policy: Optional[Policy] = None):
+        """
+        Resets the encoding for a new episode in the given client environment, with the given cached
+        URLs, and encodes the observable actions of the policy (if given)
+        """
+        np.copyto(self.resources, self.static_resources)
+        rows = [self.url_to_row[url] for url in cached_urls if url in self.url_to_row]
+        self.resources[rows, CACHED] = 1
+        self.client = get_client_observation(client_environment)
+
+        if policy is not None:
+            for (source, push) in policy.observable_push:
+                for push_res in push:
+                    self.encode_push(source, push_res)
+            for (source, preload) in policy.observable_preload:
+                for preload_res in preload:
+                    self.encode_preload(source, preload_res)
+
+    def encode_push(self, source: Resource, push: Resource):
+        """ Records that the given resource is pushed from the given source """
+        if push.order < MAX_RESOURCES:
+            # note that the pushed-from field is offset by 1, so that 0 indictates not pushed
+            self.resources[push.order, PUSHED_FROM] = source.source_id + 1
+
+    def encode_preload(self, source: Resource, preload: Resource):
+        """ Records that the given resource is preloaded from the given source """
+        if preload.order < MAX_RESOURCES:
+            # note that the preloaded-from field is offset by 1, so that 0 indictates not preloaded
+            self.resources[preload.order, PRELOADED_FROM] = source.order + 1
+
+    def apply_action(self, action: Action):
+        """ Updates the encoding with an action that was applied to the policy """
+        if action.is_push:
+            self.encode_push(action.source, action.push)
+        elif action.is_preload:
+            self.encode_preload(action.source, action.push)
+
+    @property
+    def observation(self):
+        """ Returns a snapshot of the current observation """
+        resources = self.resources.copy()
+        return {
+            "client": dict(self.client),
+            "resources": resources if self.flat else {str(i): row for (i, row) in enumerate(resources)},
         }
-    )
 
 
 def get_observation(
@@ -71,37 +205,6 @@ def get_observation(
     Given the environment, list of pushable resources, and the current push policy,
     return an observation
     """
-    # Encode the push groups
-    encoded_resources = {str(i): np.array([0, 0, 0, 0, 0, 0, 0, 0, 0, 0]) for i in range(MAX_RESOURCES)}
-
-    for group in push_groups:
-        for res in group.resources:
-            # for some reason, sometimes res.type is in int instead of a ResourceType
-            res_type = res.type.value if isinstance(res.type, ResourceType) else res.type
-            res_size_kb = min(MAX_KBYTES - 1, res.size // 1000)
-            cached = 1 if res.url in cached_urls else 0
-            encoded_resources[str(res.order)] = np.array(
-                [1, cached, group.id, res.source_id, res.order + 1, res.initiator + 1, res_type, res_size_kb, 0, 0]
-            )
-
-    for (source, push) in policy.observable_push:
-        for push_res in push:
-            # note that the pushed-from field is offset by 1, so that 0 indictates not pushed
-            encoded_resources[str(push_res.order)][-2] = source.source_id + 1
-
-    for (source, preload) in policy.observable_preload:
-        for preload_res in preload:
-            # note that the preloaded-from field is offset by 1, so that 0 indictates not pushed
-            encoded_resources[str(preload_res.order)][-1] = source.order + 1
-
-    return {
-        "client": {
-            "network_speed": client_environment.network_speed.value,
-            "network_type": client_environment.network_type.value,
-            "device_speed": client_environment.device_speed.value,
-            "bandwidth_mbps": client_environment.bandwidth // 1000,
-            "latency_ms": 10 * (client_environment.latency // 10),
-            "loss": np.array([client_environment.loss]),
-        },
-        "resources": encoded_resources,
-    }
+    encoder = ObservationEncoder(push_groups)
+    encoder.reset(client_environment, cached_urls, policy)
+    return encoder.observation
@@ -0,0 +1,103 @@
+""" Defines a vectorized environment that steps many training episodes of the same page at once """
+
+from typing import List, Union
+
+import numpy as np
+
+from blaze.action import ActionIDType
+from blaze.config import Config
+
+from .environment import Environment, NOOP_ACTION_REWARD
+from .observation import MAX_RESOURCES, NUM_RESOURCE_FEATURES
+
+try:
+    # RLlib only treats an environment as vectorized if it subclasses its VectorEnv
+    from ray.rllib.env.vector_env import VectorEnv
+except ImportError:
+    VectorEnv = object
+
+
+class VectorEnvironment(VectorEnv):
+    """
+    VectorEnvironment holds N independent training episodes over the same manifest, and implements
+    RLlib's VectorEnv interface. Training registers it with blaze.model.model.register_vector_environment.
+    The encoded resources of all episodes live in a single (N, MAX_RESOURCES, NUM_RESOURCE_FEATURES) array,
+    so a batch of observations is taken with one copy. All the actions of a step are applied before any
+    reward is evaluated, so no-op actions skip the simulator. Each episode has its own client environment
+    and policy, so its reward is simulated separately, but all the episodes share the compiled execution
+    graph and the baseline simulations of the page.
+    """
+
+    def __init__(self, config: Union[Config, dict], num_envs: int):
+        # pylint: disable=super-init-not-called
+        # (VectorEnv's constructor differs between RLlib versions and only sets these attributes)
+        assert num_envs > 0
+        self.num_envs = num_envs
+        self.envs = [Environment(config) for _ in range(num_envs)]
+        self.flat = self.envs[0].observation_encoder.flat
+        self.observation_space = self.envs[0].observation_space
+        self.action_space = self.envs[0].action_space
+
+        self.resources = np.zeros((num_envs, MAX_RESOURCES, NUM_RESOURCE_FEATURES), dtype=np.int64)
+        for (env, resources) in zip(self.envs, self.resources):
+            env.observation_encoder.bind(resources)
+
+    def seed(self, seed=None):
+        """ Seeds each episode with a different seed derived from the given one """
+        for (i, env) in enumerate(self.envs):
+            env.seed(None if seed is None else seed + i)
+
+    def vector_reset(self) -> list:
+        """ Resets all episodes and returns their observations """
+        for env in self.envs:
+            env.reset()
+        return self.observations()
+
+    def reset_at(self, index: int):
+        """ Resets the episode at the given index and returns its observation """
+        return self.envs[index].reset()
+
+    def vector_step(self, actions: List[ActionIDType]):
+        """
+        Applies one action to each episode, then evaluates the rewards of all the applied actions
+
+        :return: the lists of observations, rewards, done flags, and infos of the episodes
+        """
+        assert len(actions) == self.num_envs
+        applied = [env.apply_action(action) for (env, action) in zip(self.envs, actions)]
+        rewards = self.get_rewards(applied)
+        dones = [not action_applied for (_, action_applied) in applied]
+        infos = [
+            {"action": decoded_action, "policy": env.policy.as_dict}
+            for (env, (decoded_action, _)) in zip(self.envs, applied)
+        ]
+        return self.observations(), rewards, dones, infos
+
+    def get_rewards(self, applied) -> List[float]:
+        """
+        Evaluates the rewards of the episodes in which an action was applied in the current step, one
+        episode at a time since their policies differ
+        """
+        return [
+            env.get_reward(decoded_action) if action_applied else NOOP_ACTION_REWARD
+            for (env, (decoded_action, action_applied)) in zip(self.envs, applied)
+        ]
+
+    def observations(self) -> list:
+        """ Returns the current observation of every episode, taken from one copy of the batch """
+        resources = self.resources.copy()
+        observations = [
+            {
+                "client": dict(env.observation_encoder.client),
+                "resources": resources[i] if self.flat else {str(j): row for (j, row) in enumerate(resources[i])},
+            }
+            for (i, env) in enumerate(self.envs)
+        ]
+        if self.envs[0].config.action_mask:
+            for (observation, env) in zip(observations, self.envs):
+                observation["action_mask"] = env.action_space.action_mask.astype(np.float32)
+        return observations
+
+    def get_unwrapped(self) -> List[Environment]:
+        """ Returns the underlying environments """
+        return self.envs
@@ -4,14 +4,21 @@ under the specified circumstances and returns a metric indicating the policy
 quality
 """
 
-from typing import Callable, List, Optional, Set
+import collections
+import hashlib
+import os
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Set, Tuple, Union
 
 from blaze.action import Policy
-from blaze.config import Config
+from blaze.config import Config, manifest
 from blaze.config.client import ClientEnvironment
 from blaze.evaluator.simulator import Simulator
 from blaze.logger import logger
 
+from .plt_store import LocalPLTStore, SharedPLTStore, get_store_key
+
 # Define the call signature of a reward function
 # (simulator, client environment, cached urls) => ((policy) => float)
 RewardFunction = Callable[[Simulator, ClientEnvironment, Set[str], Optional[bool]], Callable[[Policy], float]]
@@ -21,6 +28,156 @@ BEST_REWARD_COEFF = 200000.0
 REGRESSION_REWARD_COEFF = -5.0
 PROGRESSION_REWARD_COEFF = 5.0
 
+MAX_CACHED_PLTS = 16384
+
+# the sorted (source URL, pushed URL) pairs and (source URL, preloaded URL) pairs of a policy
+PolicyKey = Tuple[Tuple[Tuple[str, str], ...], Tuple[Tuple[str, str], ...]]
+
+
+def get_policy_key(policy: Optional[Policy]) -> PolicyKey:
+    """
+    Returns a canonical, hashable encoding of the given policy, which is the same for policies with the
+    same pushes and preloads regardless of the order in which their actions were applied
+    """
+    if not policy:
+        return ((), ())
+    push = tuple(sorted((source.url, res.url) for (source, deps) in policy.push for res in deps))
+    preload = tuple(sorted((source.url, res.url) for (source, deps) in policy.preload for res in deps))
+    return (push, preload)
+
+
+class PLTCache:
+    """
+    A bounded, thread-safe LRU cache of simulated page load times, keyed by the identity of the
+    simulator's ExecutionGraph and congestion model, the client environment, the set of cached URLs, the
+    canonical policy, and whether the AFT was requested. It is shared by all reward functions, since they
+    all derive from Simulator.simulate_load_time, and by all Analyzers of the same page in a process. The
+    number of hits and misses, and the simulation time the hits saved, are recorded.
+
+    A store shared with other processes (see blaze.evaluator.plt_store) can be attached, which is
+    consulted before simulating and published to after. Its keys identify the page by a digest of its
+    EnvironmentConfig, since ExecutionGraph identities are only meaningful within a process.
+    """
+
+    def __init__(self, max_size: int = MAX_CACHED_PLTS):
+        self.max_size = max_size
+        self.results: "collections.OrderedDict[Hashable, Tuple[object, float, float]]" = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+        self.store: Optional[Union[LocalPLTStore, SharedPLTStore]] = None
+        self.page_digests: Dict[int, Tuple[object, str]] = {}
+
+    def __len__(self):
+        return len(self.results)
+
+    def simulate_load_time(
+        self,
+        simulator: Simulator,
+        client_environment: ClientEnvironment,
+        policy: Optional[Policy] = None,
+        cached_urls: Optional[Set[str]] = None,
+        use_aft: Optional[bool] = False,
+    ) -> float:
+        """ Returns the cached result of simulator.simulate_load_time, simulating it if it is not cached """
+        key = (
+            id(simulator.graph),
+            simulator.congestion_model,
+            client_environment,
+            frozenset(cached_urls or ()),
+            get_policy_key(policy),
+            bool(use_aft),
+        )
+        with self.lock:
+            entry = self.results.get(key)
+            # the graph is stored with the result so that its id cannot be reused for a different graph
+            if entry is not None and entry[0] is simulator.graph:
+                self.results.move_to_end(key)
+                self.hits += 1
+                self.saved_ms += entry[2]
+                return entry[1]
+
+        store = self.store
+        if store is not None:
+            store_key = get_store_key(self.page_digest(simulator.graph), *key[1:3], sorted(key[3]), *key[4:])
+            plt = store.get(store_key)
+            if plt is not None:
+                with self.lock:
+                    self.shared_hits += 1
+                self._put(key, simulator.graph, plt, 0.0)
+                return plt
+
+        with self.lock:
+            self.misses += 1
+        start = time.perf_counter()
+        plt = simulator.simulate_load_time(client_environment, policy=policy, cached_urls=cached_urls, use_aft=use_aft)
+        self._put(key, simulator.graph, plt, 1000 * (time.perf_counter() - start))
+        if store is not None:
+            store.put(store_key, plt)
+        return plt
+
+    def _put(self, key: Hashable, graph, plt: float, time_ms: float):
+        with self.lock:
+            self.results[key] = (graph, plt, time_ms)
+            self.results.move_to_end(key)
+            while len(self.results) > self.max_size:
+                self.results.popitem(last=False)
+
+    def page_digest(self, graph) -> str:
+        """ Returns a digest of the EnvironmentConfig of the given ExecutionGraph, computed once per graph """
+        with self.lock:
+            entry = self.page_digests.get(id(graph))
+            if entry is not None and entry[0] is graph:
+                return entry[1]
+        digest = hashlib.blake2b(manifest.dumps(graph.env_config), digest_size=16).hexdigest()
+        with self.lock:
+            self.page_digests[id(graph)] = (graph, digest)
+        return digest
+
+    def attach(self, store: Optional[Union[LocalPLTStore, SharedPLTStore]]):
+        """ Attaches the given shared store to consult and publish to, or detaches the current one if None """
+        self.store = store
+
+    def attach_shared_store(self, path: str):
+        """ Attaches the SharedPLTStore at the given path, unless it is already attached or does not exist """
+        if isinstance(self.store, SharedPLTStore) and self.store.path == path:
+            return
+        if not os.path.exists(path):
+            logger.namespaced("plt_cache").warn("shared page load time store does not exist", path=path)
+            return
+        self.attach(SharedPLTStore(path))
+
+    @property
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """
+        Returns the number of cached results, the number of hits in this cache and in the shared store, the
+        number of misses (simulations), the hit rate, and the simulation time saved by the hits in this cache
+        """
+        with self.lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "size": len(self.results),
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+                "saved_ms": self.saved_ms,
+            }
+
+    def clear(self):
+        """ Removes all cached results and resets the statistics. The shared store is left untouched """
+        with self.lock:
+            self.results.clear()
+            self.hits = 0
+            self.shared_hits = 0
+            self.misses = 0
+            self.saved_ms = 0.0
+
+
+plt_cache = PLTCache()
+
 
 def reward_0(
     simulator: Simulator, client_environment: ClientEnvironment, cached_urls: Set[str], use_aft: bool = False
@@ -33,7 +190,7 @@ def reward_0(
     def _reward(policy: Policy) -> float:
         nonlocal last_plt
 
-        plt = simulator.simulate_load_time(client_environment, policy=policy, cached_urls=cached_urls, use_aft=use_aft)
+        plt = plt_cache.simulate_load_time(simulator, client_environment, policy, cached_urls, use_aft)
         if last_plt == 0:
             reward = 1000000.0 * (1.0 / plt)
         else:
@@ -52,7 +209,7 @@ def reward_1(
     """
 
     def _reward(policy: Policy) -> float:
-        plt = simulator.simulate_load_time(client_environment, policy=policy, cached_urls=cached_urls, use_aft=use_aft)
+        plt = plt_cache.simulate_load_time(simulator, client_environment, policy, cached_urls, use_aft)
         return 1000000.0 / plt
 
     return _reward
@@ -66,7 +223,7 @@ def reward_2(
     """
 
     def _reward(policy: Policy) -> float:
-        plt = simulator.simulate_load_time(client_environment, policy=policy, cached_urls=cached_urls, use_aft=use_aft)
+        plt = plt_cache.simulate_load_time(simulator, client_environment, policy, cached_urls, use_aft)
         return -plt
 
     return _reward
@@ -78,13 +235,13 @@ def reward_3(
     """
     Returns a reward function that returns the original 3-part reward
     """
-    min_plt = simulator.simulate_load_time(client_environment) if client_environment else MIN_PAGE_LOAD_TIME
+    min_plt = simulator.simulate_baseline(client_environment).plt_ms if client_environment else MIN_PAGE_LOAD_TIME
     last_plt = min_plt if min_plt < MIN_PAGE_LOAD_TIME else 0
 
     def _reward(policy: Policy) -> float:
         nonlocal min_plt, last_plt
 
-        plt = simulator.simulate_load_time(client_environment, policy=policy, cached_urls=cached_urls, use_aft=use_aft)
+        plt = plt_cache.simulate_load_time(simulator, client_environment, policy, cached_urls, use_aft)
         if plt < min_plt:
             reward = BEST_REWARD_COEFF / plt
         else:
@@ -127,7 +284,9 @@ class Analyzer:
         self.use_aft = use_aft
         self.cached_urls = cached_urls
         self.client_environment = client_environment
-        self.simulator = Simulator(config.env_config)
+        self.simulator = Simulator(config.env_config, incremental=True)
+        if config.plt_store:
+            plt_cache.attach_shared_store(config.plt_store)
         self.reward_func_num = reward_func_num
         self.reward_func = REWARD_FUNCTIONS[self.reward_func_num](
             self.simulator, self.client_environment, self.cached_urls, self.use_aft
@@ -148,3 +307,8 @@ class Analyzer:
         the client environment and the page load.
         """
         return self.reward_func(policy)
+
+    @property
+    def cache_stats(self) -> Dict[str, Union[int, float]]:
+        """ Returns the statistics of the page load time cache shared by the reward functions """
+        return plt_cache.stats
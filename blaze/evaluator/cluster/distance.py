@@ -45,7 +45,7 @@ def create_apted_distance_function(port: int) -> DistanceFunc:
         r = requests.post(f"http://localhost:{port}/getTreeDiff", json={"tree1": a_tree, "tree2": b_tree}, timeout=5)
         r = r.json()
         distance = r["editDistance"]
-        log.with_namespace("apted_distance").debug("got distance", distance=distance, a=a.request_url, b=b.request_url)
+        log.namespaced("apted_distance").debug("got distance", distance=distance, a=a.request_url, b=b.request_url)
         return distance
 
     return apted_distance
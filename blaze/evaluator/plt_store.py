@@ -0,0 +1,134 @@
+"""
+This module defines stores of simulated page load times that are shared between processes, so that the
+rollout workers of a training run on the same machine do not each simulate the same policies
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+
+# the default number of page load times a shared store holds
+MAX_SHARED_PLTS = 1 << 19
+# the number of consecutive slots probed for a key before its first slot is overwritten
+MAX_PROBES = 8
+# the 64-bit words of each slot: the key, the bits of the page load time, and the XOR of both, which
+# detects slots that another process was writing while they were read
+(KEY, VALUE, CHECK) = range(3)
+SLOT_SIZE = 3
+
+
+def get_store_key(*parts) -> int:
+    """
+    Returns a nonzero 64-bit key for the given parts. The repr of each part must be the same in every
+    process, so sets must be passed sorted
+    """
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+class LocalPLTStore:
+    """
+    An in-process stand-in for SharedPLTStore, with the same interface, for tests and single-process
+    training
+    """
+
+    def __init__(self):
+        self.results: Dict[int, float] = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.results)
+
+    def get(self, key: int) -> Optional[float]:
+        """ Returns the page load time stored for the given key, or None if there is none """
+        with self.lock:
+            return self.results.get(key)
+
+    def put(self, key: int, plt: float):
+        """ Stores the page load time for the given key """
+        with self.lock:
+            self.results[key] = plt
+
+    def close(self):
+        """ Releases the store """
+
+
+class SharedPLTStore:
+    """
+    SharedPLTStore is a fixed-size hash table of page load times in a memory-mapped file, which any process
+    on the machine can attach to by its path. Keys are probed linearly from their home slot, and when all
+    probed slots are taken the home slot is overwritten, so the store behaves like a cache.
+
+    No locks are taken: a writer stores the value and the check word before the key, and a reader only
+    accepts a slot whose check word matches its key and value, so a slot that was being overwritten while
+    it was read is treated as a miss.
+    """
+
+    def __init__(self, path: str, owner: bool = False):
+        self.path = path
+        self.owner = owner
+        table = np.memmap(path, dtype=np.uint64, mode="r+")
+        self.num_slots = len(table) // SLOT_SIZE
+        self.table = table[: self.num_slots * SLOT_SIZE].reshape((self.num_slots, SLOT_SIZE))
+
+    @staticmethod
+    def create(num_slots: int = MAX_SHARED_PLTS, directory: Optional[str] = None) -> "SharedPLTStore":
+        """
+        Creates an empty store with the given number of slots in a new file in the given directory, which
+        defaults to /dev/shm when it is available so that the store stays in memory
+        """
+        directory = directory or ("/dev/shm" if os.path.isdir("/dev/shm") else None)
+        (fd, path) = tempfile.mkstemp(prefix="blaze-plt-", suffix=".bin", dir=directory)
+        with os.fdopen(fd, "wb") as f:
+            f.truncate(num_slots * SLOT_SIZE * np.dtype(np.uint64).itemsize)
+        return SharedPLTStore(path, owner=True)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.table[:, KEY]))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get(self, key: int) -> Optional[float]:
+        """ Returns the page load time stored for the given key, or None if there is none """
+        home = key % self.num_slots
+        for i in range(MAX_PROBES):
+            slot = self.table[(home + i) % self.num_slots]
+            slot_key = int(slot[KEY])
+            if slot_key == 0:
+                return None
+            if slot_key == key:
+                (value, check) = (slot[VALUE], slot[CHECK])
+                if int(check) != key ^ int(value):
+                    return None
+                return float(value.view(np.float64))
+        return None
+
+    def put(self, key: int, plt: float):
+        """ Stores the page load time for the given key """
+        home = key % self.num_slots
+        index = home
+        for i in range(MAX_PROBES):
+            slot_key = int(self.table[(home + i) % self.num_slots, KEY])
+            if slot_key in (0, key):
+                index = (home + i) % self.num_slots
+                break
+
+        value = np.float64(plt).view(np.uint64)
+        slot = self.table[index]
+        slot[VALUE] = value
+        slot[CHECK] = np.uint64(key ^ int(value))
+        slot[KEY] = np.uint64(key)
+
+    def close(self):
+        """ Detaches from the store, and removes its file if this process created it """
+        self.table = None
+        if self.owner and os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,101 @@
+"""
+This module defines the results of simulating a page load without any push policy (the baseline)
+and a cache for them, since the baseline is needed for every policy simulated in the same client
+environment
+"""
+
+import collections
+import threading
+from typing import FrozenSet, Hashable, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from blaze.config.client import ClientEnvironment
+
+from .execution_graph import ExecutionGraph
+from .tcp_state import CongestionModel
+
+MAX_CACHED_BASELINES = 1024
+
+
+class BaselineResult(NamedTuple):
+    """ The timings of a page load without any push policy, indexed by ExecutionGraph node index """
+
+    # the time at which each node completed, including its execution time (NaN if it was never loaded)
+    completion_ms: np.ndarray
+    # the time each node spent downloading (0 if it was never downloaded)
+    download_ms: np.ndarray
+    plt_ms: float
+    # the completion time of the last critical node, or None if no nodes are marked critical
+    aft_ms: Optional[float]
+
+
+BaselineKey = Tuple[int, ClientEnvironment, FrozenSet[str], CongestionModel]
+
+
+class BaselineCache:
+    """
+    A bounded, thread-safe LRU cache of BaselineResults, keyed by the identity of the ExecutionGraph,
+    the ClientEnvironment, the set of cached URLs, and the simulated congestion model
+    """
+
+    def __init__(self, max_size: int = MAX_CACHED_BASELINES):
+        self.max_size = max_size
+        self.results: "collections.OrderedDict[Hashable, Tuple[ExecutionGraph, BaselineResult]]" = (
+            collections.OrderedDict()
+        )
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.results)
+
+    @staticmethod
+    def key(
+        graph: ExecutionGraph,
+        client_env: ClientEnvironment,
+        cached_urls: FrozenSet[str],
+        congestion_model: CongestionModel = CongestionModel.RENO,
+    ) -> BaselineKey:
+        """ Returns the cache key for the given graph, client environment, cached URLs, and congestion model """
+        return (id(graph), client_env, cached_urls, congestion_model)
+
+    def get(
+        self,
+        graph: ExecutionGraph,
+        client_env: ClientEnvironment,
+        cached_urls: FrozenSet[str],
+        congestion_model: CongestionModel = CongestionModel.RENO,
+    ) -> Optional[BaselineResult]:
+        """ Returns the cached BaselineResult, or None if it has not been computed """
+        key = self.key(graph, client_env, cached_urls, congestion_model)
+        with self.lock:
+            entry = self.results.get(key)
+            # the graph is stored with the result so that its id cannot be reused for a different graph
+            if entry is None or entry[0] is not graph:
+                return None
+            self.results.move_to_end(key)
+            return entry[1]
+
+    def put(
+        self,
+        graph: ExecutionGraph,
+        client_env: ClientEnvironment,
+        cached_urls: FrozenSet[str],
+        result: BaselineResult,
+        congestion_model: CongestionModel = CongestionModel.RENO,
+    ):
+        """ Caches the BaselineResult, evicting the least recently used results if the cache is full """
+        key = self.key(graph, client_env, cached_urls, congestion_model)
+        with self.lock:
+            self.results[key] = (graph, result)
+            self.results.move_to_end(key)
+            while len(self.results) > self.max_size:
+                self.results.popitem(last=False)
+
+    def clear(self):
+        """ Removes all cached results """
+        with self.lock:
+            self.results.clear()
+
+
+baseline_cache = BaselineCache()
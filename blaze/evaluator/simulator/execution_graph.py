@@ -0,0 +1,135 @@
+"""
+This module defines the ExecutionGraph, a compact and immutable representation of the dependency
+graph of a page that is built once per EnvironmentConfig and shared by all simulators of that page
+"""
+
+import collections
+import threading
+from typing import Dict, List
+
+import numpy as np
+
+from blaze.config.environment import EnvironmentConfig, ResourceType
+
+from .request_queue import Node
+
+MAX_CACHED_GRAPHS = 64
+
+
+class ExecutionGraph:  # pylint: disable=too-many-instance-attributes
+    """
+    ExecutionGraph stores the execution graph of a page as a set of arrays indexed by node, where each
+    node is identified by its index in the resources sorted by order (the root has index 0). The children
+    of each node are stored in compressed sparse row (CSR) form: the children of node i are
+    children[child_offsets[i]:child_offsets[i + 1]], sorted by order.
+
+    The graph also keeps a Node for each index, which the Simulator uses to walk the graph. The nodes
+    are created once per graph, so they can be compared and hashed by identity.
+    """
+
+    def __init__(self, env_config: EnvironmentConfig):
+        # create a map of Nodes, mapping their order (basically their ID) to a Node for that resource
+        res_list = sorted(env_config.har_resources, key=lambda r: r.order)
+        root_res = next(res for res in res_list if res.order == 0)
+        node_map = {0: Node(resource=root_res, priority=root_res.order, index=0)}
+
+        # for each resource, unless it's the start resource, add it as a child of its initiator
+        for res in res_list:
+            if res != root_res:
+                node = Node(resource=res, priority=res.order, parent=node_map.get(res.initiator), index=len(node_map))
+                node_map[res.order] = node
+                node_map[res.initiator].children.append(node)
+
+        # sort each child list by its order
+        for node in node_map.values():
+            node.children.sort(key=lambda n: n.resource.order)
+
+        self.env_config = env_config
+        self.nodes: List[Node] = list(node_map.values())
+        self.root = self.nodes[0]
+        self.order_to_node: Dict[int, Node] = node_map
+        self.url_to_node: Dict[str, Node] = {node.resource.url: node for node in self.nodes}
+        self.url_to_nodes: Dict[str, List[Node]] = collections.defaultdict(list)
+        for node in self.nodes:
+            self.url_to_nodes[node.resource.url].append(node)
+        self.url_to_nodes = dict(self.url_to_nodes)
+
+        self.domains: List[str] = sorted(set(node.domain for node in self.nodes))
+        domain_to_id = {domain: i for (i, domain) in enumerate(self.domains)}
+
+        self.orders = np.array([node.resource.order for node in self.nodes], dtype=np.int32)
+        self.sizes = np.array([node.resource.size for node in self.nodes], dtype=np.int64)
+        self.types = np.array([ResourceType(node.resource.type) for node in self.nodes], dtype=np.int8)
+        self.domain_ids = np.array([domain_to_id[node.domain] for node in self.nodes], dtype=np.int32)
+        self.ttfb_ms = np.array([node.resource.time_to_first_byte_ms for node in self.nodes], dtype=np.float64)
+        self.fetch_delay_ms = np.array([node.resource.fetch_delay_ms for node in self.nodes], dtype=np.float64)
+        self.execution_ms = np.array([node.resource.execution_ms for node in self.nodes], dtype=np.float64)
+        self.critical = np.array([node.resource.critical for node in self.nodes], dtype=np.bool_)
+        self.parents = np.array([node.parent.index if node.parent else -1 for node in self.nodes], dtype=np.int32)
+        self.child_offsets = np.cumsum([0] + [len(node.children) for node in self.nodes], dtype=np.int32)
+        self.children = np.array([child.index for node in self.nodes for child in node.children], dtype=np.int32)
+
+        for array in self.arrays.values():
+            array.setflags(write=False)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @property
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """ Returns the per-node and CSR arrays of the graph by name """
+        return {
+            "orders": self.orders,
+            "sizes": self.sizes,
+            "types": self.types,
+            "domain_ids": self.domain_ids,
+            "ttfb_ms": self.ttfb_ms,
+            "fetch_delay_ms": self.fetch_delay_ms,
+            "execution_ms": self.execution_ms,
+            "critical": self.critical,
+            "parents": self.parents,
+            "child_offsets": self.child_offsets,
+            "children": self.children,
+        }
+
+    def children_of(self, index: int) -> np.ndarray:
+        """ Returns the indices of the children of the given node, sorted by order """
+        return self.children[self.child_offsets[index] : self.child_offsets[index + 1]]
+
+
+_graph_cache: "collections.OrderedDict[int, ExecutionGraph]" = collections.OrderedDict()
+_graph_cache_lock = threading.Lock()
+
+
+def get_execution_graph(env_config: EnvironmentConfig) -> ExecutionGraph:
+    """
+    Returns the ExecutionGraph for the given EnvironmentConfig, building it only if it is not one of the
+    MAX_CACHED_GRAPHS most recently used graphs. Graphs are cached by the identity of the EnvironmentConfig;
+    the cached graph keeps a reference to it, so the identity cannot be reused while the graph is cached.
+    """
+    key = id(env_config)
+    with _graph_cache_lock:
+        graph = _graph_cache.get(key)
+        if graph is not None:
+            _graph_cache.move_to_end(key)
+            return graph
+
+    graph = ExecutionGraph(env_config)
+    with _graph_cache_lock:
+        _graph_cache[key] = graph
+        while len(_graph_cache) > MAX_CACHED_GRAPHS:
+            _graph_cache.popitem(last=False)
+    return graph
+
+
+def cache_execution_graph(graph: ExecutionGraph):
+    """
+    Marks the given ExecutionGraph as the most recently used graph of its EnvironmentConfig, adding it back
+    to the cache if it was evicted, so that callers that hold on to graphs can keep them from being rebuilt
+    """
+    key = id(graph.env_config)
+    with _graph_cache_lock:
+        _graph_cache[key] = graph
+        _graph_cache.move_to_end(key)
+        while len(_graph_cache) > MAX_CACHED_GRAPHS:
+            _graph_cache.popitem(last=False)
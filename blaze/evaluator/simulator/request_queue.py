@@ -3,84 +3,189 @@ This module defines some helper classes as data structures for the Simulator and
 It also defines the RequestQueue, which simulates the network link.
 """
 
-import copy
-from collections import defaultdict
-from typing import DefaultDict, Dict, List, NamedTuple, Optional, Set, Tuple
+import enum
+import heapq
+from typing import Dict, List, Optional, Set, Tuple
 
 from blaze.config.environment import Resource
 from blaze.preprocess.url import Url
 
-from .tcp_state import TCPState
+from .stats import SimulationStats
+from .tcp_state import CongestionModel, TCPState, get_tcp_state_class
 
+# delayed items with less than this many milliseconds left are considered ready to download
+DELAY_EPSILON_MS = 0.01
 
-class Node(NamedTuple):
-    """ A Node in the Simulator graph """
 
-    resource: Resource
-    priority: int
-    children: List["Node"] = []
-    parent: Optional["Node"] = None
+class Node:
+    """
+    A Node in the Simulator graph. Nodes are created once per ExecutionGraph and identified by their
+    index in it, so they are compared and hashed by identity
+    """
+
+    __slots__ = ("resource", "priority", "children", "parent", "index", "domain")
+
+    def __init__(
+        self,
+        resource: Resource,
+        priority: int,
+        children: Optional[List["Node"]] = None,
+        parent: Optional["Node"] = None,
+        index: int = 0,
+    ):
+        self.resource = resource
+        self.priority = priority
+        self.children: List["Node"] = children if children is not None else []
+        self.parent = parent
+        self.index = index
+        self.domain = Url.parse(resource.url).domain
+
+    def __repr__(self):
+        return f"Node(index={self.index}, url={self.resource.url})"
 
-    def __hash__(self):
-        return hash(self.resource.url)
 
-    def __eq__(self, other: "Node"):
-        return self.resource == other.resource
+class QueueItemState(enum.IntEnum):
+    """ QueueItemState defines where an item is in its lifetime in the RequestQueue """
+
+    DELAYED = 0
+    QUEUED = 1
+    DONE = 2
 
 
 class QueueItem:
-    """ An item in the RequestQueue """
+    """
+    An item in the RequestQueue. Instead of being updated on every step, an item records the
+    points on the request queue's virtual clocks at which it becomes ready to download and at
+    which it finishes downloading. See RequestQueue for a description of the clocks.
+    """
 
-    def __init__(self, node: Node, size: int, origin: str, delay_ms: float = 0):
+    __slots__ = (
+        "node",
+        "size",
+        "origin",
+        "ready_at_ms",
+        "finish_at_bytes",
+        "delay_ms_left",
+        "started_at_ms",
+        "completed_at_ms",
+        "state",
+        "owner",
+    )
+
+    def __init__(self, node: Node, size: int, origin: str, ready_at_ms: float = 0, owner: Optional[object] = None):
         self.node = node
-        self.bytes_left = size
+        self.size = size
         self.origin = origin
-        self.delay_ms_left = delay_ms
-        self.time_spent_downloading = 0
+        # the elapsed time at which the item leaves the delayed heap
+        self.ready_at_ms = ready_at_ms
+        # the per-item byte count at which the item finishes downloading, set once it is queued
+        self.finish_at_bytes: Optional[float] = None
+        # the delay left at the moment the item was queued
+        self.delay_ms_left: Optional[float] = None
+        self.started_at_ms: Optional[float] = None
+        self.completed_at_ms: Optional[float] = None
+        self.state = QueueItemState.DELAYED
+        # the token of the request queue allowed to modify this item in place
+        self.owner = owner
+
+    def copy(self) -> "QueueItem":
+        """
+        :return: a copy of the queue item
+        """
+        queue_item = QueueItem.__new__(QueueItem)
+        for attr in QueueItem.__slots__:
+            setattr(queue_item, attr, getattr(self, attr))
+        return queue_item
 
 
-class RequestQueue:
+class RequestQueue:  # pylint: disable=too-many-instance-attributes
     """
     RequestQueue simulates ongoing network requests and the amount of time it would
     take to complete them.
+
+    The queue is event-driven: it keeps two virtual clocks, `elapsed_ms` (the total time stepped)
+    and `bytes_per_item` (the number of bytes every downloading item has received so far, since
+    the link is shared evenly). Delayed items are kept in a heap ordered by the elapsed time at which
+    they become ready, and downloading items in a heap ordered by the per-item byte count at which they
+    finish, so each step only needs to look at the top of each heap.
+
+    Forks of the queue share their items and TCP states until one of the queues needs to modify them
+    (copy-on-write), so a fork only pays for what changes afterwards.
     """
 
-    def __init__(self, bandwidth_kbps: int, rtt_latency_ms: int, loss_prop: float):
-        self.queue: List[QueueItem] = []
-        self.delayed: List[QueueItem] = []
+    def __init__(
+        self,
+        bandwidth_kbps: int,
+        rtt_latency_ms: int,
+        loss_prop: float,
+        congestion_model: CongestionModel = CongestionModel.RENO,
+        stats: Optional[SimulationStats] = None,
+    ):
+        self.queue: List[Tuple[float, int, QueueItem]] = []
+        self.delayed: List[Tuple[float, int, QueueItem]] = []
+        self.num_queued = 0
+        self.num_delayed = 0
+        self.elapsed_ms = 0.0
+        self.bytes_per_item = 0.0
         self.connected_origins: Set[str] = set()
+        # maps every node added to the queue (and not removed since) to its current item
         self.node_to_queue_item_map: Dict[Node, QueueItem] = {}
         # convert kilobits per second (kbps) to bytes per second (Bps)
         self.link_bandwidth_bps = bandwidth_kbps * (1000 / 8)
         self.bandwidth_kbps = bandwidth_kbps
         self.rtt_latency_ms = rtt_latency_ms
         self.loss_prop = loss_prop
-        # model TCP dynamics per domain
-        self.tcp_state: DefaultDict[TCPState] = defaultdict(lambda: TCPState(loss_prop=self.loss_prop))
+        self.congestion_model = congestion_model
+        self.tcp_state_class = get_tcp_state_class(congestion_model)
+        # model TCP dynamics per domain. Idle time is only added to a domain's TCPState when the
+        # state is needed, based on the elapsed time at which the domain last sent bytes
+        self.tcp_state: Dict[str, TCPState] = {}
+        self.owned_tcp_states: Set[str] = set()
+        self.tcp_idle_since_ms: Dict[str, float] = {}
+        # the number of downloading items for each origin that has at least one
+        self.queued_per_origin: Dict[str, int] = {}
+        # breaks ties between heap entries in insertion order
+        self.num_pushed = 0
+        # items created with a different owner token are shared with a fork
+        self.owner = object()
+        # counts the work done by this queue and its forks
+        self.stats = stats if stats is not None else SimulationStats()
 
     def __contains__(self, node: Node):
         """
         :return: True if the given node is already scheduled for download
         """
-        return any(qi.node == node for qi in self.queue) or any(qi.node == node for qi in self.delayed)
+        return self.state(node) in {QueueItemState.DELAYED, QueueItemState.QUEUED}
 
     def __len__(self):
-        return len(self.queue) + len(self.delayed)
+        return self.num_queued + self.num_delayed
 
     def copy(self) -> "RequestQueue":
         """
         :return: a copy of the request queue
         """
-        rq = RequestQueue(self.bandwidth_kbps, self.rtt_latency_ms, self.loss_prop)
-        rq.queue = [copy.copy(qi) for qi in self.queue]
-        rq.delayed = [copy.copy(qi) for qi in self.delayed]
-        rq.node_to_queue_item_map = {
-            **{node: copy.copy(qi) for (node, qi) in self.node_to_queue_item_map.items()},
-            **{qi.node: qi for qi in rq.queue},
-            **{qi.node: qi for qi in rq.delayed},
-        }
+        return self.fork()
+
+    def fork(self) -> "RequestQueue":
+        """
+        Returns a snapshot of the request queue that can be modified independently of this one. The
+        containers are copied, but the items and TCP states are shared until either queue modifies them
+
+        :return: the forked request queue
+        """
+        self.stats.forks += 1
+        rq = RequestQueue.__new__(RequestQueue)
+        rq.__dict__.update(self.__dict__)
+        rq.queue = list(self.queue)
+        rq.delayed = list(self.delayed)
+        rq.node_to_queue_item_map = dict(self.node_to_queue_item_map)
         rq.connected_origins = set(self.connected_origins)
-        rq.tcp_state = copy.deepcopy(self.tcp_state)
+        rq.tcp_state = dict(self.tcp_state)
+        rq.tcp_idle_since_ms = dict(self.tcp_idle_since_ms)
+        rq.queued_per_origin = dict(self.queued_per_origin)
+        # neither queue owns the existing items and TCP states anymore
+        self.owner, rq.owner = object(), object()
+        self.owned_tcp_states, rq.owned_tcp_states = set(), set()
         return rq
 
     @property
@@ -91,20 +196,34 @@ class RequestQueue:
         downloading files, but could be made more sophisticated by taking into account
         per-domain bandwidth limits.
         """
-        return self.link_bandwidth_bps / (len(self.queue) or 1)
+        return self.link_bandwidth_bps / (self.num_queued or 1)
 
     def add(self, node: Node):
         """ Adds an item to the queue for immediate download """
         self.add_with_delay(node, 0)
 
+    def state(self, node: Node) -> Optional[QueueItemState]:
+        """
+        :return: the state of the given node in the request queue, or None if it was never added
+                 (or has been removed)
+        """
+        queue_item = self.node_to_queue_item_map.get(node)
+        return queue_item.state if queue_item else None
+
     def remove(self, node: Node):
         """
         Removes the given node from the request queue
         :param node: the node to remove
         """
 
-        self.queue = [qi for qi in self.queue if qi.node != node]
-        self.delayed = [qi for qi in self.delayed if qi.node != node]
+        queue_item = self.node_to_queue_item_map.pop(node, None)
+        if queue_item is None:
+            return
+        if queue_item.state == QueueItemState.DELAYED:
+            self.num_delayed -= 1
+        elif queue_item.state == QueueItemState.QUEUED:
+            self._stop_download(queue_item)
+        # the item is discarded when it reaches the top of its heap
 
     def add_with_delay(self, node: Node, delay_ms: float, cached: bool = False):
         """
@@ -117,43 +236,96 @@ class RequestQueue:
         :param cached: Specifies if the given resource is cached and does not need to be downloaded
         """
 
-        domain = Url.parse(node.resource.url).domain
+        # replace the node if it is already scheduled
+        self.remove(node)
+
+        domain = node.domain
         if cached:
             delay_ms = max(0.0, delay_ms)
-            queue_item = QueueItem(node, 0, domain, delay_ms)
+            queue_item = QueueItem(node, 0, domain, self.elapsed_ms + delay_ms, self.owner)
         else:
-            num_rtts = self.tcp_state[domain].round_trips_needed_for_bytes(node.resource.size)
+            num_rtts = self.get_tcp_state(domain).round_trips_needed_for_bytes(node.resource.size)
             if domain not in self.connected_origins:
                 num_rtts += 1
 
             delay_ms = max(0.0, delay_ms + (num_rtts * self.rtt_latency_ms))
-            queue_item = QueueItem(node, node.resource.size, domain, delay_ms)
+            queue_item = QueueItem(node, node.resource.size, domain, self.elapsed_ms + delay_ms, self.owner)
 
         if delay_ms <= 0:
-            self.queue.append(queue_item)
+            self._start_download(queue_item, delay_ms)
         else:
-            self.delayed.append(queue_item)
+            self.num_delayed += 1
+            self._push(self.delayed, queue_item.ready_at_ms, queue_item)
         self.node_to_queue_item_map[node] = queue_item
 
+    def get_tcp_state(self, domain: str) -> TCPState:
+        """
+        Returns the TCPState for the given domain, creating it if it doesn't exist yet and
+        accounting for all of the time the domain has been idle since it last sent bytes
+        """
+        if domain not in self.tcp_state:
+            tcp_state = self.tcp_state[domain] = self.tcp_state_class(loss_prop=self.loss_prop)
+            self.owned_tcp_states.add(domain)
+        else:
+            tcp_state = self._own_tcp_state(domain)
+            tcp_state.add_time_since_last_byte(self.elapsed_ms - self.tcp_idle_since_ms[domain])
+        self.tcp_idle_since_ms[domain] = self.elapsed_ms
+        return tcp_state
+
     def estimated_completion_time(self, node: Node) -> Tuple[float, float]:
         """
-        Runs through a copy of the request queue and returns the relative time offset
-        at which the given node would have completed.
+        Computes the relative time offset at which the given node would complete, and the time it
+        would have spent downloading by then. It follows the same events as step(), but only advances
+        the clocks over the heap keys, so neither the queue nor its items and TCP states are copied
+        or modified, and it stops as soon as the node completes.
 
         :param node: The node to estimate the completion time of
         :return: 0 if the node is not in the request queue; the relative time offset
                  of completion otherwise
         """
 
-        if node not in self:
+        self.stats.completion_estimates += 1
+        target = self.node_to_queue_item_map.get(node)
+        if target is None or target.state == QueueItemState.DONE:
             return 0, 0
-        rq = self.copy()
+
+        queue, delayed = list(self.queue), list(self.delayed)
+        num_queued, num_delayed, num_pushed = self.num_queued, self.num_delayed, self.num_pushed
+        elapsed_ms, bytes_per_item = self.elapsed_ms, self.bytes_per_item
+        started_at_ms = target.started_at_ms
         total_time = 0
-        completed_nodes, step_ms = [], 0
-        while rq and node not in completed_nodes:
-            completed_nodes, step_ms = rq.step()
-            total_time += step_ms
-        return total_time, rq.time_spent_downloading(node)
+        while num_queued or num_delayed:
+            self._discard_removed(queue)
+            self._discard_removed(delayed)
+
+            if num_queued:
+                finish_at_bytes = queue[0][0]
+                time_ms_to_download = 1000 * (finish_at_bytes - bytes_per_item) / (self.link_bandwidth_bps / num_queued)
+                bytes_per_item = finish_at_bytes
+            else:
+                time_ms_to_download = delayed[0][0] - elapsed_ms
+            elapsed_ms += time_ms_to_download
+            total_time += time_ms_to_download
+
+            while queue and queue[0][0] <= bytes_per_item:
+                _, _, queue_item = heapq.heappop(queue)
+                if queue_item is target:
+                    return total_time, elapsed_ms - started_at_ms
+                if not self._is_removed(queue_item):
+                    num_queued -= 1
+
+            while delayed and delayed[0][0] - elapsed_ms < DELAY_EPSILON_MS:
+                _, _, queue_item = heapq.heappop(delayed)
+                if self._is_removed(queue_item):
+                    continue
+                if queue_item is target:
+                    started_at_ms = elapsed_ms
+                num_delayed -= 1
+                num_queued += 1
+                heapq.heappush(queue, (bytes_per_item + queue_item.size, num_pushed, queue_item))
+                num_pushed += 1
+
+        return total_time, elapsed_ms - started_at_ms
 
     def time_spent_downloading(self, node: Node) -> float:
         """
@@ -161,17 +333,23 @@ class RequestQueue:
         has not been scheduled to download, or has not downloaded any bytes yet
         :param node: The node to get the time spent downloading for
         """
-        if node not in self.node_to_queue_item_map:
+        queue_item = self.node_to_queue_item_map.get(node)
+        if queue_item is None or queue_item.state == QueueItemState.DELAYED:
             return 0
-        return self.node_to_queue_item_map[node].time_spent_downloading
+        if queue_item.state == QueueItemState.DONE:
+            return queue_item.completed_at_ms - queue_item.started_at_ms
+        return self.elapsed_ms - queue_item.started_at_ms
 
     def remaining_delay(self, node: Node) -> float:
         """
         Returns the delay ms left for a node before it starts downloading
         """
-        if node not in self.node_to_queue_item_map:
+        queue_item = self.node_to_queue_item_map.get(node)
+        if queue_item is None:
             return 0
-        return self.node_to_queue_item_map[node].delay_ms_left
+        if queue_item.state == QueueItemState.DELAYED:
+            return queue_item.ready_at_ms - self.elapsed_ms
+        return queue_item.delay_ms_left
 
     def step(self) -> Tuple[List[Node], float]:
         """
@@ -186,49 +364,103 @@ class RequestQueue:
         """
 
         # check if the queue is empty
-        if not self.queue and not self.delayed:
+        if not self.num_queued and not self.num_delayed:
             return [], 0.0
 
+        self.stats.steps += 1
+        self._discard_removed(self.queue)
+        self._discard_removed(self.delayed)
+
         # find the item with the least number of bytes left to download
-        if self.queue:
-            bytes_to_download = min(qi.bytes_left for qi in self.queue)
+        if self.num_queued:
+            finish_at_bytes = self.queue[0][0]
+            bytes_to_download = finish_at_bytes - self.bytes_per_item
             time_ms_to_download = 1000 * bytes_to_download / self.bandwidth
+            self.bytes_per_item = finish_at_bytes
 
         # OR, if the queue is empty, find the next delayed item to enqueue
         else:
-            time_ms_to_download = min(qi.delay_ms_left for qi in self.delayed)
+            time_ms_to_download = self.delayed[0][0] - self.elapsed_ms
             bytes_to_download = (time_ms_to_download * self.bandwidth) / 1000
 
-        # Reduce all delayed items by time_ms_to_download
-        for item in self.delayed:
-            item.delay_ms_left -= time_ms_to_download
-
-        # Reduce all queue elements by bytes_to_download
-        for item in self.queue:
-            item.bytes_left -= bytes_to_download
-            item.time_spent_downloading += time_ms_to_download
-
-        # Update the idle time for each TCP state
-        domains_downloaded_from = set(item.origin for item in self.queue)
-        for domain, tcp_state in self.tcp_state.items():
-            if domain in domains_downloaded_from:
-                tcp_state.add_bytes_sent(bytes_to_download)
-            else:
-                tcp_state.add_time_since_last_byte(time_ms_to_download)
-
-        # Find all delayed items that are ready to be queued
-        delayed_items_to_queue = [qi for qi in self.delayed if qi.delay_ms_left < 0.01]
-        # Find all queued items that have been completed and are ready for removal
-        completed_nodes = [qi.node for qi in self.queue if qi.bytes_left == 0]
-
-        # add origins for newly-queued items
-        for item in delayed_items_to_queue:
-            self.connected_origins.add(item.origin)
-
-        # update the delayed queue, removing items ready to be queued
-        self.delayed = [qi for qi in self.delayed if qi.delay_ms_left >= 0.01]
-        # update the queue, removing items that are done and adding delayed items ready to be queued
-        self.queue = [qi for qi in self.queue if qi.bytes_left > 0] + delayed_items_to_queue
+        self.elapsed_ms += time_ms_to_download
+
+        # Update the TCP state for each domain that downloaded bytes in this step. Idle domains are
+        # updated lazily in get_tcp_state
+        for domain in self.queued_per_origin:
+            if domain in self.tcp_state:
+                self._own_tcp_state(domain).add_bytes_sent(bytes_to_download)
+                self.tcp_idle_since_ms[domain] = self.elapsed_ms
+
+        # Remove all queued items that have been completed
+        completed_nodes = []
+        while self.queue and self.queue[0][0] <= self.bytes_per_item:
+            _, _, queue_item = heapq.heappop(self.queue)
+            if self._is_removed(queue_item):
+                continue
+            queue_item = self._own(queue_item)
+            queue_item.state = QueueItemState.DONE
+            queue_item.completed_at_ms = self.elapsed_ms
+            self._stop_download(queue_item)
+            completed_nodes.append(queue_item.node)
+
+        # Queue all delayed items that are ready, and add their origins
+        while self.delayed and self.delayed[0][0] - self.elapsed_ms < DELAY_EPSILON_MS:
+            _, _, queue_item = heapq.heappop(self.delayed)
+            if self._is_removed(queue_item):
+                continue
+            queue_item = self._own(queue_item)
+            self.num_delayed -= 1
+            self.connected_origins.add(queue_item.origin)
+            self._start_download(queue_item, queue_item.ready_at_ms - self.elapsed_ms)
 
         # return nodes that finished downloading and the total time took in this step
         return completed_nodes, time_ms_to_download
+
+    def _start_download(self, queue_item: QueueItem, delay_ms_left: float):
+        """ Moves the given item into the downloading heap """
+        queue_item.state = QueueItemState.QUEUED
+        queue_item.delay_ms_left = delay_ms_left
+        queue_item.started_at_ms = self.elapsed_ms
+        queue_item.finish_at_bytes = self.bytes_per_item + queue_item.size
+        self.num_queued += 1
+        self.queued_per_origin[queue_item.origin] = self.queued_per_origin.get(queue_item.origin, 0) + 1
+        self._push(self.queue, queue_item.finish_at_bytes, queue_item)
+
+    def _stop_download(self, queue_item: QueueItem):
+        """ Updates the download counters for an item leaving the downloading heap """
+        self.num_queued -= 1
+        self.queued_per_origin[queue_item.origin] -= 1
+        if not self.queued_per_origin[queue_item.origin]:
+            del self.queued_per_origin[queue_item.origin]
+
+    def _own(self, queue_item: QueueItem) -> QueueItem:
+        """ Returns the given item if this queue owns it, or else a copy of it that replaces the shared one """
+        if queue_item.owner is self.owner:
+            return queue_item
+        queue_item = queue_item.copy()
+        queue_item.owner = self.owner
+        self.node_to_queue_item_map[queue_item.node] = queue_item
+        return queue_item
+
+    def _own_tcp_state(self, domain: str) -> TCPState:
+        """ Returns the TCPState for the given domain, copying it first if it is shared with a fork """
+        if domain in self.owned_tcp_states:
+            return self.tcp_state[domain]
+        self.owned_tcp_states.add(domain)
+        tcp_state = self.tcp_state[domain] = self.tcp_state[domain].copy()
+        return tcp_state
+
+    def _is_removed(self, queue_item: QueueItem) -> bool:
+        """ Returns True if the given heap item has been removed or replaced """
+        return self.node_to_queue_item_map.get(queue_item.node) is not queue_item
+
+    def _push(self, heap: List[Tuple[float, int, QueueItem]], key: float, queue_item: QueueItem):
+        """ Pushes the given item onto the heap, breaking ties in insertion order """
+        heapq.heappush(heap, (key, self.num_pushed, queue_item))
+        self.num_pushed += 1
+
+    def _discard_removed(self, heap: List[Tuple[float, int, QueueItem]]):
+        """ Pops removed items off the top of the given heap """
+        while heap and self._is_removed(heap[0][2]):
+            heapq.heappop(heap)
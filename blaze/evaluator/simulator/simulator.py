@@ -3,47 +3,123 @@ This module defines the classes and methods to implement a way to simulate
 loading a webpage and simulating its page load time from a dependency graph
 """
 
+import concurrent.futures
 import copy
+import heapq
 import json
-from queue import PriorityQueue
-from typing import List, Optional, Set, Tuple
+import time
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import numpy as np
 
 from blaze.action.policy import Policy
 from blaze.config.environment import EnvironmentConfig, ResourceType
 from blaze.config.client import ClientEnvironment
-from blaze.logger import logger
+from blaze.logger import Level, logger
 
+from .baseline import BaselineResult, baseline_cache
+from .execution_graph import ExecutionGraph, get_execution_graph
 from .request_queue import Node, RequestQueue
+from .stats import SimulationStats
+from .tcp_state import CongestionModel
+
+
+class Checkpoint(NamedTuple):
+    """ A snapshot of the simulator state taken right before a node is dispatched """
+
+    pq: Tuple[Tuple[int, int], ...]
+    request_queue: RequestQueue
+    completed_nodes: Dict[Node, float]
+    pushed_nodes: Dict[Node, bool]
+    total_time_ms: float
+
+
+# maps each source URL in a policy to the URLs it pushes and preloads
+PolicySignature = Dict[str, Tuple[FrozenSet[str], FrozenSet[str]]]
+
+
+def get_policy_signature(policy: Optional[Policy]) -> PolicySignature:
+    """
+    Returns the push and preload URLs of each source URL in the given policy, which is all the Simulator
+    looks up in a policy
+    """
+    if not policy:
+        return {}
+    push = {source.url: frozenset(res.url for res in deps) for (source, deps) in policy.push if deps}
+    preload = {source.url: frozenset(res.url for res in deps) for (source, deps) in policy.preload if deps}
+    return {url: (push.get(url, frozenset()), preload.get(url, frozenset())) for url in {*push, *preload}}
 
 
-class Simulator:
+class BatchResult(NamedTuple):
+    """
+    The results of Simulator.simulate_batch. Each array is indexed by (policy, client environment,
+    cached set), and completion_ms additionally by the ExecutionGraph index of each resource, whose
+    URL is given by urls
+    """
+
+    plt_ms: np.ndarray
+    # the completion time of the last critical resource (NaN if no resources are marked critical)
+    aft_ms: np.ndarray
+    # the time at which each resource completed, including its execution time
+    completion_ms: np.ndarray
+    urls: List[str]
+
+
+class Simulator:  # pylint: disable=too-many-instance-attributes
     """
     The main class that simulates a web page load. It is initialized using an EnvironmentConfig,
     which specifies the har_resources (a flat, ordered list of resources recorded from
     blaze.chrome.devtools.capture_har or blaze.chrome.devtools.capture_har_in_replay_server that
     includes timing information about each request).
+
+    In incremental mode, the simulator checkpoints its state before each node is dispatched. The policy
+    is only looked up when the children of a node are scheduled, so when the simulator is run again in
+    the same client environment with a different policy, it resumes from the checkpoint of the first
+    node whose children are affected by the change instead of simulating the page from the start.
+
+    The congestion model selects how the TCP window of each origin evolves (see blaze.evaluator.simulator.tcp_state).
+    The execution graph is looked up by the environment config unless an existing graph of that config is given.
     """
 
-    def __init__(self, env_config: EnvironmentConfig):
+    def __init__(
+        self,
+        env_config: EnvironmentConfig,
+        incremental: bool = False,
+        congestion_model: CongestionModel = CongestionModel.RENO,
+        graph: Optional[ExecutionGraph] = None,
+    ):
         self.env_config = env_config
+        self.congestion_model = congestion_model
         self.log = logger.with_namespace("simulator")
 
+        self.graph: Optional[ExecutionGraph] = None
         self.root = None
         self.node_map = {}
         self.url_to_node_map = {}
-        self.create_execution_graph(env_config)
+        self.create_execution_graph(env_config, graph)
 
-        self.pq: Optional[PriorityQueue] = None
+        # a heap of (priority, node index) for the nodes left to process
+        self.pq: Optional[List[Tuple[int, int]]] = None
         self.request_queue: Optional[RequestQueue] = None
         self.completed_nodes = {}
         self.pushed_nodes = {}
         self.total_time_ms = 0
         self.cached_urls = set()
 
-        self.no_push: Optional[Simulator] = None
+        self.no_push: Optional[BaselineResult] = None
+        # the counters and phase times of the last simulation
+        self.stats = SimulationStats()
         self.client_env: Optional[ClientEnvironment] = None
         self.policy: Optional[Policy] = None
 
+        self.incremental = incremental
+        self.checkpoints: List[Checkpoint] = []
+        # maps each dispatched node to the index of the checkpoint taken right before its dispatch
+        self.dispatched: Dict[Node, int] = {}
+        # the client environment, cached URLs, and policy of the last completed incremental simulation
+        self.checkpoint_key: Optional[Tuple[ClientEnvironment, FrozenSet[str]]] = None
+        self.policy_signature: PolicySignature = {}
+
     def reset_simulation(
         self, client_env: ClientEnvironment, policy: Optional[Policy] = None, cached_urls: Optional[Set[str]] = None
     ):
@@ -55,8 +131,14 @@ class Simulator:
         :param cached_urls: the cached URLs to not download
         """
 
-        self.pq = PriorityQueue()
-        self.request_queue = RequestQueue(client_env.bandwidth, client_env.latency, client_env.loss)
+        self.pq = []
+        self.request_queue = RequestQueue(
+            client_env.bandwidth,
+            client_env.latency,
+            client_env.loss,
+            congestion_model=self.congestion_model,
+            stats=self.stats,
+        )
         self.completed_nodes = {}
         self.pushed_nodes = {}
         self.total_time_ms = 0
@@ -77,11 +159,12 @@ class Simulator:
         :param dry_run: Only return the list of resources to push with their delay
         """
 
+        verbose = self.log.is_enabled_for(Level.VERBOSE)
         push_resources = self.policy.push_set_for_resource(node.resource) if self.policy else []
         preload_resources = self.policy.preload_set_for_resource(node.resource) if self.policy else []
         dry_run_list = []
 
-        if push_resources and not dry_run:
+        if verbose and push_resources and not dry_run:
             self.log.verbose(
                 "push resources for resource",
                 resource=node.resource.url,
@@ -89,7 +172,7 @@ class Simulator:
             )
         for res in push_resources:
             push_node = self.url_to_node_map.get(res.url)
-            if push_node and push_node not in self.completed_nodes and push_node not in self.request_queue:
+            if push_node and self.request_queue.state(push_node) is None:
                 cached = push_node.resource.url in self.cached_urls
                 if cached:
                     continue
@@ -97,18 +180,20 @@ class Simulator:
                 if dry_run:
                     dry_run_list.append((push_node, push_delay))
                 else:
-                    self.pq.put((push_node.priority, push_node))
+                    heapq.heappush(self.pq, (push_node.priority, push_node.index))
                     self.request_queue.add_with_delay(push_node, push_delay)
                     self.pushed_nodes[push_node] = True
-                    self.log.verbose(
-                        "push resource",
-                        time=self.total_time_ms,
-                        delay=push_delay,
-                        source=node.resource.url,
-                        push=res.url,
-                    )
+                    self.stats.nodes_pushed += 1
+                    if verbose:
+                        self.log.verbose(
+                            "push resource",
+                            time=self.total_time_ms,
+                            delay=push_delay,
+                            source=node.resource.url,
+                            push=res.url,
+                        )
 
-        if preload_resources and not dry_run:
+        if verbose and preload_resources and not dry_run:
             self.log.verbose(
                 "preload resources for resource",
                 resource=node.resource.url,
@@ -116,7 +201,7 @@ class Simulator:
             )
         for res in preload_resources:
             preload_node = self.url_to_node_map.get(res.url)
-            if preload_node and preload_node not in self.completed_nodes and preload_node not in self.request_queue:
+            if preload_node and self.request_queue.state(preload_node) is None:
                 # Same delay as parent, but adds an extra RTT because the browser needs
                 # to explicitly make a request for it
                 cached = preload_node.resource.url in self.cached_urls
@@ -126,16 +211,18 @@ class Simulator:
                 if dry_run:
                     dry_run_list.append((preload_node, preload_delay))
                 else:
-                    self.pq.put((preload_node.priority, preload_node))
+                    heapq.heappush(self.pq, (preload_node.priority, preload_node.index))
                     self.request_queue.add_with_delay(preload_node, preload_delay)
                     self.pushed_nodes[preload_node] = True
-                    self.log.verbose(
-                        "push resource",
-                        time=self.total_time_ms,
-                        delay=delay + preload_node.resource.time_to_first_byte_ms,
-                        source=node.resource.url,
-                        push=res.url,
-                    )
+                    self.stats.nodes_preloaded += 1
+                    if verbose:
+                        self.log.verbose(
+                            "push resource",
+                            time=self.total_time_ms,
+                            delay=delay + preload_node.resource.time_to_first_byte_ms,
+                            source=node.resource.url,
+                            push=res.url,
+                        )
 
         return dry_run_list if dry_run else None
 
@@ -144,12 +231,14 @@ class Simulator:
         Steps through the request queue once and updates the simulator state based on the results
         """
 
+        verbose = self.log.is_enabled_for(Level.VERBOSE)
         completed_this_step, time_ms_this_step = self.request_queue.step()
         self.total_time_ms += time_ms_this_step
 
         for node in completed_this_step:
             self.completed_nodes[node] = self.total_time_ms + node.resource.execution_ms
-            self.log.verbose("resource completed", resource=node.resource.url, time=self.completed_nodes[node])
+            if verbose:
+                self.log.verbose("resource completed", resource=node.resource.url, time=self.completed_nodes[node])
 
     def schedule_child_requests(self, parent: Node, dry_run=False) -> Optional[List[Tuple[Node, float]]]:
         """
@@ -159,6 +248,7 @@ class Simulator:
         :param dry_run: Only return the list of nodes and delays instead of actually scheduling them
         """
 
+        verbose = self.log.is_enabled_for(Level.VERBOSE)
         fetch_delay_correction = 0
         execution_delay = 0
         last_execution_delay = 0
@@ -186,9 +276,9 @@ class Simulator:
                 # collect the requests for the whole level, schedule them, and estimate remaining download time
                 if not dry_run:
                     nodes_to_schedule = self.schedule_child_requests(parent, dry_run=True)
-                    rq = self.request_queue.copy()
+                    rq = self.request_queue.fork()
                     for (node, delay) in nodes_to_schedule:
-                        if node not in rq and node not in self.completed_nodes:
+                        if rq.state(node) is None:
                             rq.add_with_delay(node, delay)
                     (time_til_complete, time_remaining_to_download) = rq.estimated_completion_time(child)
                     remaining_delay_before_download = time_til_complete - time_remaining_to_download
@@ -198,7 +288,7 @@ class Simulator:
                     )
                     remaining_delay_before_download = self.request_queue.remaining_delay(child)
 
-                normal_time_spent_downloading = self.no_push.request_queue.time_spent_downloading(child)
+                normal_time_spent_downloading = float(self.no_push.download_ms[child.index])
 
                 child_fetch_delay_correction = 0
                 # case 1: pushed resource was partially downloaded at the point when this resource would have downloaded
@@ -221,7 +311,7 @@ class Simulator:
                 # are still taken into account
                 if child.resource.type in {ResourceType.SCRIPT, ResourceType.CSS}:
                     fetch_delay_correction += child_fetch_delay_correction
-                    if not dry_run:
+                    if verbose and not dry_run:
                         self.log.verbose(
                             "correcting fetch delay",
                             parent=parent.resource.url,
@@ -241,7 +331,7 @@ class Simulator:
                 execution_delay += child.resource.execution_ms
                 last_execution_delay = child.resource.execution_ms
 
-            if child not in self.completed_nodes and child not in self.request_queue:
+            if self.request_queue.state(child) is None:
                 cached = child.resource.url in self.cached_urls
                 if dry_run:
                     if not cached:
@@ -252,20 +342,22 @@ class Simulator:
                         )
                     )
                 else:
-                    self.log.verbose(
-                        "scheduled resource",
-                        resource=child.resource.url,
-                        parent=parent.resource.url,
-                        delay=child_delay,
-                        ttfb=child.resource.time_to_first_byte_ms,
-                        fetch_delay=child.resource.fetch_delay_ms,
-                        execution=child.resource.execution_ms,
-                        execution_delay=execution_delay,
-                        last_execution_delay=last_execution_delay,
-                        total_time=self.total_time_ms,
-                    )
-                    self.pq.put((child.priority, child))
+                    if verbose:
+                        self.log.verbose(
+                            "scheduled resource",
+                            resource=child.resource.url,
+                            parent=parent.resource.url,
+                            delay=child_delay,
+                            ttfb=child.resource.time_to_first_byte_ms,
+                            fetch_delay=child.resource.fetch_delay_ms,
+                            execution=child.resource.execution_ms,
+                            execution_delay=execution_delay,
+                            last_execution_delay=last_execution_delay,
+                            total_time=self.total_time_ms,
+                        )
+                    heapq.heappush(self.pq, (child.priority, child.index))
                     self.request_queue.add_with_delay(child, child_delay, cached=cached)
+                    self.stats.nodes_scheduled += 1
                     self.schedule_pushed_and_preloaded_resources(
                         child, child_delay - child.resource.time_to_first_byte_ms
                     )
@@ -285,33 +377,63 @@ class Simulator:
 
         :param client_env: The client environment to simulate
         :param policy: The push/preload policy to simulate
-        :return: The predicted page load time in milliseconds
+        :return: The predicted page load time in milliseconds. The work done is recorded in self.stats
         """
-        self.log.verbose("simulating page load with client environment", **client_env._asdict())
+        self.stats = SimulationStats()
+        start = time.perf_counter()
+        verbose = self.log.is_enabled_for(Level.VERBOSE)
+        if verbose:
+            self.log.verbose("simulating page load with client environment", **client_env._asdict())
+        policy_signature = get_policy_signature(policy) if self.incremental else {}
+        checkpoint_index = self.find_checkpoint(client_env, policy_signature, cached_urls) if self.incremental else None
+        self.checkpoint_key = None
         self.reset_simulation(client_env, policy=policy, cached_urls=cached_urls)
 
         if policy:
             # First simulate it without the policy to comparing timing information
-            self.no_push = Simulator(self.env_config)
-            self.no_push.log.set_silence(True)
-            self.no_push.simulate_load_time(client_env)
-
-            self.log.verbose("simulating page load with policy:")
-            self.log.verbose(json.dumps(policy.as_dict, indent=4))
-
-        # start the initial item
-        self.pq.put((self.root.priority, self.root))
-        self.request_queue.add_with_delay(self.root, self.root.resource.time_to_first_byte_ms)
-
-        # schedule push resources for the root
-        self.schedule_pushed_and_preloaded_resources(self.root, self.root.resource.time_to_first_byte_ms)
+            baseline_start = time.perf_counter()
+            self.no_push = self.simulate_baseline(client_env)
+            self.stats.add_phase_time("baseline", 1000 * (time.perf_counter() - baseline_start))
+
+            if verbose:
+                self.log.verbose("simulating page load with policy:")
+                self.log.verbose(json.dumps(policy.as_dict, indent=4))
+
+        if checkpoint_index is not None:
+            if verbose:
+                self.log.verbose("resuming simulation from checkpoint", checkpoint=checkpoint_index)
+            self.restore_checkpoint(checkpoint_index)
+        else:
+            self.checkpoints, self.dispatched = [], {}
+            # start the initial item
+            heapq.heappush(self.pq, (self.root.priority, self.root.index))
+            self.request_queue.add_with_delay(self.root, self.root.resource.time_to_first_byte_ms)
+
+            # schedule push resources for the root
+            self.schedule_pushed_and_preloaded_resources(self.root, self.root.resource.time_to_first_byte_ms)
+        step_start = time.perf_counter()
+        self.stats.add_phase_time("setup", 1000 * (step_start - start) - self.stats.phase_ms["baseline"])
 
         # process all subsequent requests
-        while not self.pq.empty():
-            _, curr_node = self.pq.get()
+        while self.pq:
+            curr_node = self.graph.nodes[self.pq[0][1]]
+            # only the dispatch of a node with children looks up the policy, so only those need a checkpoint
+            if self.incremental and curr_node.children:
+                self.save_checkpoint()
+                self.dispatched[curr_node] = len(self.checkpoints) - 1
+            heapq.heappop(self.pq)
             while curr_node not in self.completed_nodes:
                 self.step_request_queue()
+            schedule_start = time.perf_counter()
             self.schedule_child_requests(curr_node)
+            schedule_end = time.perf_counter()
+            self.stats.add_phase_time("step", 1000 * (schedule_start - step_start))
+            self.stats.add_phase_time("schedule", 1000 * (schedule_end - schedule_start))
+            step_start = schedule_end
+
+        if self.incremental:
+            self.checkpoint_key = (client_env, frozenset(self.cached_urls))
+            self.policy_signature = policy_signature
 
         if use_aft:
             critical_nodes = [node for node in self.node_map.values() if node.resource.critical]
@@ -320,6 +442,164 @@ class Simulator:
             self.log.warn("requested speed index, but no nodes marked `critical` found")
         return self.completion_time()
 
+    def save_checkpoint(self):
+        """
+        Saves a snapshot of the current simulator state. The request queue is forked, so the snapshot
+        only costs the items that change afterwards
+        """
+        self.stats.checkpoints_saved += 1
+        self.checkpoints.append(
+            Checkpoint(
+                pq=tuple(self.pq),
+                request_queue=self.request_queue.fork(),
+                completed_nodes=dict(self.completed_nodes),
+                pushed_nodes=dict(self.pushed_nodes),
+                total_time_ms=self.total_time_ms,
+            )
+        )
+
+    def restore_checkpoint(self, index: int):
+        """
+        Restores the simulator state from the given checkpoint and discards all later checkpoints,
+        which the simulation will take again as it resumes
+
+        :param index: The index of the checkpoint to restore
+        """
+        checkpoint = self.checkpoints[index]
+        del self.checkpoints[index:]
+        self.dispatched = {node: i for (node, i) in self.dispatched.items() if i < index}
+
+        self.pq = list(checkpoint.pq)
+        self.request_queue = checkpoint.request_queue.fork()
+        self.request_queue.stats = self.stats
+        self.stats.checkpoints_restored += 1
+        self.completed_nodes = dict(checkpoint.completed_nodes)
+        self.pushed_nodes = dict(checkpoint.pushed_nodes)
+        self.total_time_ms = checkpoint.total_time_ms
+
+    def find_checkpoint(
+        self, client_env: ClientEnvironment, policy_signature: PolicySignature, cached_urls: Optional[Set[str]]
+    ) -> Optional[int]:
+        """
+        Finds the latest checkpoint of the last simulation from which the simulation with the given
+        parameters can resume. The push and preload sets of a resource are only looked up when its parent
+        dispatches it, so the earliest affected checkpoint is the one taken before the dispatch of the
+        first parent of a resource whose push or preload set changed.
+
+        :param client_env: The client environment to simulate
+        :param policy_signature: The push and preload URLs of each source URL in the policy to simulate
+        :param cached_urls: The cached URLs to not download
+
+        :return: the index of the checkpoint to resume from, or None if the simulation must start over
+        """
+        if not self.checkpoints or self.checkpoint_key != (client_env, frozenset(cached_urls or ())):
+            return None
+
+        changed_urls = {
+            url
+            for url in {*policy_signature, *self.policy_signature}
+            if policy_signature.get(url) != self.policy_signature.get(url)
+        }
+
+        checkpoint_index = len(self.checkpoints) - 1
+        for url in changed_urls:
+            for node in self.graph.url_to_nodes.get(url, []):
+                # the push and preload sets of the root are looked up before the first checkpoint
+                if node.parent is None or node.parent not in self.dispatched:
+                    return None
+                checkpoint_index = min(checkpoint_index, self.dispatched[node.parent])
+        return checkpoint_index
+
+    def simulate_batch(
+        self,
+        policies: Sequence[Optional[Policy]],
+        client_envs: Sequence[ClientEnvironment],
+        cached_sets: Optional[Sequence[Optional[Set[str]]]] = None,
+        max_workers: int = 0,
+    ) -> BatchResult:
+        """
+        Simulates the page load for every combination of the given policies, client environments, and
+        sets of cached URLs. All simulations share the execution graph and the baseline of each client
+        environment and cached set; a None (or empty) policy simulates the baseline itself.
+
+        :param policies: The push/preload policies to simulate
+        :param client_envs: The client environments to simulate
+        :param cached_sets: The sets of cached URLs to simulate (defaults to a cold cache only)
+        :param max_workers: The number of processes to fan the simulations out to, one (client environment,
+                            cached set) pair at a time. The simulations run in this process if it is 0
+        :return: The PLT, AFT, and per-resource completion times of every simulation
+        """
+        cached_sets = cached_sets or [None]
+        shape = (len(policies), len(client_envs), len(cached_sets))
+        plt_ms = np.zeros(shape)
+        aft_ms = np.zeros(shape)
+        completion_ms = np.zeros((*shape, len(self.graph)))
+
+        pairs = [(i, j) for i in range(len(client_envs)) for j in range(len(cached_sets))]
+        if max_workers > 0:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as pool:
+                futures = [
+                    pool.submit(
+                        _simulate_policies,
+                        self.env_config,
+                        policies,
+                        client_envs[i],
+                        cached_sets[j],
+                        self.congestion_model,
+                    )
+                    for (i, j) in pairs
+                ]
+                results = [future.result() for future in futures]
+        else:
+            results = [
+                _simulate_policies(self.env_config, policies, client_envs[i], cached_sets[j], self.congestion_model)
+                for (i, j) in pairs
+            ]
+
+        for ((i, j), (plt, aft, completion)) in zip(pairs, results):
+            plt_ms[:, i, j], aft_ms[:, i, j], completion_ms[:, i, j] = plt, aft, completion
+        return BatchResult(
+            plt_ms=plt_ms, aft_ms=aft_ms, completion_ms=completion_ms, urls=[n.resource.url for n in self.graph.nodes]
+        )
+
+    def simulate_baseline(
+        self, client_env: ClientEnvironment, cached_urls: Optional[Set[str]] = None
+    ) -> BaselineResult:
+        """
+        Simulates the page load without any push policy in the given client environment. The result is
+        cached per execution graph, client environment, and set of cached URLs, so the baseline is only
+        simulated once for all the policies evaluated in the same environment
+
+        :param client_env: The client environment to simulate
+        :param cached_urls: The cached URLs to not download
+        :return: The completion and download times of every node in the page load
+        """
+        cached_urls = frozenset(cached_urls or ())
+        result = baseline_cache.get(self.graph, client_env, cached_urls, self.congestion_model)
+        if result is not None:
+            return result
+
+        # simulate on this graph rather than the cached one, since nodes are compared by identity and the
+        # cached graph may have been evicted and rebuilt since this simulator was created
+        no_push = Simulator(self.env_config, congestion_model=self.congestion_model, graph=self.graph)
+        no_push.log.set_silence(True)
+        plt_ms = no_push.simulate_load_time(client_env, cached_urls=set(cached_urls))
+
+        completion_ms = np.full(len(no_push.graph), np.nan)
+        download_ms = np.zeros(len(no_push.graph))
+        for node in no_push.graph.nodes:
+            if node in no_push.completed_nodes:
+                completion_ms[node.index] = no_push.completed_nodes[node]
+            download_ms[node.index] = no_push.request_queue.time_spent_downloading(node)
+        critical = completion_ms[self.graph.critical]
+        aft_ms = float(np.max(critical)) if len(critical) > 0 else None
+        for array in (completion_ms, download_ms):
+            array.setflags(write=False)
+
+        result = BaselineResult(completion_ms=completion_ms, download_ms=download_ms, plt_ms=plt_ms, aft_ms=aft_ms)
+        baseline_cache.put(self.graph, client_env, cached_urls, result, self.congestion_model)
+        return result
+
     def completion_time(self, url: Optional[str] = None) -> float:
         """
         Computes the completion time up until the given URL, or until the last
@@ -332,35 +612,20 @@ class Simulator:
             return max(self.completed_nodes.values())
         return self.completed_nodes[self.url_to_node_map[url]]
 
-    def create_execution_graph(self, env_config: EnvironmentConfig):
+    def create_execution_graph(self, env_config: EnvironmentConfig, graph: Optional[ExecutionGraph] = None):
         """
-        Creates the execution graph from the environment config
+        Loads the execution graph for the environment config. The graph is built once per
+        EnvironmentConfig and shared between all simulators of that config
 
         :param env_config: The environment resources to consider
-        :return: The root node of the execution graph
+        :param graph: An existing execution graph of the environment config to use instead of the cached one
         """
 
-        # create a map of Nodes, mapping their order (basically their ID) to a Node for that resource
-        res_list = sorted(env_config.har_resources, key=lambda r: r.order)
-        self.node_map = {
-            res.order: Node(resource=res, priority=res.order, children=[]) for res in res_list if res.order == 0
-        }
-
+        self.graph = graph if graph is not None else get_execution_graph(env_config)
         # The root is the node corresponding to the 0th order
-        self.root = self.node_map.get(0)
-
-        # for each resource, unless it's the start resource, add it as a child of its initiator
-        for res in res_list:
-            if res != self.root.resource:
-                self.node_map[res.order] = Node(
-                    resource=res, priority=res.order, children=[], parent=self.node_map.get(res.initiator, None)
-                )
-                self.node_map[res.initiator].children.append(self.node_map[res.order])
-
-        # sort each child list by its order
-        self.url_to_node_map = {node.resource.url: node for node in self.node_map.values()}
-        for node in self.node_map.values():
-            node.children.sort(key=lambda n: n.resource.order)
+        self.root = self.graph.root
+        self.node_map = self.graph.order_to_node
+        self.url_to_node_map = self.graph.url_to_node
 
     def print_execution_map(self):
         """
@@ -383,3 +648,34 @@ class Simulator:
                 recursive_print(next_node, depth + 1)
 
         recursive_print(self.root)
+
+
+def _simulate_policies(
+    env_config: EnvironmentConfig,
+    policies: Sequence[Optional[Policy]],
+    client_env: ClientEnvironment,
+    cached_urls: Optional[Set[str]],
+    congestion_model: CongestionModel = CongestionModel.RENO,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Simulates each policy in the given client environment and cached set for Simulator.simulate_batch
+
+    :return: the PLT, AFT, and per-resource completion times for each policy
+    """
+    simulator = Simulator(env_config, congestion_model=congestion_model)
+    simulator.log.set_silence(True)
+    baseline = simulator.simulate_baseline(client_env, cached_urls)
+    critical = simulator.graph.critical
+
+    plt_ms = np.zeros(len(policies))
+    aft_ms = np.zeros(len(policies))
+    completion_ms = np.zeros((len(policies), len(simulator.graph)))
+    for k, policy in enumerate(policies):
+        if policy:
+            plt_ms[k] = simulator.simulate_load_time(client_env, policy=policy, cached_urls=cached_urls)
+            completion_ms[k] = [simulator.completed_nodes.get(node, np.nan) for node in simulator.graph.nodes]
+        else:
+            plt_ms[k] = baseline.plt_ms
+            completion_ms[k] = baseline.completion_ms
+        aft_ms[k] = np.max(completion_ms[k][critical]) if critical.any() else np.nan
+    return plt_ms, aft_ms, completion_ms
@@ -0,0 +1,73 @@
+"""
+This module defines SimulationStats, the counters and per-phase wall times collected while
+simulating a page load
+"""
+
+from typing import Dict, Union
+
+# the phases of Simulator.simulate_load_time that are timed: resetting the simulator (or restoring a
+# checkpoint), simulating the baseline without a policy, stepping the request queue until each node
+# completes (including saving checkpoints), and scheduling the children of each node
+PHASES = ("setup", "baseline", "step", "schedule")
+
+
+class SimulationStats:  # pylint: disable=too-many-instance-attributes
+    """
+    Counts the work done by a Simulator and its RequestQueue in a single simulation, and the wall time
+    spent in each phase. A RequestQueue shares its stats with its forks, so the work done by the
+    what-if estimates of pushed resources is included in the counters
+    """
+
+    __slots__ = (
+        "steps",
+        "forks",
+        "completion_estimates",
+        "nodes_scheduled",
+        "nodes_pushed",
+        "nodes_preloaded",
+        "checkpoints_saved",
+        "checkpoints_restored",
+        "phase_ms",
+    )
+
+    def __init__(self):
+        # RequestQueue counters
+        self.steps = 0
+        self.forks = 0
+        self.completion_estimates = 0
+        # Simulator counters
+        self.nodes_scheduled = 0
+        self.nodes_pushed = 0
+        self.nodes_preloaded = 0
+        self.checkpoints_saved = 0
+        self.checkpoints_restored = 0
+        self.phase_ms: Dict[str, float] = {phase: 0.0 for phase in PHASES}
+
+    @property
+    def total_ms(self) -> float:
+        """ Returns the total wall time spent in all phases """
+        return sum(self.phase_ms.values())
+
+    def add_phase_time(self, phase: str, time_ms: float):
+        """ Adds the given wall time in milliseconds to the given phase """
+        self.phase_ms[phase] += time_ms
+
+    def merge(self, other: "SimulationStats") -> "SimulationStats":
+        """ Adds the counters and phase times of the given stats to these stats, and returns these stats """
+        for attr in self.__slots__:
+            if attr != "phase_ms":
+                setattr(self, attr, getattr(self, attr) + getattr(other, attr))
+        for (phase, time_ms) in other.phase_ms.items():
+            self.phase_ms[phase] = self.phase_ms.get(phase, 0.0) + time_ms
+        return self
+
+    def as_dict(self) -> Dict[str, Union[int, float]]:
+        """ Returns the counters and phase times as a flat dictionary """
+        stats = {attr: getattr(self, attr) for attr in self.__slots__ if attr != "phase_ms"}
+        stats.update({f"{phase}_ms": time_ms for (phase, time_ms) in self.phase_ms.items()})
+        stats["total_ms"] = self.total_ms
+        return stats
+
+    def __repr__(self):
+        fields = ", ".join(f"{k}={v}" for (k, v) in self.as_dict().items())
+        return f"SimulationStats({fields})"
@@ -1,36 +1,63 @@
 """
 This module defines the TCPState class, which is a rudimentary simulation of TCP window
-dynamics
+dynamics, and the congestion models that can be simulated with it
 """
 
+import enum
 import math
+from typing import Type
 
 INITIAL_WINDOW_SIZE = 10
 MTU_BYTES = 1500
 RTO_MS = 200.0
+# the factor by which BBR grows its sending rate every round trip during startup (2/ln 2)
+BBR_STARTUP_GAIN = 2 / math.log(2)
+
+
+class CongestionModel(enum.IntEnum):
+    """ CongestionModel defines the congestion control algorithm simulated for each TCP connection """
+
+    RENO = 0
+    BBR = 1
 
 
 class TCPState:
     """
     Keeps track of the TCP connection state, in particular the window size (to compute the number
     of bytes that can be sent in a single round trip, and how many round trips are needed for some
-    payload) and the time since last transmission (affects the shrinkage rate of the window)
+    payload) and the time since last transmission (affects the shrinkage rate of the window).
+
+    This models Reno-like slow start: the window doubles every round trip and is halved for every
+    RTO_MS the connection is idle, down to the initial window.
     """
 
+    __slots__ = ("loss_prop", "total_packets", "cwnd", "time_since_last_byte")
+
     def __init__(self, loss_prop: float = 0.0, cwnd: int = INITIAL_WINDOW_SIZE, time_since_last_byte: int = 0):
         self.loss_prop = loss_prop
         self.total_packets = 0
         self.cwnd = cwnd
         self.time_since_last_byte = time_since_last_byte
 
+    def copy(self) -> "TCPState":
+        """
+        :return: a copy of the TCP state
+        """
+        tcp_state = type(self)(loss_prop=self.loss_prop, cwnd=self.cwnd, time_since_last_byte=self.time_since_last_byte)
+        tcp_state.total_packets = self.total_packets
+        return tcp_state
+
     @property
     def window_size(self) -> int:
         """
         :return: the current since of the window in number of packets
         """
-        while self.time_since_last_byte >= RTO_MS:
-            self.cwnd = max(INITIAL_WINDOW_SIZE, self.cwnd // 2)
-            self.time_since_last_byte -= RTO_MS
+        if self.time_since_last_byte >= RTO_MS:
+            # halving once per RTO_MS is a right shift, and once the window reaches the initial
+            # window it stays there
+            num_timeouts = int(self.time_since_last_byte // RTO_MS)
+            self.cwnd = max(INITIAL_WINDOW_SIZE, int(self.cwnd) >> num_timeouts)
+            self.time_since_last_byte -= num_timeouts * RTO_MS
         return self.cwnd
 
     @property
@@ -63,13 +90,11 @@ class TCPState:
         :param bytes_to_send: The number of bytes to send
         :return: the whole number of round trips necessary to send the bytes
         """
-        window_size = self.window_size
-        round_trips = 0
-        while bytes_to_send > 0:
-            bytes_to_send -= window_size * MTU_BYTES
-            window_size *= 2
-            round_trips += 1
-        return round_trips
+        if bytes_to_send <= 0:
+            return 0
+        # r round trips send (2^r - 1) windows, so r is the bit length of the number of windows needed
+        windows = int(-(-bytes_to_send // (self.window_size * MTU_BYTES)))
+        return windows.bit_length()
 
     def add_time_since_last_byte(self, time_ms: float):
         """
@@ -91,3 +116,40 @@ class TCPState:
         #     multiple calls, then add them to cwnd when the next window_size is computed.
         self.time_since_last_byte = 0
         self.cwnd += math.ceil(bytes_sent / MTU_BYTES)
+
+
+class BBRTCPState(TCPState):
+    """
+    A TCPState that models BBR-like pacing: during startup the sending rate grows by BBR_STARTUP_GAIN
+    every round trip, and since BBR paces at its bandwidth estimate after an idle period instead of
+    restarting slow start, the window does not shrink while the connection is idle
+    """
+
+    __slots__ = ()
+
+    @property
+    def window_size(self) -> int:
+        """
+        :return: the current since of the window in number of packets
+        """
+        return self.cwnd
+
+    def round_trips_needed_for_bytes(self, bytes_to_send: int) -> int:
+        """
+        Computes the number of round trips needed to send the given number of bytes, growing the
+        window by BBR_STARTUP_GAIN every round trip
+
+        :param bytes_to_send: The number of bytes to send
+        :return: the whole number of round trips necessary to send the bytes
+        """
+        if bytes_to_send <= 0:
+            return 0
+        # r round trips send w * (g^r - 1) / (g - 1) packets
+        packets = math.ceil(bytes_to_send / MTU_BYTES)
+        ratio = packets * (BBR_STARTUP_GAIN - 1) / self.window_size + 1
+        return max(1, math.ceil(math.log(ratio, BBR_STARTUP_GAIN) - 1e-9))
+
+
+def get_tcp_state_class(congestion_model: CongestionModel) -> Type[TCPState]:
+    """ Returns the TCPState class that simulates the given congestion model """
+    return {CongestionModel.RENO: TCPState, CongestionModel.BBR: BBRTCPState}[congestion_model]
@@ -0,0 +1,305 @@
+"""
+This module defines the VectorRequestQueue, which simulates the network link of many client
+environments at once
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+from .execution_graph import ExecutionGraph
+from .request_queue import DELAY_EPSILON_MS, QueueItemState
+from .tcp_state import INITIAL_WINDOW_SIZE, MTU_BYTES, RTO_MS
+
+# the state of a node that has not been added to the queue
+NOT_ADDED = -1
+
+
+class VectorRequestQueue:  # pylint: disable=too-many-instance-attributes
+    """
+    VectorRequestQueue simulates the same requests as RequestQueue in N client environments at once.
+    The simulator makes the same scheduling decisions in every client environment (which nodes are added,
+    and in which order, only depends on the execution graph and the policy), so only the timing of each
+    request differs between environments.
+
+    The queue keeps the same virtual clocks as RequestQueue, as arrays with one entry per environment,
+    and the state of each item as (environment, node) arrays indexed by ExecutionGraph node index. The
+    TCP state of each origin is kept as (environment, domain) arrays indexed by ExecutionGraph domain id.
+    Each step advances the environments selected by a mask to their next event.
+
+    The byte clock at which each item finishes is infinite unless it is queued, and the time at which it is
+    ready is infinite unless it is delayed, so that the next event of each environment is a plain minimum.
+    Steps only touch the rows of the selected environments and the columns of the nodes that are not done
+    everywhere, since most steps only advance the few environments that are waiting for the current node.
+    """
+
+    def __init__(self, graph: ExecutionGraph, bandwidth_kbps: np.ndarray, rtt_latency_ms: np.ndarray):
+        num_envs, num_nodes, num_domains = len(bandwidth_kbps), len(graph), len(graph.domains)
+        self.graph = graph
+        # convert kilobits per second (kbps) to bytes per second (Bps)
+        self.link_bandwidth_bps = np.asarray(bandwidth_kbps) * (1000 / 8)
+        self.rtt_latency_ms = np.asarray(rtt_latency_ms)
+
+        self.elapsed_ms = np.zeros(num_envs)
+        self.bytes_per_item = np.zeros(num_envs)
+        self.added = np.zeros(num_nodes, dtype=np.bool_)
+        # the nodes that have been added but are not done in every environment
+        self.pending = np.zeros(num_nodes, dtype=np.bool_)
+        self.size = np.zeros(num_nodes, dtype=np.int64)
+        # the number of environments in which each node is done
+        self.num_done = np.zeros(num_nodes, dtype=np.int64)
+        self.state = np.full((num_envs, num_nodes), NOT_ADDED, dtype=np.int8)
+        self.ready_at_ms = np.full((num_envs, num_nodes), np.inf)
+        self.finish_at_bytes = np.full((num_envs, num_nodes), np.inf)
+        self.delay_ms_left = np.zeros((num_envs, num_nodes))
+        self.started_at_ms = np.zeros((num_envs, num_nodes))
+        self.completed_at_ms = np.zeros((num_envs, num_nodes))
+        self.num_queued = np.zeros(num_envs, dtype=np.int64)
+        self.queued_per_origin = np.zeros((num_envs, num_domains), dtype=np.int64)
+
+        self.connected_origins = np.zeros((num_envs, num_domains), dtype=np.bool_)
+        self.has_tcp_state = np.zeros((num_envs, num_domains), dtype=np.bool_)
+        self.cwnd = np.zeros((num_envs, num_domains), dtype=np.int64)
+        self.time_since_last_byte = np.zeros((num_envs, num_domains))
+        self.tcp_idle_since_ms = np.zeros((num_envs, num_domains))
+
+    def __len__(self):
+        return len(self.elapsed_ms)
+
+    def fork(self) -> "VectorRequestQueue":
+        """
+        :return: a copy of the request queue that can be modified independently of this one
+        """
+        rq = VectorRequestQueue.__new__(VectorRequestQueue)
+        for (attr, value) in self.__dict__.items():
+            setattr(rq, attr, value.copy() if isinstance(value, np.ndarray) else value)
+        return rq
+
+    def is_added(self, index: int) -> bool:
+        """
+        :return: True if the node with the given index was added to the queue
+        """
+        return bool(self.added[index])
+
+    def add_with_delay(self, index: int, delay_ms: np.ndarray, cached: bool = False):
+        """
+        Adds the node with the given index in every environment, but does not start it until the delay
+        has occurred. Like RequestQueue.add_with_delay, it adds the round trips needed to download the
+        node, plus one to connect to its origin if needed.
+
+        :param index: The index of the node to add to the request queue
+        :param delay_ms: The milliseconds to delay the request in each environment (not including RTT)
+        :param cached: Specifies if the given resource is cached and does not need to be downloaded
+        """
+        domain = self.graph.domain_ids[index]
+        if cached:
+            delay_ms = np.maximum(0.0, delay_ms)
+            self.size[index] = 0
+        else:
+            size = self.graph.sizes[index]
+            num_rtts = self._round_trips_needed_for_bytes(domain, size)
+            num_rtts += ~self.connected_origins[:, domain]
+            delay_ms = np.maximum(0.0, delay_ms + (num_rtts * self.rtt_latency_ms))
+            self.size[index] = size
+
+        self.added[index] = True
+        self.pending[index] = True
+        self.ready_at_ms[:, index] = self.elapsed_ms + delay_ms
+        self.state[:, index] = QueueItemState.DELAYED
+        (envs,) = np.nonzero(delay_ms <= 0)
+        self._start_download(envs, np.full(len(envs), index), delay_ms[envs])
+
+    def time_spent_downloading(self, index: int) -> np.ndarray:
+        """
+        Returns the ms each environment spent downloading the given node, like
+        RequestQueue.time_spent_downloading
+        """
+        state = self.state[:, index]
+        return np.where(
+            state == QueueItemState.DONE,
+            self.completed_at_ms[:, index] - self.started_at_ms[:, index],
+            np.where(state == QueueItemState.QUEUED, self.elapsed_ms - self.started_at_ms[:, index], 0.0),
+        )
+
+    def remaining_delay(self, index: int) -> np.ndarray:
+        """
+        Returns the delay ms left in each environment for a node before it starts downloading
+        """
+        state = self.state[:, index]
+        return np.where(
+            state == QueueItemState.DELAYED,
+            self.ready_at_ms[:, index] - self.elapsed_ms,
+            np.where(state == NOT_ADDED, 0.0, self.delay_ms_left[:, index]),
+        )
+
+    def estimated_completion_time(self, index: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Computes the relative time offset at which the given node would complete in each environment,
+        and the time it would have spent downloading by then, like RequestQueue.estimated_completion_time.
+        It replays the same events as step() on copies of the clocks of the pending items only, and drops
+        each environment from the replay as soon as the node completes in it.
+
+        :return: a tuple of arrays with one entry per environment
+        """
+        total_time = np.zeros(len(self))
+        time_downloading = np.zeros(len(self))
+        state = self.state[:, index]
+        envs = np.flatnonzero((state == QueueItemState.DELAYED) | (state == QueueItemState.QUEUED))
+        if envs.size == 0:
+            return total_time, time_downloading
+
+        nodes = np.flatnonzero(self.pending)
+        target = np.searchsorted(nodes, index)
+        size = self.size[nodes]
+        rows = np.ix_(envs, nodes)
+        finish_at_bytes = self.finish_at_bytes[rows]
+        ready_at_ms = self.ready_at_ms[rows]
+        num_queued = self.num_queued[envs]
+        link_bandwidth_bps = self.link_bandwidth_bps[envs]
+        elapsed_ms, bytes_per_item = self.elapsed_ms[envs], self.bytes_per_item[envs]
+        started_at_ms = self.started_at_ms[envs, index]
+        time_ms = np.zeros(len(envs))
+
+        while len(envs):
+            next_finish_at_bytes = finish_at_bytes.min(axis=1)
+            downloading = num_queued > 0
+            time_ms_to_download = np.where(
+                downloading,
+                1000 * (next_finish_at_bytes - bytes_per_item) / (link_bandwidth_bps / np.maximum(num_queued, 1)),
+                ready_at_ms.min(axis=1) - elapsed_ms,
+            )
+            bytes_per_item = np.where(downloading, next_finish_at_bytes, bytes_per_item)
+            elapsed_ms = elapsed_ms + time_ms_to_download
+            time_ms = time_ms + time_ms_to_download
+
+            completed = finish_at_bytes <= bytes_per_item[:, None]
+            finish_at_bytes[completed] = np.inf
+            num_queued = num_queued - completed.sum(axis=1)
+
+            ready = ready_at_ms - elapsed_ms[:, None] < DELAY_EPSILON_MS
+            if ready.any():
+                started_at_ms = np.where(ready[:, target], elapsed_ms, started_at_ms)
+                finish_at_bytes = np.where(ready, bytes_per_item[:, None] + size, finish_at_bytes)
+                ready_at_ms[ready] = np.inf
+                num_queued = num_queued + ready.sum(axis=1)
+
+            done = completed[:, target]
+            if done.any():
+                total_time[envs[done]] = time_ms[done]
+                time_downloading[envs[done]] = elapsed_ms[done] - started_at_ms[done]
+                left = ~done
+                (envs, time_ms, elapsed_ms) = (envs[left], time_ms[left], elapsed_ms[left])
+                (bytes_per_item, finish_at_bytes, ready_at_ms) = (
+                    bytes_per_item[left],
+                    finish_at_bytes[left],
+                    ready_at_ms[left],
+                )
+                (num_queued, link_bandwidth_bps, started_at_ms) = (
+                    num_queued[left],
+                    link_bandwidth_bps[left],
+                    started_at_ms[left],
+                )
+
+        return total_time, time_downloading
+
+    def step(
+        self, mask: np.ndarray, update_tcp_state: bool = True
+    ) -> Tuple[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Performs one step through of the request queue in each of the selected environments, which
+        simulates downloading until one item finishes downloading or one delayed item becomes ready,
+        like RequestQueue.step. The selected environments must have queued or delayed items.
+
+        :param mask: The environments to step
+        :param update_tcp_state: Whether to record the bytes sent by each origin
+        :return: a tuple of the time in milliseconds each environment stepped (0 if it was not selected),
+                 and the (environment, node) indices of the items that finished downloading in this step
+        """
+        envs = np.flatnonzero(mask)
+        # only the nodes that are not done in every environment can change state
+        nodes = np.flatnonzero(self.pending)
+        rows = np.ix_(envs, nodes)
+        finish_at_bytes = self.finish_at_bytes[rows]
+        ready_at_ms = self.ready_at_ms[rows]
+        num_queued = self.num_queued[envs]
+        downloading = num_queued > 0
+
+        next_finish_at_bytes = finish_at_bytes.min(axis=1)
+        bytes_to_download = np.where(downloading, next_finish_at_bytes - self.bytes_per_item[envs], 0.0)
+        bandwidth = self.link_bandwidth_bps[envs] / np.maximum(num_queued, 1)
+        step_ms = np.where(
+            downloading, 1000 * bytes_to_download / bandwidth, ready_at_ms.min(axis=1) - self.elapsed_ms[envs]
+        )
+        bytes_per_item = np.where(downloading, next_finish_at_bytes, self.bytes_per_item[envs])
+        elapsed_ms = self.elapsed_ms[envs] + step_ms
+        self.bytes_per_item[envs] = bytes_per_item
+        self.elapsed_ms[envs] = elapsed_ms
+        time_ms = np.zeros(len(self))
+        time_ms[envs] = step_ms
+
+        # Update the TCP state for each origin that downloaded bytes in this step
+        if update_tcp_state and downloading.any():
+            sending_envs = envs[downloading]
+            sending = (self.queued_per_origin[sending_envs] > 0) & self.has_tcp_state[sending_envs]
+            (rows_sending, domains) = np.nonzero(sending)
+            sending_envs = sending_envs[rows_sending]
+            self.time_since_last_byte[sending_envs, domains] = 0
+            window = np.ceil(bytes_to_download[downloading][rows_sending] / MTU_BYTES).astype(np.int64)
+            self.cwnd[sending_envs, domains] += window
+            self.tcp_idle_since_ms[sending_envs, domains] = self.elapsed_ms[sending_envs]
+
+        # Remove all queued items that have been completed
+        (completed_rows, completed_cols) = np.nonzero(finish_at_bytes <= bytes_per_item[:, None])
+        (completed_envs, completed_nodes) = (envs[completed_rows], nodes[completed_cols])
+        self.state[completed_envs, completed_nodes] = QueueItemState.DONE
+        self.finish_at_bytes[completed_envs, completed_nodes] = np.inf
+        self.completed_at_ms[completed_envs, completed_nodes] = self.elapsed_ms[completed_envs]
+        np.subtract.at(self.num_queued, completed_envs, 1)
+        np.subtract.at(self.queued_per_origin, (completed_envs, self.graph.domain_ids[completed_nodes]), 1)
+        np.add.at(self.num_done, completed_nodes, 1)
+        self.pending[completed_nodes[self.num_done[completed_nodes] == len(self)]] = False
+
+        # Queue all delayed items that are ready, and add their origins
+        (ready_rows, ready_cols) = np.nonzero(ready_at_ms - elapsed_ms[:, None] < DELAY_EPSILON_MS)
+        (ready_envs, ready_nodes) = (envs[ready_rows], nodes[ready_cols])
+        self.connected_origins[ready_envs, self.graph.domain_ids[ready_nodes]] = True
+        self._start_download(ready_envs, ready_nodes, ready_at_ms[ready_rows, ready_cols] - elapsed_ms[ready_rows])
+
+        return time_ms, (completed_envs, completed_nodes)
+
+    def _start_download(self, envs: np.ndarray, nodes: np.ndarray, delay_ms_left: np.ndarray):
+        """ Starts downloading the given (environment, node) items """
+        self.state[envs, nodes] = QueueItemState.QUEUED
+        self.ready_at_ms[envs, nodes] = np.inf
+        self.delay_ms_left[envs, nodes] = delay_ms_left
+        self.started_at_ms[envs, nodes] = self.elapsed_ms[envs]
+        self.finish_at_bytes[envs, nodes] = self.bytes_per_item[envs] + self.size[nodes]
+        np.add.at(self.num_queued, envs, 1)
+        np.add.at(self.queued_per_origin, (envs, self.graph.domain_ids[nodes]), 1)
+
+    def _round_trips_needed_for_bytes(self, domain: int, size: int) -> np.ndarray:
+        """
+        Returns the round trips needed to send the given number of bytes from the given domain in each
+        environment, after accounting for the time the domain has been idle, like
+        RequestQueue.get_tcp_state followed by TCPState.round_trips_needed_for_bytes
+        """
+        new = ~self.has_tcp_state[:, domain]
+        self.has_tcp_state[:, domain] = True
+        self.cwnd[new, domain] = INITIAL_WINDOW_SIZE
+        self.time_since_last_byte[new, domain] = 0
+        self.time_since_last_byte[~new, domain] += self.elapsed_ms[~new] - self.tcp_idle_since_ms[~new, domain]
+        self.tcp_idle_since_ms[:, domain] = self.elapsed_ms
+
+        # shrink the window once for every RTO_MS the domain has been idle (see TCPState.window_size)
+        idle = self.time_since_last_byte[:, domain] >= RTO_MS
+        if idle.any():
+            num_timeouts = (self.time_since_last_byte[idle, domain] // RTO_MS).astype(np.int64)
+            shrunk = self.cwnd[idle, domain] >> np.minimum(num_timeouts, 63)
+            self.cwnd[idle, domain] = np.maximum(INITIAL_WINDOW_SIZE, shrunk)
+            self.time_since_last_byte[idle, domain] -= num_timeouts * RTO_MS
+
+        # the bit length of the number of windows needed (see TCPState.round_trips_needed_for_bytes)
+        if size <= 0:
+            return np.zeros(len(self), dtype=np.int64)
+        windows = -(-size // (self.cwnd[:, domain] * MTU_BYTES))
+        return np.frexp(windows.astype(np.float64))[1].astype(np.int64)
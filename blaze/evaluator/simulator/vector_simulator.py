@@ -0,0 +1,340 @@
+"""
+This module defines the VectorSimulator, which simulates the page load time of a webpage in
+many client environments at once
+"""
+
+import copy
+import heapq
+from typing import List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from blaze.action.policy import Policy
+from blaze.config.client import ClientEnvironment
+from blaze.config.environment import EnvironmentConfig, ResourceType
+from blaze.logger import logger
+
+from .execution_graph import ExecutionGraph, get_execution_graph
+from .request_queue import Node
+from .vector_request_queue import VectorRequestQueue
+
+
+class VectorSimulator:
+    """
+    VectorSimulator runs the same simulation as the Simulator in N client environments at once. Which
+    nodes are scheduled, and in which order, only depends on the execution graph and the policy, so the
+    simulator walks the graph once and keeps the timing of every node as an array with one entry per
+    client environment. The request queue of every environment is advanced in lockstep, stepping only
+    the environments that are still waiting for the current node to complete.
+    """
+
+    def __init__(self, env_config: EnvironmentConfig):
+        self.env_config = env_config
+        self.log = logger.with_namespace("vector_simulator")
+
+        self.graph: ExecutionGraph = get_execution_graph(env_config)
+        self.root = self.graph.root
+        self.url_to_node_map = self.graph.url_to_node
+
+        # a heap of (priority, node index) for the nodes left to process
+        self.pq: Optional[List[Tuple[int, int]]] = None
+        self.request_queue: Optional[VectorRequestQueue] = None
+        # the time at which each node completed in each environment (NaN until it completes)
+        self.completed_ms: Optional[np.ndarray] = None
+        self.pushed_nodes = {}
+        self.total_time_ms: Optional[np.ndarray] = None
+        self.cached_urls = set()
+
+        self.cpu_slowdown: Optional[np.ndarray] = None
+        # the time each node spent downloading in each environment without the policy
+        self.no_push_download_ms: Optional[np.ndarray] = None
+        self.policy: Optional[Policy] = None
+
+    def reset_simulation(
+        self,
+        bandwidth_kbps: np.ndarray,
+        latency_ms: np.ndarray,
+        cpu_slowdown: np.ndarray,
+        policy: Optional[Policy] = None,
+        cached_urls: Optional[Set[str]] = None,
+    ):
+        """
+        Resets the state of the simulator with the given client environment parameters
+
+        :param bandwidth_kbps: the bandwidth of each client environment
+        :param latency_ms: the round trip latency of each client environment
+        :param cpu_slowdown: the CPU slowdown of each client environment
+        :param policy: the push/preload policy to reset with
+        :param cached_urls: the cached URLs to not download
+        """
+
+        self.pq = []
+        self.request_queue = VectorRequestQueue(self.graph, bandwidth_kbps, latency_ms)
+        self.completed_ms = np.full((len(bandwidth_kbps), len(self.graph)), np.nan)
+        self.pushed_nodes = {}
+        self.total_time_ms = np.zeros(len(bandwidth_kbps))
+        self.cached_urls = cached_urls if cached_urls else set()
+
+        self.cpu_slowdown = np.asarray(cpu_slowdown)
+        self.no_push_download_ms = None
+        self.policy = copy.deepcopy(policy) if policy else None
+
+    def schedule_pushed_and_preloaded_resources(
+        self, node: Node, delay: np.ndarray, dry_run=False
+    ) -> Optional[List[Tuple[Node, np.ndarray]]]:
+        """
+        Schedule all push and preload resources for a given node with the given delays, like
+        Simulator.schedule_pushed_and_preloaded_resources
+
+        :param node: The node to push resources for
+        :param delay: The delay in each environment to schedule each pushed resource with
+        :param dry_run: Only return the list of resources to push with their delays
+        """
+
+        push_resources = self.policy.push_set_for_resource(node.resource) if self.policy else []
+        preload_resources = self.policy.preload_set_for_resource(node.resource) if self.policy else []
+        dry_run_list = []
+
+        for res in push_resources:
+            push_node = self.url_to_node_map.get(res.url)
+            if push_node and not self.request_queue.is_added(push_node.index):
+                if push_node.resource.url in self.cached_urls:
+                    continue
+                push_delay = delay + push_node.resource.time_to_first_byte_ms
+                if dry_run:
+                    dry_run_list.append((push_node, push_delay))
+                else:
+                    heapq.heappush(self.pq, (push_node.priority, push_node.index))
+                    self.request_queue.add_with_delay(push_node.index, push_delay)
+                    self.pushed_nodes[push_node] = True
+
+        for res in preload_resources:
+            preload_node = self.url_to_node_map.get(res.url)
+            if preload_node and not self.request_queue.is_added(preload_node.index):
+                if preload_node.resource.url in self.cached_urls:
+                    continue
+                # Same delay as parent, but adds an extra RTT because the browser needs
+                # to explicitly make a request for it
+                preload_delay = delay + preload_node.resource.time_to_first_byte_ms + self.request_queue.rtt_latency_ms
+                if dry_run:
+                    dry_run_list.append((preload_node, preload_delay))
+                else:
+                    heapq.heappush(self.pq, (preload_node.priority, preload_node.index))
+                    self.request_queue.add_with_delay(preload_node.index, preload_delay)
+                    self.pushed_nodes[preload_node] = True
+
+        return dry_run_list if dry_run else None
+
+    def step_request_queue(self, mask: np.ndarray):
+        """
+        Steps through the request queue of the selected environments once and updates the simulator
+        state based on the results
+        """
+
+        time_ms, completed = self.request_queue.step(mask)
+        self.total_time_ms += time_ms
+
+        (envs, nodes) = completed
+        self.completed_ms[envs, nodes] = self.total_time_ms[envs] + self.graph.execution_ms[nodes]
+
+    def schedule_child_requests(self, parent: Node, dry_run=False) -> Optional[List[Tuple[Node, np.ndarray]]]:
+        """
+        Schedules all children for the given node, like Simulator.schedule_child_requests
+
+        :param parent: The node to schedule children for
+        :param dry_run: Only return the list of nodes and delays instead of actually scheduling them
+        """
+
+        fetch_delay_correction = np.zeros(len(self.request_queue))
+        execution_delay = 0
+        last_execution_delay = 0
+        dry_run_list = []
+
+        for child in parent.children:
+            # Server processing delay, plus the amount of time the fetch was delayed since the parent finished,
+            # minus the amount of time saved from pushing
+            child_delay = child.resource.time_to_first_byte_ms + (
+                child.resource.fetch_delay_ms - fetch_delay_correction
+            )
+            # Adjust the delay to account for slowed-down execution delay (and speculative fetching)
+            child_delay += (execution_delay - last_execution_delay) * (self.cpu_slowdown - 1)
+            # if some of the fetch_delay overlaps with the parent script execution, delay that part of the time
+            child_delay += min(parent.resource.execution_ms, child.resource.fetch_delay_ms) * (self.cpu_slowdown - 1)
+
+            # If it was pushed, calculate its delay as the difference between
+            # when it was scheduled and how much time has passed since then
+            if self.pushed_nodes.get(child):
+                # get the time that the pushed resource has already spent downloading
+                time_already_downloaded = self.request_queue.time_spent_downloading(child.index)
+
+                # collect the requests for the whole level, schedule them, and estimate remaining download time
+                if not dry_run:
+                    nodes_to_schedule = self.schedule_child_requests(parent, dry_run=True)
+                    rq = self.request_queue.fork()
+                    for (node, delay) in nodes_to_schedule:
+                        if not rq.is_added(node.index):
+                            rq.add_with_delay(node.index, delay)
+                    (time_til_complete, time_remaining_to_download) = rq.estimated_completion_time(child.index)
+                    remaining_delay_before_download = time_til_complete - time_remaining_to_download
+                else:
+                    (time_til_complete, time_remaining_to_download) = self.request_queue.estimated_completion_time(
+                        child.index
+                    )
+                    remaining_delay_before_download = self.request_queue.remaining_delay(child.index)
+
+                normal_time_spent_downloading = self.no_push_download_ms[:, child.index]
+
+                # see Simulator.schedule_child_requests for the cases
+                downloaded = time_already_downloaded > 0
+                child_fetch_delay_correction = np.zeros(len(self.request_queue))
+                child_fetch_delay_correction = np.where(
+                    downloaded & (time_remaining_to_download > child_delay),
+                    time_already_downloaded + child_delay,
+                    child_fetch_delay_correction,
+                )
+                child_fetch_delay_correction = np.where(
+                    downloaded & (time_remaining_to_download < child_delay),
+                    time_already_downloaded + time_remaining_to_download,
+                    child_fetch_delay_correction,
+                )
+                child_fetch_delay_correction = np.where(
+                    time_already_downloaded == 0,
+                    -(remaining_delay_before_download - child_delay)
+                    + (normal_time_spent_downloading - time_remaining_to_download),
+                    child_fetch_delay_correction,
+                )
+
+                # only consider scripts and css as those are blocking
+                if child.resource.type in {ResourceType.SCRIPT, ResourceType.CSS}:
+                    fetch_delay_correction += child_fetch_delay_correction
+                if not dry_run:
+                    self.pushed_nodes[child] = False
+
+            if child.resource.type in {ResourceType.SCRIPT}:
+                execution_delay += child.resource.execution_ms
+                last_execution_delay = child.resource.execution_ms
+
+            if not self.request_queue.is_added(child.index):
+                cached = child.resource.url in self.cached_urls
+                if dry_run:
+                    if not cached:
+                        dry_run_list.append((child, child_delay))
+                    dry_run_list.extend(
+                        self.schedule_pushed_and_preloaded_resources(
+                            child, child_delay - child.resource.time_to_first_byte_ms, dry_run=True
+                        )
+                    )
+                else:
+                    heapq.heappush(self.pq, (child.priority, child.index))
+                    self.request_queue.add_with_delay(child.index, child_delay, cached=cached)
+                    self.schedule_pushed_and_preloaded_resources(
+                        child, child_delay - child.resource.time_to_first_byte_ms
+                    )
+
+        return dry_run_list if dry_run else None
+
+    def simulate(
+        self,
+        bandwidth_kbps: Sequence[int],
+        latency_ms: Sequence[int],
+        cpu_slowdown: Sequence[int],
+        policy: Optional[Policy] = None,
+        cached_urls: Optional[Set[str]] = None,
+        use_aft: Optional[bool] = False,
+    ) -> np.ndarray:
+        """
+        Simulates the page load time of a webpage in the client environments with the given parameters,
+        with an optional push policy to also simulate.
+
+        :param bandwidth_kbps: The bandwidth of each client environment
+        :param latency_ms: The round trip latency of each client environment
+        :param cpu_slowdown: The CPU slowdown of each client environment
+        :param policy: The push/preload policy to simulate
+        :param cached_urls: The cached URLs to not download
+        :param use_aft: Return the completion time of the last critical resource instead
+        :return: The predicted page load time in milliseconds in each client environment
+        """
+        bandwidth_kbps, latency_ms = np.asarray(bandwidth_kbps), np.asarray(latency_ms)
+        self.reset_simulation(bandwidth_kbps, latency_ms, cpu_slowdown, policy=policy, cached_urls=cached_urls)
+
+        if policy:
+            # First simulate it without the policy to comparing timing information
+            no_push = VectorSimulator(self.env_config)
+            no_push.simulate(bandwidth_kbps, latency_ms, cpu_slowdown)
+            self.no_push_download_ms = np.stack(
+                [no_push.request_queue.time_spent_downloading(i) for i in range(len(self.graph))], axis=1
+            )
+
+        # start the initial item
+        root_delay = np.full(len(bandwidth_kbps), float(self.root.resource.time_to_first_byte_ms))
+        heapq.heappush(self.pq, (self.root.priority, self.root.index))
+        self.request_queue.add_with_delay(self.root.index, root_delay)
+
+        # schedule push resources for the root
+        self.schedule_pushed_and_preloaded_resources(self.root, root_delay)
+
+        # process all subsequent requests
+        while self.pq:
+            _, index = heapq.heappop(self.pq)
+            pending = np.isnan(self.completed_ms[:, index])
+            while pending.any():
+                self.step_request_queue(pending)
+                pending = np.isnan(self.completed_ms[:, index])
+            self.schedule_child_requests(self.graph.nodes[index])
+
+        if use_aft:
+            if self.graph.critical.any():
+                return np.max(self.completed_ms[:, self.graph.critical], axis=1)
+            self.log.warn("requested speed index, but no nodes marked `critical` found")
+        return np.nanmax(self.completed_ms, axis=1)
+
+    def simulate_load_time(
+        self,
+        client_envs: Sequence[ClientEnvironment],
+        policy: Optional[Policy] = None,
+        cached_urls: Optional[Set[str]] = None,
+        use_aft: Optional[bool] = False,
+    ) -> np.ndarray:
+        """
+        Simulates the page load time of a webpage in each of the given client environments
+
+        :param client_envs: The client environments to simulate
+        :param policy: The push/preload policy to simulate
+        :param cached_urls: The cached URLs to not download
+        :param use_aft: Return the completion time of the last critical resource instead
+        :return: The predicted page load time in milliseconds in each client environment
+        """
+        return self.simulate(
+            [client_env.bandwidth for client_env in client_envs],
+            [client_env.latency for client_env in client_envs],
+            [client_env.cpu_slowdown for client_env in client_envs],
+            policy=policy,
+            cached_urls=cached_urls,
+            use_aft=use_aft,
+        )
+
+    def simulate_grid(
+        self,
+        bandwidths_kbps: Sequence[int],
+        latencies_ms: Sequence[int],
+        cpu_slowdowns: Sequence[int],
+        policy: Optional[Policy] = None,
+        cached_urls: Optional[Set[str]] = None,
+        use_aft: Optional[bool] = False,
+    ) -> np.ndarray:
+        """
+        Simulates the page load time of a webpage for every combination of the given bandwidths, latencies,
+        and CPU slowdowns in a single pass
+
+        :return: The predicted page load times in milliseconds, indexed by (bandwidth, latency, CPU slowdown)
+        """
+        (bandwidth, latency, cpu_slowdown) = np.meshgrid(bandwidths_kbps, latencies_ms, cpu_slowdowns, indexing="ij")
+        plt = self.simulate(
+            bandwidth.ravel(),
+            latency.ravel(),
+            cpu_slowdown.ravel(),
+            policy=policy,
+            cached_urls=cached_urls,
+            use_aft=use_aft,
+        )
+        return plt.reshape(bandwidth.shape)
@@ -5,7 +5,8 @@ import sys
 import colorama
 
 from .level import Level
-from .logger import Logger
+from .logger import Lazy, Logger
+from .sink import JsonLinesSink
 
 colorama.init()
 
@@ -17,7 +18,10 @@ def get_default_logger():
         sys.stderr.write(s + "\n")
 
     min_level = Level.from_string(os.environ.get("LOG_LEVEL"))
-    return Logger(namespace="blaze", min_level=min_level, print_fn=print_to_stderr)
+    # optionally also write every record as JSON lines to the file given by LOG_JSON_FILE
+    json_file = os.environ.get("LOG_JSON_FILE")
+    sink = JsonLinesSink(json_file) if json_file else None
+    return Logger(namespace="blaze", min_level=min_level, print_fn=print_to_stderr, sink=sink)
 
 
 logger = get_default_logger()  # pylint: disable=invalid-name  # disable for global access to logger
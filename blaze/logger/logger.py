@@ -1,27 +1,71 @@
 """ This module defines the main logger """
 import time
+from typing import Any, Callable, Dict
 
 from colorama import Style
 
 from .level import Level
 
 
-class Logger:
-    """ Logger is a class that logs some messages to a defined output stream """
+class Lazy:
+    """
+    Lazy wraps a function that computes a log message or context value, so that the value is only
+    computed if the message is actually logged
+    """
+
+    __slots__ = ("fn",)
+
+    def __init__(self, fn: Callable[[], Any]):
+        self.fn = fn
+
+
+def _resolve(value):
+    return value.fn() if isinstance(value, Lazy) else value
 
-    def __init__(self, namespace=None, min_level=Level.INFO, time_start=time.time(), print_fn=print, context=None):
+
+class Logger:
+    """
+    Logger is a class that logs some messages to a defined output stream, and optionally passes
+    each emitted record to a structured sink (see blaze.logger.sink)
+    """
+
+    def __init__(
+        self, namespace=None, min_level=Level.INFO, time_start=time.time(), print_fn=print, context=None, sink=None
+    ):
         self.namespace = namespace
         self.min_level = min_level
         self.time_start = time_start
         self.print_fn = print_fn
         self.context = context or {}
+        self.sink = sink
         self.silent = False
+        self.namespaced_loggers: Dict[str, "Logger"] = {}
+
+    def is_enabled_for(self, level: Level) -> bool:
+        """ Returns True if a message with the given level would be logged """
+        return not self.silent and level >= self.min_level
 
     def log(self, level=None, namespace=None, message="", **context):
-        """ Logs a message with the given level, namespace, message, and contextual information """
+        """
+        Logs a message with the given level, namespace, message, and contextual information. The message
+        and context values may be Lazy, in which case they are only computed if the message is logged
+        """
         if level is None or level < self.min_level or self.silent:
             return
 
+        message = _resolve(message)
+        ctx = {**self.context, **{k: _resolve(v) for (k, v) in context.items()}}
+        if self.sink is not None:
+            self.sink(
+                {
+                    "time": time.time(),
+                    "level": level.name.lower(),
+                    "namespace": namespace or self.namespace,
+                    "message": message,
+                    "context": ctx,
+                }
+            )
+
         level_str = "[" + level.color + str(level) + Style.RESET_ALL + "]"
         namespace_str = (
             (Style.BRIGHT + " {}:".format(namespace or self.namespace) + Style.RESET_ALL)
@@ -29,7 +73,6 @@ class Logger:
             else ""
         )
 
-        ctx = {**self.context, **context}
         ctx_fmt = level.context_key_color + "{}" + Style.RESET_ALL + "={}"
         ctx_str = " ".join(ctx_fmt.format(*c) for c in ctx.items())
         if message:
@@ -46,8 +89,20 @@ class Logger:
             time_start=self.time_start,
             print_fn=self.print_fn,
             context=self.context,
+            sink=self.sink,
         )
 
+    def namespaced(self, namespace):
+        """
+        Returns a Logger with the given namespace that is created once and then shared by all callers,
+        for logging from frequently-called code. The shared logger must not be silenced; use
+        with_namespace to create a logger that can be
+        """
+        namespaced_logger = self.namespaced_loggers.get(namespace)
+        if namespaced_logger is None:
+            namespaced_logger = self.namespaced_loggers[namespace] = self.with_namespace(namespace)
+        return namespaced_logger
+
     def with_context(self, **context):
         """ Creates a new Logger inheriting the properties of this logger with some addional/overriden context """
         return Logger(
@@ -56,6 +111,7 @@ class Logger:
             time_start=self.time_start,
             print_fn=self.print_fn,
             context={**self.context, **context},
+            sink=self.sink,
         )
 
     def verbose(self, message, **context):
@@ -0,0 +1,27 @@
+""" This module defines structured sinks that receive every emitted log record """
+import json
+import threading
+from typing import Any, Dict, IO, Union
+
+
+class JsonLinesSink:
+    """
+    JsonLinesSink writes every log record as one JSON object per line to a file. Values that are not
+    JSON-serializable are written as their string representation
+    """
+
+    def __init__(self, file: Union[str, IO[str]]):
+        self.owns_file = isinstance(file, str)
+        self.file = open(file, "a", encoding="utf-8") if self.owns_file else file  # pylint: disable=consider-using-with
+        self.lock = threading.Lock()
+
+    def __call__(self, record: Dict[str, Any]):
+        line = json.dumps(record, default=str)
+        with self.lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+
+    def close(self):
+        """ Closes the underlying file if it was opened by the sink """
+        if self.owns_file:
+            self.file.close()
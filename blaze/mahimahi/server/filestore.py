@@ -202,7 +202,7 @@ class FileStore:
                 elif self.cache_time is not None and cache_time > self.cache_time:
                     f.set_cache_time(cache_time)
                 else:
-                    log.with_namespace("filestore").debug(
+                    log.namespaced("filestore").debug(
                         "skipping setting cache", url=f.url, actual_cache_time=cache_time, cache_time=self.cache_time
                     )
 
@@ -6,9 +6,10 @@ from statistics import stdev
 from blaze.config.config import Config
 from blaze.config.train import TrainConfig
 from blaze.environment import Environment
+from blaze.evaluator.plt_store import SharedPLTStore
 from blaze.logger import logger
 
-from .model import SavedModel
+from .model import SavedModel, get_agent_config, register_vector_environment
 
 
 WINDOW_SIZE = 50
@@ -83,20 +84,23 @@ def train(train_config: TrainConfig, config: Config):
     ray.init(num_cpus=train_config.num_workers + 1, log_to_driver=False)
 
     name = train_config.experiment_name
-    run_experiments(
-        {
-            name: {
-                "run": "A3C",
-                "env": Environment,
-                "stop": ray.tune.function(stop_condition()),
-                "checkpoint_at_end": True,
-                "checkpoint_freq": 10,
-                "max_failures": 3,
-                "config": {**COMMON_CONFIG, "num_workers": train_config.num_workers, "env_config": config},
-            }
-        },
-        resume=train_config.resume,
-    )
+    # the rollout workers share the page load times they simulate through a store in shared memory
+    with SharedPLTStore.create() as plt_store:
+        config = config.with_mutations(plt_store=plt_store.path)
+        run_experiments(
+            {
+                name: {
+                    "run": "A3C",
+                    "env": register_vector_environment(train_config.num_envs_per_worker),
+                    "stop": ray.tune.function(stop_condition()),
+                    "checkpoint_at_end": True,
+                    "checkpoint_freq": 10,
+                    "max_failures": 3,
+                    "config": {**get_agent_config(COMMON_CONFIG, config), "num_workers": train_config.num_workers},
+                }
+            },
+            resume=train_config.resume,
+        )
 
 
 def get_model(location: str):
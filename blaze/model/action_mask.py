@@ -0,0 +1,40 @@
+""" This module defines a model that only assigns probability to the valid values of each action component """
+
+import tensorflow as tf
+from ray.rllib.models import Model, ModelCatalog
+from ray.rllib.models.misc import normc_initializer
+
+
+ACTION_MASK_MODEL = "action_mask_model"
+
+
+class ActionMaskModel(Model):
+    """
+    ActionMaskModel is a fully connected network whose logits are masked by the `action_mask` of the
+    observation (see ActionSpace.action_mask). The logits of the Tuple action space are laid out like the
+    mask, one block per component, so masking them gives zero probability to the values of each component
+    that are not part of any valid action, such as groups with nothing left to push or resources that
+    were already pushed or preloaded.
+    """
+
+    def _build_layers_v2(self, input_dict, num_outputs, options):
+        action_mask = input_dict["obs"]["action_mask"]
+
+        last_layer = input_dict["obs_flat"]
+        for (i, size) in enumerate(options.get("fcnet_hiddens", [256, 256])):
+            last_layer = tf.layers.dense(
+                last_layer, size, kernel_initializer=normc_initializer(1.0), activation=tf.nn.tanh, name=f"fc{i}"
+            )
+        logits = tf.layers.dense(
+            last_layer, num_outputs, kernel_initializer=normc_initializer(0.01), activation=None, name="fc_out"
+        )
+
+        # log(1) = 0 leaves valid values untouched, and log(0) = -inf is clipped to the smallest float so
+        # that the masked logits stay finite
+        inf_mask = tf.maximum(tf.log(action_mask), tf.float32.min)
+        return logits + inf_mask, last_layer
+
+
+def register_action_mask_model():
+    """ Registers ActionMaskModel with RLlib so that agents can refer to it by name """
+    ModelCatalog.register_custom_model(ACTION_MASK_MODEL, ActionMaskModel)
@@ -3,8 +3,9 @@
 from blaze.config.config import Config
 from blaze.config.train import TrainConfig
 from blaze.environment import Environment
+from blaze.evaluator.plt_store import SharedPLTStore
 
-from .model import SavedModel
+from .model import SavedModel, get_agent_config, register_vector_environment
 
 
 COMMON_CONFIG = {
@@ -26,20 +27,23 @@ def train(train_config: TrainConfig, config: Config):
     ray.init(num_cpus=train_config.num_workers + 1)
 
     name = train_config.experiment_name
-    run_experiments(
-        {
-            name: {
-                "run": "APEX",
-                "env": Environment,
-                "stop": {"timesteps_total": 1000000},
-                "checkpoint_at_end": True,
-                "checkpoint_freq": 10,
-                "max_failures": 1000,
-                "config": {**COMMON_CONFIG, "num_workers": train_config.num_workers, "env_config": config},
-            }
-        },
-        resume=train_config.resume,
-    )
+    # the rollout workers share the page load times they simulate through a store in shared memory
+    with SharedPLTStore.create() as plt_store:
+        config = config.with_mutations(plt_store=plt_store.path)
+        run_experiments(
+            {
+                name: {
+                    "run": "APEX",
+                    "env": register_vector_environment(train_config.num_envs_per_worker),
+                    "stop": {"timesteps_total": 1000000},
+                    "checkpoint_at_end": True,
+                    "checkpoint_freq": 10,
+                    "max_failures": 1000,
+                    "config": {**get_agent_config(COMMON_CONFIG, config), "num_workers": train_config.num_workers},
+                }
+            },
+            resume=train_config.resume,
+        )
 
 
 def get_model(location: str):
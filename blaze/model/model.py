@@ -1,7 +1,10 @@
 """ Defines methods and classes for representing and instantiating saved models """
-from typing import NamedTuple, Optional, Type
+import contextlib
+import threading
+from typing import Iterator, List, NamedTuple, Optional, Tuple, Type
 
 import gym
+import numpy as np
 from ray.rllib.agents import Agent
 from ray.rllib.evaluation.episode import _flatten_action
 from ray.rllib.policy.sample_batch import DEFAULT_POLICY_ID
@@ -9,6 +12,87 @@ from ray.rllib.policy.sample_batch import DEFAULT_POLICY_ID
 from blaze.action import Policy
 from blaze.config.config import Config
 from blaze.environment.environment import Environment
+from blaze.environment.vector_environment import VectorEnvironment
+
+# The name that the env creator of VectorEnvironment is registered with RLlib under
+VECTOR_ENVIRONMENT = "VectorEnvironment"
+
+
+# The model options that wrap the model in an LSTM, which are dropped for ActionMaskModel
+LSTM_MODEL_OPTIONS = ("use_lstm", "max_seq_len", "lstm_cell_size", "lstm_use_prev_action_reward")
+
+
+def get_agent_config(common_config: dict, config: Config) -> dict:
+    """
+    Returns the agent configuration for training or instantiating a model in the given environment
+    configuration. If observations include an action mask, the model is replaced with ActionMaskModel and
+    the LSTM_MODEL_OPTIONS of the common model configuration are dropped: the LSTM computes its own logits
+    from the model's last layer and would discard the mask. Its other options (e.g. fcnet_hiddens) are kept.
+    """
+    agent_config = {**common_config, "env_config": config}
+    if config.action_mask:
+        from .action_mask import ACTION_MASK_MODEL, register_action_mask_model
+
+        register_action_mask_model()
+        model = {k: v for (k, v) in common_config.get("model", {}).items() if k not in LSTM_MODEL_OPTIONS}
+        agent_config["model"] = {**model, "custom_model": ACTION_MASK_MODEL}
+    return agent_config
+
+
+def register_vector_environment(num_envs: int) -> str:
+    """
+    Registers an RLlib env creator that steps num_envs training episodes at once in a VectorEnvironment,
+    and returns the name that experiments refer to it by. RLlib uses a VectorEnv as is, so the creator
+    sets the number of episodes per worker instead of num_envs_per_worker.
+    """
+    from ray.tune.registry import register_env
+
+    register_env(VECTOR_ENVIRONMENT, lambda env_config: VectorEnvironment(env_config, num_envs))
+    return VECTOR_ENVIRONMENT
+
+
+def get_initial_state(agent: Agent) -> list:
+    """ Returns the initial recurrent state of the agent's policy, which is empty if it has no LSTM """
+    policy_map = agent.workers.local_worker().policy_map if hasattr(agent, "workers") else None
+    return policy_map[DEFAULT_POLICY_ID].get_initial_state() if policy_map else []
+
+
+def compute_actions(
+    agent: Agent, observations: list, states: List[list], prev_actions: list, prev_rewards: List[float]
+) -> Tuple[list, List[list]]:
+    """
+    Computes the next action of a batch of episodes with a single forward pass of the agent's policy,
+    like calling agent.compute_action for each episode. Agents without a local RLlib worker fall back to
+    computing one action at a time.
+
+    :return: the flattened action and the next recurrent state of each episode
+    """
+    if not hasattr(agent, "workers"):
+        results = [
+            agent.compute_action(obs, state=state, prev_action=prev_action, prev_reward=prev_reward)
+            if state
+            else (agent.compute_action(obs, prev_action=prev_action, prev_reward=prev_reward), state)
+            for (obs, state, prev_action, prev_reward) in zip(observations, states, prev_actions, prev_rewards)
+        ]
+        return [_flatten_action(result[0]) for result in results], [list(result[1]) for result in results]
+
+    worker = agent.workers.local_worker()
+    (preprocessor, obs_filter) = (worker.preprocessors[DEFAULT_POLICY_ID], worker.filters[DEFAULT_POLICY_ID])
+    obs_batch = [obs_filter(preprocessor.transform(obs), update=False) for obs in observations]
+    state_batches = [np.stack(state) for state in zip(*states)]
+    (actions, state_out, _) = worker.policy_map[DEFAULT_POLICY_ID].compute_actions(
+        obs_batch,
+        state_batches,
+        prev_action_batch=[_flatten_action(action) for action in prev_actions],
+        prev_reward_batch=prev_rewards,
+    )
+    # a Tuple action space returns one batch per component, which are split back into one tuple per episode
+    if isinstance(actions, (list, tuple)):
+        actions = list(zip(*actions))
+    return (
+        [_flatten_action(action) for action in actions],
+        [[state[i] for state in state_out] for i in range(len(observations))],
+    )
 
 
 class ModelInstance:
@@ -36,8 +120,7 @@ class ModelInstance:
         # keep querying the agent until the policy is complete
         obs, action, reward, completed = env.observation, env.action_space.sample(), 0, False
         # initialize LSTM state if applicable
-        policy_map = self.agent.workers.local_worker().policy_map if hasattr(self.agent, "workers") else None
-        state = policy_map[DEFAULT_POLICY_ID].get_initial_state() if policy_map else []
+        state = get_initial_state(self.agent)
         use_lstm = len(state) > 0
 
         while not completed:
@@ -65,8 +148,86 @@ class SavedModel(NamedTuple):
     location: str
     common_config: dict
 
+    def create_agent(self, config: Config) -> Agent:
+        """ Creates an agent for the given environment and restores the saved checkpoint into it """
+        agent = self.cls(env=self.env, config=get_agent_config(self.common_config, config))
+        agent.restore(self.location)
+        return agent
+
     def instantiate(self, config: Config) -> ModelInstance:
         """ Instantiates the saved model and returns a ModelInstance for the given environment """
-        agent = self.cls(env=self.env, config={**self.common_config, "env_config": config})
-        agent.restore(self.location)
-        return ModelInstance(agent, config)
+        return ModelInstance(self.create_agent(config), config)
+
+
+class AgentPool:
+    """
+    A pool of agents restored from a SavedModel. Creating and restoring an agent takes seconds, so agents
+    are created on demand, up to the size of the pool, and then reused for every ModelInstance, which only
+    changes the environment configuration the agent acts in. The policy network is restored from the
+    checkpoint, so an agent created for one page can compute actions for any other. fill creates all the
+    agents up front instead, so that the first requests do not wait for them.
+
+    Agents are not thread-safe, so each one is lent to one caller at a time; when all agents are in use,
+    callers wait until an agent is returned, or until an agent that was being created fails and frees
+    its place in the pool.
+    """
+
+    def __init__(self, saved_model: SavedModel, size: int = 1):
+        assert size > 0
+        self.saved_model = saved_model
+        self.size = size
+        # the most recently returned agent is lent first, so that idle agents stay warm
+        self.idle_agents: List[Agent] = []
+        # the number of agents that were created or are being created
+        self.num_agents = 0
+        self.condition = threading.Condition()
+
+    def acquire(self, config: Config) -> Agent:
+        """
+        Returns an idle agent, creating one for the given configuration if the pool is not full, or
+        waiting for an agent to be released otherwise
+        """
+        with self.condition:
+            while not self.idle_agents and self.num_agents >= self.size:
+                self.condition.wait()
+            if self.idle_agents:
+                return self.idle_agents.pop()
+            self.num_agents += 1
+        return self.create_agent(config)
+
+    def fill(self, config: Config):
+        """ Creates agents for the given configuration until the pool is full """
+        while True:
+            with self.condition:
+                if self.num_agents >= self.size:
+                    return
+                self.num_agents += 1
+            self.release(self.create_agent(config))
+
+    def create_agent(self, config: Config) -> Agent:
+        """ Creates an agent in a place reserved in the pool, freeing the place if the agent cannot be created """
+        agent = None
+        try:
+            agent = self.saved_model.create_agent(config)
+        finally:
+            if agent is None:
+                with self.condition:
+                    self.num_agents -= 1
+                    # a caller waiting for an agent can create one in the freed place instead
+                    self.condition.notify()
+        return agent
+
+    def release(self, agent: Agent):
+        """ Returns an agent obtained from acquire to the pool """
+        with self.condition:
+            self.idle_agents.append(agent)
+            self.condition.notify()
+
+    @contextlib.contextmanager
+    def instantiate(self, config: Config) -> Iterator[ModelInstance]:
+        """ Lends an agent as a ModelInstance for the given environment, and returns it to the pool on exit """
+        agent = self.acquire(config)
+        try:
+            yield ModelInstance(agent, config)
+        finally:
+            self.release(agent)
@@ -19,7 +19,7 @@ DESCRIPTOR = _descriptor.FileDescriptor(
   package='',
   syntax='proto3',
   serialized_options=None,
-  serialized_pb=_b('\n\x14policy_service.proto\"g\n\x04Page\x12\x0b\n\x03url\x18\x01 \x01(\t\x12\x16\n\x0e\x62\x61ndwidth_kbps\x18\x02 \x01(\x05\x12\x12\n\nlatency_ms\x18\x03 \x01(\x05\x12\x14\n\x0c\x63pu_slowdown\x18\x04 \x01(\x05\x12\x10\n\x08manifest\x18\x05 \x01(\x0c\"\x18\n\x06Policy\x12\x0e\n\x06policy\x18\x01 \x01(\t2,\n\rPolicyService\x12\x1b\n\tGetPolicy\x12\x05.Page\x1a\x07.Policyb\x06proto3')
+  serialized_pb=_b('\n\x14policy_service.proto\"\xab\x01\n\x04Page\x12\x0b\n\x03url\x18\x01 \x01(\t\x12\x16\n\x0e\x62\x61ndwidth_kbps\x18\x02 \x01(\x05\x12\x12\n\nlatency_ms\x18\x03 \x01(\x05\x12\x14\n\x0c\x63pu_slowdown\x18\x04 \x01(\x05\x12\x12\n\x08manifest\x18\x05 \x01(\x0cH\x00\x12\x19\n\x0fmanifest_digest\x18\x07 \x01(\tH\x00\x12\x12\n\nrequest_id\x18\x06 \x01(\x03\x42\x11\n\x0fmanifest_source\",\n\x06Policy\x12\x0e\n\x06policy\x18\x01 \x01(\t\x12\x12\n\nrequest_id\x18\x02 \x01(\x03\"\x1c\n\x08Manifest\x12\x10\n\x08manifest\x18\x01 \x01(\x0c\" \n\x0eManifestDigest\x12\x0e\n\x06\x64igest\x18\x01 \x01(\t2\x7f\n\rPolicyService\x12\x1b\n\tGetPolicy\x12\x05.Page\x1a\x07.Policy\x12!\n\x0bGetPolicies\x12\x05.Page\x1a\x07.Policy(\x01\x30\x01\x12.\n\x10RegisterManifest\x12\t.Manifest\x1a\x0f.ManifestDigestb\x06proto3')
 )
 
 
@@ -67,6 +67,20 @@ _PAGE = _descriptor.Descriptor(
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='manifest_digest', full_name='Page.manifest_digest', index=5,
+      number=7, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=_b("").decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='request_id', full_name='Page.request_id', index=6,
+      number=6, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
   ],
   extensions=[
   ],
@@ -78,9 +92,12 @@ _PAGE = _descriptor.Descriptor(
   syntax='proto3',
   extension_ranges=[],
   oneofs=[
+    _descriptor.OneofDescriptor(
+      name='manifest_source', full_name='Page.manifest_source',
+      index=0, containing_type=None, fields=[]),
   ],
-  serialized_start=24,
-  serialized_end=127,
+  serialized_start=25,
+  serialized_end=196,
 )
 
 
@@ -98,6 +115,75 @@ _POLICY = _descriptor.Descriptor(
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='request_id', full_name='Policy.request_id', index=1,
+      number=2, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=198,
+  serialized_end=242,
+)
+
+
+_MANIFEST = _descriptor.Descriptor(
+  name='Manifest',
+  full_name='Manifest',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='manifest', full_name='Manifest.manifest', index=0,
+      number=1, type=12, cpp_type=9, label=1,
+      has_default_value=False, default_value=_b(""),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=244,
+  serialized_end=272,
+)
+
+
+_MANIFESTDIGEST = _descriptor.Descriptor(
+  name='ManifestDigest',
+  full_name='ManifestDigest',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='digest', full_name='ManifestDigest.digest', index=0,
+      number=1, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=_b("").decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
   ],
   extensions=[
   ],
@@ -110,12 +196,20 @@ _POLICY = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=129,
-  serialized_end=153,
+  serialized_start=274,
+  serialized_end=306,
 )
 
+_PAGE.oneofs_by_name['manifest_source'].fields.append(
+  _PAGE.fields_by_name['manifest'])
+_PAGE.fields_by_name['manifest'].containing_oneof = _PAGE.oneofs_by_name['manifest_source']
+_PAGE.oneofs_by_name['manifest_source'].fields.append(
+  _PAGE.fields_by_name['manifest_digest'])
+_PAGE.fields_by_name['manifest_digest'].containing_oneof = _PAGE.oneofs_by_name['manifest_source']
 DESCRIPTOR.message_types_by_name['Page'] = _PAGE
 DESCRIPTOR.message_types_by_name['Policy'] = _POLICY
+DESCRIPTOR.message_types_by_name['Manifest'] = _MANIFEST
+DESCRIPTOR.message_types_by_name['ManifestDigest'] = _MANIFESTDIGEST
 _sym_db.RegisterFileDescriptor(DESCRIPTOR)
 
 Page = _reflection.GeneratedProtocolMessageType('Page', (_message.Message,), dict(
@@ -132,6 +226,20 @@ Policy = _reflection.GeneratedProtocolMessageType('Policy', (_message.Message,),
   ))
 _sym_db.RegisterMessage(Policy)
 
+Manifest = _reflection.GeneratedProtocolMessageType('Manifest', (_message.Message,), dict(
+  DESCRIPTOR = _MANIFEST,
+  __module__ = 'policy_service_pb2'
+  # @@protoc_insertion_point(class_scope:Manifest)
+  ))
+_sym_db.RegisterMessage(Manifest)
+
+ManifestDigest = _reflection.GeneratedProtocolMessageType('ManifestDigest', (_message.Message,), dict(
+  DESCRIPTOR = _MANIFESTDIGEST,
+  __module__ = 'policy_service_pb2'
+  # @@protoc_insertion_point(class_scope:ManifestDigest)
+  ))
+_sym_db.RegisterMessage(ManifestDigest)
+
 
 
 _POLICYSERVICE = _descriptor.ServiceDescriptor(
@@ -140,8 +248,8 @@ _POLICYSERVICE = _descriptor.ServiceDescriptor(
   file=DESCRIPTOR,
   index=0,
   serialized_options=None,
-  serialized_start=155,
-  serialized_end=199,
+  serialized_start=308,
+  serialized_end=435,
   methods=[
   _descriptor.MethodDescriptor(
     name='GetPolicy',
@@ -152,6 +260,24 @@ _POLICYSERVICE = _descriptor.ServiceDescriptor(
     output_type=_POLICY,
     serialized_options=None,
   ),
+  _descriptor.MethodDescriptor(
+    name='GetPolicies',
+    full_name='PolicyService.GetPolicies',
+    index=1,
+    containing_service=None,
+    input_type=_PAGE,
+    output_type=_POLICY,
+    serialized_options=None,
+  ),
+  _descriptor.MethodDescriptor(
+    name='RegisterManifest',
+    full_name='PolicyService.RegisterManifest',
+    index=2,
+    containing_service=None,
+    input_type=_MANIFEST,
+    output_type=_MANIFESTDIGEST,
+    serialized_options=None,
+  ),
 ])
 _sym_db.RegisterServiceDescriptor(_POLICYSERVICE)
 
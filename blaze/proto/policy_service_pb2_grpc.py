@@ -19,6 +19,16 @@ class PolicyServiceStub(object):
         request_serializer=policy__service__pb2.Page.SerializeToString,
         response_deserializer=policy__service__pb2.Policy.FromString,
         )
+    self.GetPolicies = channel.stream_stream(
+        '/PolicyService/GetPolicies',
+        request_serializer=policy__service__pb2.Page.SerializeToString,
+        response_deserializer=policy__service__pb2.Policy.FromString,
+        )
+    self.RegisterManifest = channel.unary_unary(
+        '/PolicyService/RegisterManifest',
+        request_serializer=policy__service__pb2.Manifest.SerializeToString,
+        response_deserializer=policy__service__pb2.ManifestDigest.FromString,
+        )
 
 
 class PolicyServiceServicer(object):
@@ -32,6 +42,20 @@ class PolicyServiceServicer(object):
     context.set_details('Method not implemented!')
     raise NotImplementedError('Method not implemented!')
 
+  def GetPolicies(self, request_iterator, context):
+    # missing associated documentation comment in .proto file
+    pass
+    context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+    context.set_details('Method not implemented!')
+    raise NotImplementedError('Method not implemented!')
+
+  def RegisterManifest(self, request, context):
+    # missing associated documentation comment in .proto file
+    pass
+    context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+    context.set_details('Method not implemented!')
+    raise NotImplementedError('Method not implemented!')
+
 
 def add_PolicyServiceServicer_to_server(servicer, server):
   rpc_method_handlers = {
@@ -40,6 +64,16 @@ def add_PolicyServiceServicer_to_server(servicer, server):
           request_deserializer=policy__service__pb2.Page.FromString,
           response_serializer=policy__service__pb2.Policy.SerializeToString,
       ),
+      'GetPolicies': grpc.stream_stream_rpc_method_handler(
+          servicer.GetPolicies,
+          request_deserializer=policy__service__pb2.Page.FromString,
+          response_serializer=policy__service__pb2.Policy.SerializeToString,
+      ),
+      'RegisterManifest': grpc.unary_unary_rpc_method_handler(
+          servicer.RegisterManifest,
+          request_deserializer=policy__service__pb2.Manifest.FromString,
+          response_serializer=policy__service__pb2.ManifestDigest.SerializeToString,
+      ),
   }
   generic_handler = grpc.method_handlers_generic_handler(
       'PolicyService', rpc_method_handlers)
@@ -0,0 +1,164 @@
+"""
+This module defines a micro-batching inference layer for the policy service, which steps the episodes of
+concurrent policy requests together so that the agent runs one forward pass per step for all of them
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional
+
+from blaze.action import Policy
+from blaze.config.config import Config
+from blaze.environment.environment import Environment
+from blaze.logger import logger as log
+from blaze.model.model import AgentPool, compute_actions, get_initial_state
+
+# the default time to wait for more requests after the first request of a batch arrives
+BATCH_WINDOW_MS = 5.0
+# the default maximum number of episodes stepped in one forward pass
+MAX_BATCH_SIZE = 64
+
+
+class Episode:
+    """ The state of the episode that generates the push policy of one request """
+
+    __slots__ = ("env", "obs", "action", "reward", "state", "future")
+
+    def __init__(self, config: Config):
+        self.env = Environment(config)
+        self.obs = self.env.observation
+        self.action = self.env.action_space.sample()
+        self.reward = 0.0
+        self.state: Optional[list] = None
+        self.future: "Future[Policy]" = Future()
+
+
+class InferenceBatcher:
+    """
+    InferenceBatcher generates push policies for concurrent requests on a single background thread. When
+    it is idle, the first request starts a batch window of window_ms, during which further requests join
+    the batch; requests that arrive while episodes are in flight join at the next step. Each step computes
+    the next action of every in-flight episode with one batched call to the agent, and each request is
+    answered as soon as its episode finishes.
+
+    The batcher borrows an agent from the pool while it has episodes in flight, and returns it when idle.
+    """
+
+    def __init__(
+        self, agent_pool: AgentPool, window_ms: float = BATCH_WINDOW_MS, max_batch_size: int = MAX_BATCH_SIZE
+    ):
+        assert max_batch_size > 0
+        self.agent_pool = agent_pool
+        self.window_ms = window_ms
+        self.max_batch_size = max_batch_size
+        self.pending: "queue.Queue[Optional[Episode]]" = queue.Queue()
+        # the number of batched steps, and the total number of episodes stepped in them
+        self.num_steps = 0
+        self.num_stepped = 0
+        self.thread = threading.Thread(target=self.run, name="inference-batcher", daemon=True)
+        self.thread.start()
+
+    def submit(self, config: Config) -> "Future[Policy]":
+        """ Starts generating the push policy for the given configuration and returns its future """
+        episode = Episode(config)
+        self.pending.put(episode)
+        return episode.future
+
+    def compute_policy(self, config: Config) -> Policy:
+        """ Generates the push policy for the given configuration, blocking until it is complete """
+        return self.submit(config).result()
+
+    @property
+    def mean_batch_size(self) -> float:
+        """ Returns the mean number of episodes stepped in each batch """
+        return self.num_stepped / self.num_steps if self.num_steps else 0.0
+
+    def close(self):
+        """ Stops the batcher after the in-flight episodes finish """
+        self.pending.put(None)
+        self.thread.join()
+
+    def collect(self, episodes: List[Episode]) -> bool:
+        """
+        Adds pending requests to the in-flight episodes, waiting for the first one and then for the batch
+        window if there are none in flight
+
+        :return: False if the batcher was closed
+        """
+        deadline = None
+        if not episodes:
+            episode = self.pending.get()
+            if episode is None:
+                return False
+            episodes.append(episode)
+            deadline = time.monotonic() + self.window_ms / 1000
+
+        while len(episodes) < self.max_batch_size:
+            try:
+                timeout = None if deadline is None else deadline - time.monotonic()
+                if timeout is None or timeout <= 0:
+                    episode = self.pending.get_nowait()
+                else:
+                    episode = self.pending.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if episode is None:
+                # finish the in-flight episodes before stopping
+                self.pending.put(None)
+                break
+            episodes.append(episode)
+        return True
+
+    def run(self):
+        """ Collects and steps batches of episodes until the batcher is closed """
+        episodes: List[Episode] = []
+        agent = None
+        while self.collect(episodes):
+            try:
+                if agent is None:
+                    agent = self.agent_pool.acquire(episodes[0].env.config)
+                episodes = self.step(agent, episodes)
+            except Exception as e:  # pylint: disable=broad-except
+                log.error("failed to compute actions", error=repr(e), batch_size=len(episodes))
+                for episode in episodes:
+                    episode.future.set_exception(e)
+                episodes = []
+            if not episodes and agent is not None:
+                self.agent_pool.release(agent)
+                agent = None
+
+    def step(self, agent, episodes: List[Episode]) -> List[Episode]:
+        """
+        Applies the next action of each episode, computed in one batch, and completes the requests of the
+        episodes that finished
+
+        :return: the episodes that are still in flight
+        """
+        self.num_steps += 1
+        self.num_stepped += len(episodes)
+        for episode in episodes:
+            if episode.state is None:
+                episode.state = get_initial_state(agent)
+        (actions, states) = compute_actions(
+            agent,
+            [episode.obs for episode in episodes],
+            [episode.state for episode in episodes],
+            [episode.action for episode in episodes],
+            [episode.reward for episode in episodes],
+        )
+
+        in_flight = []
+        for (episode, action, state) in zip(episodes, actions, states):
+            (episode.action, episode.state) = (action, state)
+            try:
+                (episode.obs, episode.reward, completed, _) = episode.env.step(action)
+            except Exception as e:  # pylint: disable=broad-except
+                episode.future.set_exception(e)
+                continue
+            if completed:
+                episode.future.set_result(episode.env.policy)
+            else:
+                in_flight.append(episode)
+        return in_flight
@@ -1,14 +1,37 @@
 """ Defines a test client that queries the gRPC server to get a policy """
 import json
+from typing import Dict, Iterable, List, Tuple, Union
 
 import grpc
 
 from blaze.action import Policy
+from blaze.config import manifest as manifest_format
 from blaze.config.client import ClientEnvironment
 from blaze.config.environment import EnvironmentConfig
 from blaze.proto import policy_service_pb2
 from blaze.proto import policy_service_pb2_grpc
 
+# a manifest is either sent with the request, or referred to by the digest returned by Client.register_manifest
+PageManifest = Union[EnvironmentConfig, str]
+
+
+def create_page(
+    url: str, client_env: ClientEnvironment, manifest: Union[bytes, str], request_id: int = 0
+) -> policy_service_pb2.Page:
+    """ Creates the request for the given page, with either the serialized manifest or its digest """
+    page = policy_service_pb2.Page(
+        url=url,
+        bandwidth_kbps=client_env.bandwidth,
+        latency_ms=client_env.latency,
+        cpu_slowdown=client_env.cpu_slowdown,
+        request_id=request_id,
+    )
+    if isinstance(manifest, str):
+        page.manifest_digest = manifest
+    else:
+        page.manifest = manifest
+    return page
+
 
 class Client:
     """
@@ -19,15 +42,38 @@ class Client:
         self.channel = channel
         self.stub = policy_service_pb2_grpc.PolicyServiceStub(channel)
 
-    def get_policy(self, url: str, client_env: ClientEnvironment, manifest: EnvironmentConfig) -> Policy:
-        """ Queries the policy service for a push policy for the given configuration """
-        page = policy_service_pb2.Page(
-            url=url,
-            bandwidth_kbps=client_env.bandwidth,
-            latency_ms=client_env.latency,
-            cpu_slowdown=client_env.cpu_slowdown,
-            manifest=manifest.serialize(),
-        )
+    def register_manifest(self, manifest: EnvironmentConfig) -> str:
+        """
+        Registers the given manifest with the policy service, and returns the digest that later requests can
+        refer to it by instead of sending it again
+        """
+        return self.stub.RegisterManifest(policy_service_pb2.Manifest(manifest=manifest_format.dumps(manifest))).digest
 
+    def get_policy(self, url: str, client_env: ClientEnvironment, manifest: PageManifest) -> Policy:
+        """ Queries the policy service for a push policy for the given configuration """
+        page = create_page(url, client_env, manifest if isinstance(manifest, str) else manifest_format.dumps(manifest))
         policy_res = self.stub.GetPolicy(page)
         return Policy.from_dict(json.loads(policy_res.policy))
+
+    def get_policies(self, pages: Iterable[Tuple[str, ClientEnvironment, PageManifest]]) -> List[Policy]:
+        """
+        Queries the policy service for the push policies of the given (url, client_env, manifest) pages over
+        a single GetPolicies stream, and returns them in the order of the pages. Each distinct manifest is
+        only serialized once
+        """
+        # the serialized manifests by identity, which keep a reference to the manifest so its id is not reused
+        manifests: Dict[int, Tuple[EnvironmentConfig, bytes]] = {}
+        requests = []
+        for (request_id, (url, client_env, manifest)) in enumerate(pages):
+            if isinstance(manifest, str):
+                requests.append(create_page(url, client_env, manifest, request_id))
+                continue
+            if id(manifest) not in manifests:
+                manifests[id(manifest)] = (manifest, manifest_format.dumps(manifest))
+            requests.append(create_page(url, client_env, manifests[id(manifest)][1], request_id))
+
+        # the policies are streamed back as they complete, so they are put back in order by their request_id
+        policies: List[Policy] = [None] * len(requests)
+        for policy_res in self.stub.GetPolicies(iter(requests)):
+            policies[policy_res.request_id] = Policy.from_dict(json.loads(policy_res.policy))
+        return policies
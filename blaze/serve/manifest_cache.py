@@ -0,0 +1,92 @@
+"""
+This module defines a cache of the manifests sent to the policy service, so that the manifest of a page
+that is requested repeatedly is only decoded, and its execution graph only built, once
+"""
+
+import collections
+import hashlib
+import threading
+from typing import Callable, Dict, NamedTuple
+
+from blaze.config import manifest
+from blaze.config.environment import EnvironmentConfig
+from blaze.evaluator.simulator.execution_graph import ExecutionGraph, cache_execution_graph, get_execution_graph
+from blaze.proto import policy_service_pb2
+
+MAX_CACHED_MANIFESTS = 512
+
+
+def get_manifest_digest(data: bytes) -> str:
+    """ Returns the hex digest of the given manifest bytes, which identifies the manifest by its content """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def get_page_manifest_digest(page: policy_service_pb2.Page) -> str:
+    """ Returns the digest of the manifest of the given page, which either refers to it by digest or inlines it """
+    if page.WhichOneof("manifest_source") == "manifest_digest":
+        return page.manifest_digest
+    return get_manifest_digest(page.manifest)
+
+
+class CachedManifest(NamedTuple):
+    """ A decoded manifest and the execution graph of its page """
+
+    env_config: EnvironmentConfig
+    graph: ExecutionGraph
+
+
+class ManifestCache:
+    """
+    A bounded, thread-safe LRU cache of decoded manifests and their execution graphs, keyed by the digest
+    of the manifest bytes. Returning the same EnvironmentConfig for the same bytes lets the simulator reuse
+    the execution graph and the baseline simulations of the page, which are cached by its identity.
+    """
+
+    def __init__(self, max_size: int = MAX_CACHED_MANIFESTS):
+        self.max_size = max_size
+        self.manifests: "collections.OrderedDict[str, CachedManifest]" = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.manifests)
+
+    def get(self, data: bytes) -> EnvironmentConfig:
+        """
+        Returns the EnvironmentConfig of the given manifest bytes, decoding it and building its execution
+        graph if it is not cached. Raises a ValueError if the bytes are not a binary manifest
+        """
+        return self.get_by_digest(get_manifest_digest(data), lambda: data)
+
+    def get_by_digest(self, digest: str, load: Callable[[], bytes]) -> EnvironmentConfig:
+        """
+        Returns the EnvironmentConfig of the manifest with the given digest, calling `load` for its bytes only
+        if it is not cached
+        """
+        with self.lock:
+            cached = self.manifests.get(digest)
+            if cached is not None:
+                self.manifests.move_to_end(digest)
+                self.hits += 1
+        if cached is not None:
+            # the graph may have been evicted from the simulator's cache by other pages
+            cache_execution_graph(cached.graph)
+            return cached.env_config
+
+        env_config = manifest.loads(load()).to_environment_config()
+        cached = CachedManifest(env_config=env_config, graph=get_execution_graph(env_config))
+        with self.lock:
+            self.misses += 1
+            # another thread may have decoded the same manifest in the meantime, in which case its
+            # EnvironmentConfig is kept so that every request shares one
+            cached = self.manifests.setdefault(digest, cached)
+            while len(self.manifests) > self.max_size:
+                self.manifests.popitem(last=False)
+        return cached.env_config
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """ Returns the number of cached manifests, hits, and misses """
+        with self.lock:
+            return {"size": len(self.manifests), "hits": self.hits, "misses": self.misses}
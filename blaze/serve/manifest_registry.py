@@ -0,0 +1,100 @@
+"""
+This module defines a registry of the manifests registered with the policy service, so that clients can
+refer to a manifest by its digest instead of sending its bytes with every request
+"""
+
+import collections
+import os
+import tempfile
+import threading
+from typing import Dict, Optional
+
+from .manifest_cache import get_manifest_digest
+
+MAX_REGISTERED_MANIFESTS = 1024
+
+
+class UnknownManifestError(KeyError):
+    """ Raised when a request refers to a manifest digest that is not registered """
+
+
+class ManifestRegistry:
+    """
+    A thread-safe, content-addressed store of manifest bytes, keyed by their digest (see
+    blaze.serve.manifest_cache.get_manifest_digest). Up to max_size manifests are kept in memory, evicting
+    the least recently used. If a directory is given, every registered manifest is also written to it, so
+    that evicted manifests are read back from disk and registrations survive a restart of the server.
+    Without a directory, clients must register a manifest again once it is evicted.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_size: int = MAX_REGISTERED_MANIFESTS):
+        self.directory = directory
+        self.max_size = max_size
+        self.manifests: "collections.OrderedDict[str, bytes]" = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self):
+        return len(self.manifests)
+
+    def __contains__(self, digest: str):
+        with self.lock:
+            if digest in self.manifests:
+                return True
+        path = self.get_path(digest)
+        return path is not None and os.path.isfile(path)
+
+    def get_path(self, digest: str) -> Optional[str]:
+        """ Returns the path of the file of the manifest with the given digest, if manifests are stored on disk """
+        # digests are hex strings, so anything else cannot name a registered manifest
+        if not self.directory or not digest or not all(c in "0123456789abcdef" for c in digest):
+            return None
+        return os.path.join(self.directory, f"{digest}.manifest")
+
+    def register(self, data: bytes) -> str:
+        """ Stores the given manifest bytes and returns their digest """
+        digest = get_manifest_digest(data)
+        path = self.get_path(digest)
+        if path and not os.path.isfile(path):
+            # write to a temporary file first so that a manifest is never read back partially written
+            (fd, tmp_path) = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        self.put(digest, data)
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        """ Returns the bytes of the manifest with the given digest, or raises UnknownManifestError """
+        with self.lock:
+            data = self.manifests.get(digest)
+            if data is not None:
+                self.manifests.move_to_end(digest)
+                self.hits += 1
+                return data
+            self.misses += 1
+
+        path = self.get_path(digest)
+        if path is None or not os.path.isfile(path):
+            raise UnknownManifestError(digest)
+        with open(path, "rb") as f:
+            data = f.read()
+        self.put(digest, data)
+        return data
+
+    def put(self, digest: str, data: bytes):
+        """ Keeps the given manifest bytes in memory """
+        with self.lock:
+            self.manifests[digest] = data
+            self.manifests.move_to_end(digest)
+            while len(self.manifests) > self.max_size:
+                self.manifests.popitem(last=False)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """ Returns the number of manifests in memory, and the number of lookups that found them in memory or not """
+        with self.lock:
+            return {"size": len(self.manifests), "hits": self.hits, "misses": self.misses}
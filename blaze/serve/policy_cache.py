@@ -0,0 +1,132 @@
+"""
+This module defines a cache of the policies returned by the policy service, so that identical requests
+are only computed once while their policy is fresh
+"""
+
+import collections
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Tuple
+
+from blaze.proto import policy_service_pb2
+
+from .manifest_cache import get_page_manifest_digest
+
+MAX_CACHED_POLICIES = 4096
+# the default number of seconds a policy is served from the cache
+POLICY_TTL_S = 3600.0
+# the default bandwidth and latency steps that requests are quantized to
+BANDWIDTH_STEP_KBPS = 1000
+LATENCY_STEP_MS = 5
+
+PolicyKey = Tuple[str, int, int, int]
+
+
+class PolicyCache:
+    """
+    A bounded, thread-safe LRU cache of policy responses that expire ttl_s seconds after they are computed.
+    Requests are keyed by the digest of their manifest, their bandwidth and latency quantized to the given
+    steps, and their CPU slowdown. Concurrent requests with the same key share a single computation: the
+    first one computes the policy and the others wait for its result.
+    """
+
+    def __init__(
+        self,
+        max_size: int = MAX_CACHED_POLICIES,
+        ttl_s: float = POLICY_TTL_S,
+        bandwidth_step_kbps: int = BANDWIDTH_STEP_KBPS,
+        latency_step_ms: int = LATENCY_STEP_MS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self.bandwidth_step_kbps = bandwidth_step_kbps
+        self.latency_step_ms = latency_step_ms
+        self.clock = clock
+        self.policies: "collections.OrderedDict[PolicyKey, Tuple[float, policy_service_pb2.Policy]]" = (
+            collections.OrderedDict()
+        )
+        self.in_flight: Dict[PolicyKey, "Future[policy_service_pb2.Policy]"] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self.policies)
+
+    def key(self, page: policy_service_pb2.Page) -> PolicyKey:
+        """ Returns the cache key of the given page """
+        return (
+            get_page_manifest_digest(page),
+            round(page.bandwidth_kbps / self.bandwidth_step_kbps),
+            round(page.latency_ms / self.latency_step_ms),
+            page.cpu_slowdown,
+        )
+
+    def get(
+        self, page: policy_service_pb2.Page, compute: Callable[[], policy_service_pb2.Policy]
+    ) -> policy_service_pb2.Policy:
+        """
+        Returns the cached policy of the given page if it has not expired, waits for it if another request is
+        computing it, or computes it with `compute` and caches it otherwise. Errors are not cached, and are
+        raised to every request that waited for the computation.
+        """
+        key = self.key(page)
+        with self.lock:
+            entry = self.policies.get(key)
+            if entry is not None:
+                if entry[0] > self.clock():
+                    self.policies.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self.policies[key]
+                self.expirations += 1
+
+            future = self.in_flight.get(key)
+            if future is None:
+                self.misses += 1
+                future = self.in_flight[key] = Future()
+                owner = True
+            else:
+                self.shared += 1
+                owner = False
+
+        if not owner:
+            return future.result()
+
+        try:
+            policy = compute()
+        except Exception as e:
+            with self.lock:
+                del self.in_flight[key]
+            future.set_exception(e)
+            raise
+
+        with self.lock:
+            del self.in_flight[key]
+            self.policies[key] = (self.clock() + self.ttl_s, policy)
+            while len(self.policies) > self.max_size:
+                self.policies.popitem(last=False)
+                self.evictions += 1
+        future.set_result(policy)
+        return policy
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the number of cached policies, hits, misses, requests that shared another request's
+        computation, and policies evicted for space or expired
+        """
+        with self.lock:
+            return {
+                "size": len(self.policies),
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared": self.shared,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
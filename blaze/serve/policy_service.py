@@ -1,46 +1,280 @@
 """ Defines classes and methods to instantiate, evaluate, and serve push policies """
+import asyncio
+import contextlib
 import json
-from typing import Dict
+from concurrent.futures import Executor
+from typing import AsyncIterator, Callable, Iterator, Optional, Tuple, TypeVar
 
 import grpc
 
 from blaze.config import client
-from blaze.config import environment
-from blaze.config.config import get_config
-from blaze.model.model import ModelInstance, SavedModel
+from blaze.config.config import Config, get_config
+from blaze.model.model import AgentPool, ModelInstance, SavedModel
 from blaze.proto import policy_service_pb2
 from blaze.proto import policy_service_pb2_grpc
 
+from .batcher import InferenceBatcher, MAX_BATCH_SIZE
+from .manifest_cache import ManifestCache, get_page_manifest_digest
+from .manifest_registry import ManifestRegistry, UnknownManifestError
+from .policy_cache import POLICY_TTL_S, PolicyCache
+from .policy_table import PolicyTable
+
+T = TypeVar("T")
+
+
+# the range of round trip latencies of the client environments that models are trained in
+LATENCY_RANGE_MS = (
+    min(client.network_to_latency_range(network_type)[0] for network_type in client.NetworkType),
+    max(client.network_to_latency_range(network_type)[1] for network_type in client.NetworkType),
+)
+
+
+class InvalidPageError(ValueError):
+    """ Raised when a request describes a client environment that policies cannot be computed for """
+
+
+def get_request_error(e: Exception) -> Tuple[grpc.StatusCode, str]:
+    """ Returns the status code and details to abort an RPC with for an error caused by its request """
+    if isinstance(e, UnknownManifestError):
+        return (grpc.StatusCode.NOT_FOUND, f"unknown manifest digest: {e}")
+    if isinstance(e, InvalidPageError):
+        return (grpc.StatusCode.INVALID_ARGUMENT, f"invalid page: {e}")
+    return (grpc.StatusCode.INVALID_ARGUMENT, f"invalid manifest: {e}")
+
+
+def call_without_stop_iteration(fn: Callable[..., T], *args) -> T:
+    """
+    Calls fn with the given arguments, raising a StopIteration that escapes it as a RuntimeError instead.
+    Functions are run on executors this way, since a StopIteration cannot be set on an asyncio future and
+    would leave the RPC waiting forever
+    """
+    try:
+        return fn(*args)
+    except StopIteration as e:
+        raise RuntimeError(f"{fn.__name__} raised StopIteration") from e
+
 
 class PolicyService(policy_service_pb2_grpc.PolicyServiceServicer):
     """
     Implements the PolicyServerServicer interface to satsify the proto-defined RPC interface for
-    serving push policies
+    serving push policies. The agents of the saved model are restored once and kept in a pool of up to
+    num_agents agents, which should match the number of RPC workers so that no request waits for an agent.
+
+    If batch_window_ms is given, policies are generated by an InferenceBatcher, which steps the episodes of
+    concurrent requests together with one forward pass of a single agent per step.
+
+    If a policy_table is given, requests are answered with the policy precomputed for the nearest client
+    environment bucket of the page, and the agent only runs for pages that are not in the table.
+
+    Responses are cached for policy_ttl_s seconds, and identical concurrent requests share one computation.
+
+    Clients can register a manifest once with RegisterManifest, and then refer to it by its digest instead
+    of sending it with every request. Registered manifests are kept by the manifest_registry, which keeps
+    them in memory only unless it is given a directory.
     """
 
-    def __init__(self, saved_model: SavedModel, config=get_config()):
+    def __init__(
+        self,
+        saved_model: SavedModel,
+        config=get_config(),
+        num_agents: int = 1,
+        batch_window_ms: Optional[float] = None,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        policy_table: Optional[PolicyTable] = None,
+        policy_ttl_s: float = POLICY_TTL_S,
+        manifest_registry: Optional[ManifestRegistry] = None,
+    ):
         self.config = config
         self.saved_model = saved_model
-        self.policies: Dict[str, policy_service_pb2.Policy] = {}
+        self.agent_pool = AgentPool(saved_model, num_agents)
+        self.policies = PolicyCache(ttl_s=policy_ttl_s)
+        self.manifest_cache = ManifestCache()
+        self.manifest_registry = manifest_registry if manifest_registry is not None else ManifestRegistry()
+        self.policy_table = policy_table
+        self.batcher = (
+            InferenceBatcher(self.agent_pool, batch_window_ms, max_batch_size) if batch_window_ms is not None else None
+        )
 
     def GetPolicy(self, request: policy_service_pb2.Page, context: grpc.ServicerContext) -> policy_service_pb2.Policy:
-        return self.create_policy(request)
+        try:
+            return self.create_policy(request)
+        except (ValueError, UnknownManifestError) as e:
+            # context.abort raises to end the RPC
+            context.abort(*get_request_error(e))
+            raise
+
+    def GetPolicies(
+        self, request_iterator: Iterator[policy_service_pb2.Page], context: grpc.ServicerContext
+    ) -> Iterator[policy_service_pb2.Policy]:
+        for request in request_iterator:
+            try:
+                yield self.create_response(request)
+            except (ValueError, UnknownManifestError) as e:
+                context.abort(*get_request_error(e))
+                raise
+
+    def RegisterManifest(
+        self, request: policy_service_pb2.Manifest, context: grpc.ServicerContext
+    ) -> policy_service_pb2.ManifestDigest:
+        try:
+            return self.register_manifest(request)
+        except ValueError as e:
+            context.abort(*get_request_error(e))
+            raise
+
+    @property
+    def stats(self) -> dict:
+        """ Returns the metrics of the policy cache, the manifest cache and registry, and the policy table """
+        return {
+            "policies": self.policies.stats,
+            "manifests": self.manifest_cache.stats,
+            "registered_manifests": self.manifest_registry.stats,
+            "policy_table": self.policy_table.stats if self.policy_table is not None else {},
+        }
+
+    def register_manifest(self, request: policy_service_pb2.Manifest) -> policy_service_pb2.ManifestDigest:
+        """ Registers the given manifest, decoding it first so that it is cached and known to be valid """
+        self.manifest_cache.get(request.manifest)
+        return policy_service_pb2.ManifestDigest(digest=self.manifest_registry.register(request.manifest))
+
+    def create_response(self, page: policy_service_pb2.Page) -> policy_service_pb2.Policy:
+        """ Returns the push policy for the given page of a GetPolicies stream, tagged with its request_id """
+        # cached policies are shared between requests, so the response is a copy
+        return policy_service_pb2.Policy(policy=self.create_policy(page).policy, request_id=page.request_id)
 
     def create_policy(self, page: policy_service_pb2.Page) -> policy_service_pb2.Policy:
+        """ Returns the formatted push policy for the given page, from the cache if it is fresh """
+        # pages outside of the trained client environments are rejected even if the cache or the policy table
+        # has a policy for a nearby client environment
+        self.get_client_environment(page)
+        return self.policies.get(page, lambda: self.compute_policy(page))
+
+    def compute_policy(self, page: policy_service_pb2.Page) -> policy_service_pb2.Policy:
         """ Creates and formats a push policy for the given page """
-        model = self.create_model_instance(page)
+        if self.policy_table is not None:
+            policy_json = self.policy_table.lookup(
+                get_page_manifest_digest(page), page.bandwidth_kbps, page.latency_ms, page.cpu_slowdown
+            )
+            if policy_json is not None:
+                return policy_service_pb2.Policy(policy=policy_json)
+
+        if self.batcher:
+            policy = self.batcher.compute_policy(self.create_config(page))
+        else:
+            with self.create_model_instance(page) as model:
+                policy = model.policy
         response = policy_service_pb2.Policy()
-        response.policy = json.dumps(model.policy.as_dict)
+        response.policy = json.dumps(policy.as_dict)
         return response
 
-    def create_model_instance(self, page: policy_service_pb2.Page) -> ModelInstance:
-        """ Instantiates a model for the given page """
-        # convert page network_type and device_speed to client environment
-        client_env = client.get_client_environment_from_parameters(
-            page.bandwidth_kbps, page.latency_ms, page.cpu_slowdown
-        )
-        # create environment config
-        env_config = environment.EnvironmentConfig.deserialize(page.manifest)
+    @contextlib.contextmanager
+    def create_model_instance(self, page: policy_service_pb2.Page) -> Iterator[ModelInstance]:
+        """ Instantiates a model for the given page with an agent from the pool, which is returned on exit """
+        with self.agent_pool.instantiate(self.create_config(page)) as model:
+            yield model
+
+    def create_config(self, page: policy_service_pb2.Page) -> Config:
+        """ Creates the configuration of the environment of the given page """
+        client_env = self.get_client_environment(page)
+        # create environment config, reusing it if the same manifest was sent before; only the binary
+        # manifest format is accepted, since unpickling the request payload could run arbitrary code
+        env_config = self.manifest_cache.get_by_digest(get_page_manifest_digest(page), lambda: self.get_manifest(page))
         # instantiate a model for this config - TODO is to populate cached_urls
-        config = self.config.with_mutations(env_config=env_config, client_env=client_env, cached_urls=set())
-        return self.saved_model.instantiate(config)
+        return self.config.with_mutations(env_config=env_config, client_env=client_env, cached_urls=set())
+
+    def get_client_environment(self, page: policy_service_pb2.Page) -> client.ClientEnvironment:
+        """
+        Returns the client environment of the given page, or raises an InvalidPageError if it is outside of
+        the client environments that models are trained in
+        """
+        if not LATENCY_RANGE_MS[0] <= page.latency_ms <= LATENCY_RANGE_MS[1]:
+            raise InvalidPageError(f"latency of {page.latency_ms} ms is outside of {LATENCY_RANGE_MS}")
+        try:
+            return client.get_client_environment_from_parameters(
+                page.bandwidth_kbps, page.latency_ms, page.cpu_slowdown
+            )
+        except ValueError as e:
+            raise InvalidPageError(str(e)) from e
+
+    def get_manifest(self, page: policy_service_pb2.Page) -> bytes:
+        """ Returns the manifest bytes of the given page, from the registry if the page refers to it by digest """
+        if page.WhichOneof("manifest_source") == "manifest_digest":
+            return self.manifest_registry.get(page.manifest_digest)
+        return page.manifest
+
+
+class AsyncPolicyService(policy_service_pb2_grpc.PolicyServiceServicer):
+    """
+    Serves the RPCs of a PolicyService on an asyncio gRPC server. Policies are computed on the given
+    executor, so that the event loop keeps accepting requests while the agents run. The pages of a
+    GetPolicies stream are computed concurrently, and each policy is sent as soon as it is ready, so a slow
+    page does not hold up the pages behind it on the same stream.
+    """
+
+    def __init__(self, policy_service: PolicyService, executor: Executor):
+        self.policy_service = policy_service
+        self.executor = executor
+
+    async def GetPolicy(
+        self, request: policy_service_pb2.Page, context: grpc.aio.ServicerContext
+    ) -> policy_service_pb2.Policy:
+        loop = asyncio.get_event_loop()
+        try:
+            return await loop.run_in_executor(
+                self.executor, call_without_stop_iteration, self.policy_service.create_policy, request
+            )
+        except (ValueError, UnknownManifestError) as e:
+            await context.abort(*get_request_error(e))
+            raise
+
+    async def GetPolicies(
+        self, request_iterator: AsyncIterator[policy_service_pb2.Page], context: grpc.aio.ServicerContext
+    ) -> AsyncIterator[policy_service_pb2.Policy]:
+        loop = asyncio.get_event_loop()
+        # the futures of the pages as they complete, followed by None once the client stops sending
+        completed: "asyncio.Queue[Optional[asyncio.Future]]" = asyncio.Queue()
+        in_flight = 0
+
+        async def read_requests():
+            nonlocal in_flight
+            try:
+                async for request in request_iterator:
+                    in_flight += 1
+                    future = loop.run_in_executor(
+                        self.executor, call_without_stop_iteration, self.policy_service.create_response, request
+                    )
+                    future.add_done_callback(completed.put_nowait)
+            finally:
+                completed.put_nowait(None)
+
+        reader = asyncio.ensure_future(read_requests())
+        reading = True
+        try:
+            while reading or in_flight:
+                future = await completed.get()
+                if future is None:
+                    reading = False
+                    continue
+                in_flight -= 1
+                try:
+                    response = future.result()
+                except (ValueError, UnknownManifestError) as e:
+                    await context.abort(*get_request_error(e))
+                    raise
+                yield response
+            # raises any error that stopped the requests from being read
+            await reader
+        finally:
+            reader.cancel()
+
+    async def RegisterManifest(
+        self, request: policy_service_pb2.Manifest, context: grpc.aio.ServicerContext
+    ) -> policy_service_pb2.ManifestDigest:
+        loop = asyncio.get_event_loop()
+        try:
+            return await loop.run_in_executor(
+                self.executor, call_without_stop_iteration, self.policy_service.register_manifest, request
+            )
+        except ValueError as e:
+            await context.abort(*get_request_error(e))
+            raise
@@ -0,0 +1,109 @@
+"""
+This module defines a table of push policies precomputed for a grid of client environments, which the
+policy service can answer requests from without running the agent
+"""
+
+import math
+import sqlite3
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+from blaze.config.client import ClientEnvironment
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS policies (
+    manifest_digest TEXT NOT NULL,
+    bandwidth INTEGER NOT NULL,
+    latency INTEGER NOT NULL,
+    cpu_slowdown INTEGER NOT NULL,
+    policy TEXT NOT NULL,
+    PRIMARY KEY (manifest_digest, cpu_slowdown, bandwidth, latency)
+)
+"""
+
+
+class PolicyBucket(NamedTuple):
+    """ A policy precomputed for the client environment at the centre of a bucket """
+
+    bandwidth: int
+    latency: int
+    cpu_slowdown: int
+    # the JSON-encoded policy, as returned by the policy service
+    policy: str
+
+
+def get_bucket_distance(bucket: PolicyBucket, bandwidth: int, latency: int) -> float:
+    """
+    Returns the distance between the given bandwidth and latency and the centre of the given bucket. Both
+    are compared on a log scale, since the effect of a difference depends on its size relative to the value
+    """
+    return math.hypot(
+        math.log1p(bandwidth) - math.log1p(bucket.bandwidth), math.log1p(latency) - math.log1p(bucket.latency)
+    )
+
+
+class PolicyTable:
+    """
+    PolicyTable stores precomputed policies in a SQLite database, indexed by the digest of the manifest
+    bytes (see blaze.serve.manifest_cache.get_manifest_digest) and the client environment of each bucket.
+    The buckets of a manifest are read into memory the first time it is looked up, so lookups do not touch
+    the disk. Only buckets with the same CPU slowdown as the request are considered, since the slowdown
+    only takes a few discrete values.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(SCHEMA)
+        self.lock = threading.Lock()
+        self.buckets: Dict[str, List[PolicyBucket]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM policies").fetchone()[0]
+
+    def put(self, manifest_digest: str, client_env: ClientEnvironment, policy: str):
+        """ Stores the JSON-encoded policy of the given manifest in the bucket of the given client environment """
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO policies VALUES (?, ?, ?, ?, ?)",
+                (manifest_digest, client_env.bandwidth, client_env.latency, client_env.cpu_slowdown, policy),
+            )
+            self.db.commit()
+            self.buckets.pop(manifest_digest, None)
+
+    def get_buckets(self, manifest_digest: str) -> List[PolicyBucket]:
+        """ Returns the buckets of the given manifest, reading them from the database the first time """
+        with self.lock:
+            buckets = self.buckets.get(manifest_digest)
+            if buckets is None:
+                rows = self.db.execute(
+                    "SELECT bandwidth, latency, cpu_slowdown, policy FROM policies WHERE manifest_digest = ?",
+                    (manifest_digest,),
+                )
+                buckets = self.buckets[manifest_digest] = [PolicyBucket._make(row) for row in rows]
+            return buckets
+
+    def lookup(self, manifest_digest: str, bandwidth: int, latency: int, cpu_slowdown: int) -> Optional[str]:
+        """
+        Returns the JSON-encoded policy of the bucket nearest to the given client environment, or None if no
+        policies were precomputed for the manifest and CPU slowdown
+        """
+        buckets = [bucket for bucket in self.get_buckets(manifest_digest) if bucket.cpu_slowdown == cpu_slowdown]
+        with self.lock:
+            if not buckets:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return min(buckets, key=lambda bucket: get_bucket_distance(bucket, bandwidth, latency)).policy
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """ Returns the number of lookups answered from the table and the number of misses """
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        """ Closes the database """
+        self.db.close()
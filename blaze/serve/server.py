@@ -1,4 +1,6 @@
 """ Defines a general gRPC server that serves all defined RPCs """
+import asyncio
+import threading
 from concurrent import futures
 
 import grpc
@@ -6,6 +8,8 @@ import grpc
 from blaze.config.serve import ServeConfig
 from blaze.proto import policy_service_pb2_grpc
 
+from .policy_service import AsyncPolicyService, PolicyService
+
 
 class Server:
     """
@@ -32,3 +36,50 @@ class Server:
         """ Stops the server """
         if self.server_started:
             self.grpc_server.stop(0)
+
+
+class AsyncServer:
+    """
+    A gRPC server with the same interface as Server, built on grpc.aio. The server runs an asyncio event
+    loop on a background thread, which handles every connection and stream, while policies are computed on
+    a pool of max_workers threads. Unlike Server, the number of open streams is not limited by the number
+    of workers, and the pages of a GetPolicies stream are answered concurrently.
+    """
+
+    def __init__(self, config: ServeConfig):
+        self.config = config
+        self.executor = futures.ThreadPoolExecutor(max_workers=config.max_workers)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="grpc-aio-server", daemon=True)
+        self.thread.start()
+        self.grpc_server = self.run(self.create_server())
+        self.server_started = False
+
+    def run(self, coroutine):
+        """ Runs the given coroutine on the event loop of the server and returns its result """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    async def create_server(self) -> grpc.aio.Server:
+        """ Creates the gRPC server, which must be created on the event loop that runs it """
+        return grpc.aio.server()
+
+    def set_policy_service(self, policy_service: PolicyService):
+        """ Enables the policy service with the given policy_service """
+        policy_service_pb2_grpc.add_PolicyServiceServicer_to_server(
+            AsyncPolicyService(policy_service, self.executor), self.grpc_server
+        )
+
+    def start(self):
+        """ Starts the server on the configured host and port. This method does not block """
+        self.grpc_server.add_insecure_port("{}:{}".format(self.config.host, self.config.port))
+        self.run(self.grpc_server.start())
+        self.server_started = True
+
+    def stop(self):
+        """ Stops the server and its event loop """
+        if self.server_started:
+            self.run(self.grpc_server.stop(0))
+            self.server_started = False
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.executor.shutdown(wait=False)
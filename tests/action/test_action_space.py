@@ -1,6 +1,7 @@
 from collections import Counter
 
 import gym
+import numpy as np
 import pytest
 
 from blaze.action import Action
@@ -143,6 +144,50 @@ class TestPushActionSpace:
         )
         assert self.action_space.group_id_to_source_id == original_push
 
+    def test_use_action_preload_removes_preloaded_resource(self):
+        group = list(self.pushable_groups)[0]
+        res = group.resources[1]
+        self.action_space.use_action(Action((0, res.order), is_push=False, source=group.resources[0], push=res))
+        remaining = self.action_space.group_id_to_source_id.get(0, set())
+        assert remaining == set(r.source_id for r in group.resources) - {res.source_id} or len(group.resources) == 2
+        assert res.source_id not in remaining
+
+    def test_action_mask(self):
+        mask = self.action_space.action_mask
+        (num_groups, num_sources) = (self.action_space.spaces[0].n, self.action_space.spaces[1].n)
+        assert mask.dtype == bool
+        assert mask.shape == (num_groups + 2 * num_sources,)
+        (group_mask, source_mask, push_mask) = np.split(mask, [num_groups, num_groups + num_sources])
+
+        # every value that is part of a valid action is marked, and no other value is
+        valid_actions = [
+            (g, s, p)
+            for g in range(num_groups)
+            for s in range(num_sources)
+            for p in range(num_sources)
+            if self.action_space.contains((g, s, p)) and (g, s, p) != NOOP_PUSH_ACTION_ID
+        ]
+        assert set(np.flatnonzero(group_mask)) == set(g for (g, _, _) in valid_actions)
+        assert set(np.flatnonzero(source_mask)) == set(s for (_, s, _) in valid_actions)
+        assert set(np.flatnonzero(push_mask)) == set(p for (_, _, p) in valid_actions)
+
+    def test_action_mask_tracks_used_actions(self):
+        action_space = PushActionSpace(self.push_groups)
+        action_space.seed(2048)
+        while not action_space.empty():
+            action_id = action_space.sample()
+            mask = action_space.action_mask
+            (g, s, p) = action_id
+            assert mask[g] and mask[action_space.spaces[0].n + s] and mask[-action_space.spaces[2].n + p]
+            action_space.use_action(action_space.decode_action_id(action_id))
+
+        # only the noop value of each component is left
+        assert list(np.flatnonzero(action_space.action_mask)) == [
+            0,
+            action_space.spaces[0].n,
+            action_space.spaces[0].n + action_space.spaces[1].n,
+        ]
+
 
 class TestPreloadActionSpace:
     def setup(self):
@@ -262,6 +307,24 @@ class TestPreloadActionSpace:
                 # else:
                 #     assert action.is_noop
 
+    def test_action_mask(self):
+        mask = self.action_space.action_mask
+        max_order = self.action_space.max_order
+        assert mask.shape == (2 * (max_order + 1),)
+        (source_mask, preload_mask) = np.split(mask, 2)
+        assert not preload_mask[0]
+        assert list(np.flatnonzero(preload_mask)) == self.action_space.preload_list
+        assert list(np.flatnonzero(source_mask)) == list(range(max_order))
+
+        # using the last resource removes it and the sources that could only have preloaded it
+        last = self.action_space.order_to_resource_map[max_order]
+        self.action_space.use_action(
+            Action((0, max_order), is_push=False, source=self.action_space.order_to_resource_map[0], push=last)
+        )
+        (source_mask, preload_mask) = np.split(self.action_space.action_mask, 2)
+        assert not preload_mask[max_order]
+        assert list(np.flatnonzero(source_mask)) == list(range(max_order - 1))
+
 
 class TestActionSpace:
     def setup(self):
@@ -414,3 +477,21 @@ class TestActionSpace:
 
         assert len(all_actions) == num_non_noop
         assert action_space.empty()
+
+    def test_action_mask(self):
+        action_space = ActionSpace(self.push_groups)
+        mask = action_space.action_mask
+        assert mask.shape == (sum(space.n for space in action_space.spaces),)
+        assert mask[: action_space.num_action_types].all()
+        push_size = sum(space.n for space in action_space.push_space.spaces)
+        push_start = action_space.num_action_types
+        preload_start = push_start + push_size
+        assert (mask[push_start:preload_start] == action_space.push_space.action_mask).all()
+        assert (mask[preload_start:] == action_space.preload_space.action_mask).all()
+
+    def test_action_mask_with_disabled_push(self):
+        action_space = ActionSpace(self.push_groups, disable_push=True)
+        assert action_space.action_mask[: action_space.num_action_types].all()
+        while not action_space.preload_space.empty():
+            action_space.use_action(action_space.preload_space.decode_action_id(action_space.preload_space.sample()))
+        assert list(np.flatnonzero(action_space.action_mask[: action_space.num_action_types])) == [0]
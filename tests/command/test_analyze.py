@@ -1,12 +1,23 @@
+import json
+import tempfile
+
+import numpy as np
 import pytest
 from unittest import mock
 
 from blaze.chrome.har import har_from_json
-from blaze.command.analyze import page_load_time
-from blaze.config.client import get_default_client_environment
+from blaze.command.analyze import page_load_time, profile_simulator, simulate_grid
+from blaze.config import manifest
+from blaze.config.client import (
+    get_client_environment_from_parameters,
+    get_client_environment_grid,
+    get_default_client_environment,
+)
 from blaze.config.config import get_config
 from blaze.config.environment import EnvironmentConfig
+from blaze.evaluator.simulator import Simulator
 
+from tests.mocks.config import get_env_config
 from tests.mocks.har import get_har_json
 
 
@@ -37,3 +48,73 @@ class TestPageLoadTime:
     #     assert capture_har_in_mahimahi_args[2] == client_env
     #
     #     mock_rmdir.assert_called_with(record_webpage_args[1])
+
+
+class TestProfileSimulator:
+    def test_profile_simulator_exits_without_manifest(self):
+        with pytest.raises(SystemExit):
+            profile_simulator([])
+
+    def test_profile_simulator(self):
+        env_config = get_env_config()
+        with mock.patch("builtins.print") as mock_print:
+            with tempfile.NamedTemporaryFile() as config_file:
+                manifest.dump(env_config, config_file.name)
+                profile_simulator(["--from_manifest", config_file.name, "--iterations", "2"])
+
+        output = json.loads(mock_print.call_args_list[0][0][0])
+        assert output["iterations"] == 2
+        assert len(output["results"]) == 1
+        stats = output["results"][0]["stats"]
+        assert output["results"][0]["plt"] > 0
+        assert stats["steps"] > 0
+        assert stats["nodes_scheduled"] == 2 * (len(env_config.har_resources) - 1)
+        assert stats["total_ms"] > 0
+
+
+class TestSimulateGrid:
+    def test_simulate_grid_exits_without_manifest(self):
+        with pytest.raises(SystemExit):
+            simulate_grid([])
+
+    def test_simulate_grid(self):
+        env_config = get_env_config()
+        with mock.patch("builtins.print") as mock_print:
+            with tempfile.NamedTemporaryFile() as config_file:
+                manifest.dump(env_config, config_file.name)
+                simulate_grid(
+                    [
+                        "--from_manifest",
+                        config_file.name,
+                        "--bandwidths",
+                        "1000",
+                        "12000",
+                        "--latencies",
+                        "20",
+                        "100",
+                        "200",
+                        "--cpu_slowdowns",
+                        "2",
+                    ]
+                )
+
+        output = json.loads(mock_print.call_args_list[0][0][0])
+        assert output["metric"] == "plt"
+        assert output["bandwidths"] == [1000, 12000]
+        assert output["latencies"] == [20, 100, 200]
+        assert output["cpu_slowdowns"] == [2]
+        client_env = get_client_environment_from_parameters(12000, 100, 2)
+        assert output["plt"][1][1][0] == Simulator(env_config).simulate_load_time(client_env)
+
+    def test_simulate_grid_covers_client_environments(self):
+        env_config = get_env_config()
+        with mock.patch("builtins.print") as mock_print:
+            with tempfile.NamedTemporaryFile() as config_file:
+                manifest.dump(env_config, config_file.name)
+                simulate_grid(["--from_manifest", config_file.name, "--resolution", "1"])
+
+        output = json.loads(mock_print.call_args_list[0][0][0])
+        client_envs = get_client_environment_grid(1)
+        assert output["bandwidths"] == sorted(set(client_env.bandwidth for client_env in client_envs))
+        assert output["cpu_slowdowns"] == [1, 2, 4]
+        assert np.array(output["plt"]).shape == (len(output["bandwidths"]), len(output["latencies"]), 3)
@@ -4,6 +4,7 @@ import tempfile
 
 from blaze.action import ActionSpace
 from blaze.command.client import query
+from blaze.config import manifest
 from blaze.config.config import get_config
 from blaze.environment import Environment
 from blaze.model.model import SavedModel
@@ -42,7 +43,7 @@ class TestClient:
 
             with tempfile.NamedTemporaryFile() as manifest_file:
                 config = get_env_config()
-                config.save_file(manifest_file.name)
+                manifest.dump(config, manifest_file.name)
                 query(
                     [
                         "--manifest",
@@ -3,6 +3,7 @@ import pytest
 import tempfile
 
 from blaze.command.cluster import cluster
+from blaze.config import manifest
 
 from tests.mocks.apted_server import apted_server
 from tests.mocks.config import get_env_config
@@ -19,7 +20,8 @@ class TestClient:
         env_config = get_env_config()
         with tempfile.TemporaryDirectory() as tmp_dir:
             for i in range(3):
-                env_config._replace(request_url=env_config.request_url + str(i)).save_file(f"{tmp_dir}/{i}.manifest")
+                page_config = env_config._replace(request_url=env_config.request_url + str(i))
+                manifest.dump(page_config, f"{tmp_dir}/{i}.manifest")
 
             with apted_server(port, distances):
                 cluster(["--apted_port", str(port), tmp_dir])
@@ -1,15 +1,18 @@
+import pickle
 import tempfile
 
 import pytest
 from unittest import mock
 
 from blaze.chrome.har import har_from_json
-from blaze.command.manifest import view_manifest
+from blaze.command.manifest import convert_manifest, view_manifest
+from blaze.config import manifest
 from blaze.config.environment import EnvironmentConfig
 from blaze.preprocess.har import har_entries_to_resources
 from blaze.preprocess.resource import resource_list_to_push_groups
 from blaze.preprocess.url import Url
 
+from tests.mocks.config import get_env_config
 from tests.mocks.har import get_har_json
 
 
@@ -28,7 +31,7 @@ class TestViewManifest:
 
         with mock.patch("builtins.print") as mock_print:
             with tempfile.NamedTemporaryFile() as config_file:
-                config.save_file(config_file.name)
+                manifest.dump(config, config_file.name)
                 view_manifest([config_file.name])
         assert mock_print.call_count > 5
 
@@ -50,7 +53,7 @@ class TestViewManifest:
         )
         with mock.patch("builtins.print") as mock_print:
             with tempfile.NamedTemporaryFile() as config_file:
-                config.save_file(config_file.name)
+                manifest.dump(config, config_file.name)
                 view_manifest(["--trainable", config_file.name])
         assert mock_print.call_count > 5
 
@@ -61,3 +64,29 @@ class TestViewManifest:
 
         pre_graph_text = printed_text.split("Execution Graph")[0]
         assert not any(group.name in pre_graph_text for group in config.push_groups if not group.trainable)
+
+
+class TestConvertManifest:
+    def test_convert_manifest_exits_with_missing_arguments(self):
+        with pytest.raises(SystemExit):
+            convert_manifest([])
+
+    def test_convert_manifest(self):
+        config = get_env_config()
+        with tempfile.NamedTemporaryFile() as config_file:
+            with open(config_file.name, "wb") as f:
+                pickle.dump(config, f)
+            convert_manifest([config_file.name])
+            with open(config_file.name, "rb") as f:
+                assert manifest.is_manifest(f.read())
+            assert manifest.load_file(config_file.name) == config
+
+    def test_convert_manifest_save_as(self):
+        config = get_env_config()
+        with tempfile.NamedTemporaryFile() as config_file, tempfile.NamedTemporaryFile() as new_config_file:
+            with open(config_file.name, "wb") as f:
+                pickle.dump(config, f)
+            convert_manifest(["--save_as", new_config_file.name, config_file.name])
+            with open(config_file.name, "rb") as f:
+                assert pickle.load(f) == config
+            assert manifest.load(new_config_file.name).to_environment_config() == config
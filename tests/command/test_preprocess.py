@@ -4,6 +4,7 @@ import pytest
 from unittest import mock
 
 from blaze.command.preprocess import preprocess, record
+from blaze.config import manifest
 from blaze.config.client import get_default_client_environment
 from blaze.config.config import get_config
 from blaze.config.environment import EnvironmentConfig
@@ -39,7 +40,7 @@ class TestPreprocess:
                 with mock.patch("blaze.preprocess.record.capture_har_in_replay_server", new=HarReturner(hars)):
                     preprocess(["https://cs.ucla.edu", "--output", output_file.name, "--record_dir", output_dir])
 
-                config = EnvironmentConfig.load_file(output_file.name)
+                config = manifest.load_file(output_file.name)
                 assert config.replay_dir == output_dir
                 assert config.request_url == "https://cs.ucla.edu"
                 assert config.push_groups
@@ -73,7 +74,7 @@ class TestPreprocess:
                         ]
                     )
 
-                config = EnvironmentConfig.load_file(output_file.name)
+                config = manifest.load_file(output_file.name)
                 assert config.replay_dir == output_dir
                 assert config.request_url == "https://cs.ucla.edu"
                 assert config.push_groups
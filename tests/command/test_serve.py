@@ -1,3 +1,4 @@
+import json
 import pytest
 import tempfile
 from unittest import mock
@@ -6,9 +7,17 @@ from ray.rllib.agents.a3c import A3CAgent
 from ray.rllib.agents.dqn import ApexAgent
 from ray.rllib.agents.ppo import PPOAgent
 
-from blaze.command.serve import serve
+from blaze.action import ActionSpace, Policy
+from blaze.command.serve import precompute_policies, serve
+from blaze.config import manifest
+from blaze.config.client import get_client_environment_grid
 from blaze.config.config import get_config
 from blaze.config.train import TrainConfig
+from blaze.environment import Environment
+from blaze.model.model import SavedModel
+from blaze.serve.manifest_cache import get_manifest_digest
+from blaze.serve.policy_table import PolicyTable
+from tests.mocks.agent import mock_agent_with_action_space
 from tests.mocks.config import get_env_config
 from tests.mocks.serve import MockServer
 
@@ -27,7 +36,7 @@ class TestServe:
     @mock.patch("ray.shutdown")
     def test_serve_a3c(self, mock_shutdown, mock_init, mock_sleep):
         mock_sleep.side_effect = (KeyboardInterrupt(), None, None, None, None)
-        with mock.patch("blaze.serve.server.Server", new=MockServer()) as mock_server:
+        with mock.patch("blaze.serve.server.AsyncServer", new=MockServer()) as mock_server:
             with tempfile.NamedTemporaryFile() as model_location:
                 serve(
                     [
@@ -48,6 +57,7 @@ class TestServe:
         assert mock_server.args[0].max_workers == 16
         assert mock_server.set_policy_service_args[0].saved_model.cls == A3CAgent
         assert mock_server.set_policy_service_args[0].saved_model.location == model_location.name
+        assert mock_server.set_policy_service_args[0].agent_pool.size == 16
         assert mock_server.start_called
         assert mock_server.stop_called
 
@@ -56,7 +66,7 @@ class TestServe:
     @mock.patch("ray.shutdown")
     def test_serve_apex(self, mock_shutdown, mock_init, mock_sleep):
         mock_sleep.side_effect = (KeyboardInterrupt(), None, None, None, None)
-        with mock.patch("blaze.serve.server.Server", new=MockServer()) as mock_server:
+        with mock.patch("blaze.serve.server.AsyncServer", new=MockServer()) as mock_server:
             with tempfile.NamedTemporaryFile() as model_location:
                 serve(
                     [
@@ -77,6 +87,7 @@ class TestServe:
         assert mock_server.args[0].max_workers == 16
         assert mock_server.set_policy_service_args[0].saved_model.cls == ApexAgent
         assert mock_server.set_policy_service_args[0].saved_model.location == model_location.name
+        assert mock_server.set_policy_service_args[0].agent_pool.size == 16
         assert mock_server.start_called
         assert mock_server.stop_called
 
@@ -85,7 +96,7 @@ class TestServe:
     @mock.patch("ray.shutdown")
     def test_serve_ppo(self, mock_shutdown, mock_init, mock_sleep):
         mock_sleep.side_effect = KeyboardInterrupt()
-        with mock.patch("blaze.serve.server.Server", new=MockServer()) as mock_server:
+        with mock.patch("blaze.serve.server.AsyncServer", new=MockServer()) as mock_server:
             with tempfile.NamedTemporaryFile() as model_location:
                 serve(
                     [
@@ -106,5 +117,103 @@ class TestServe:
         assert mock_server.args[0].max_workers == 16
         assert mock_server.set_policy_service_args[0].saved_model.cls == PPOAgent
         assert mock_server.set_policy_service_args[0].saved_model.location == model_location.name
+        assert mock_server.set_policy_service_args[0].agent_pool.size == 16
+        assert mock_server.start_called
+        assert mock_server.stop_called
+
+    @mock.patch("time.sleep")
+    @mock.patch("ray.init")
+    @mock.patch("ray.shutdown")
+    def test_serve_sync_server(self, mock_shutdown, mock_init, mock_sleep):
+        mock_sleep.side_effect = KeyboardInterrupt()
+        with mock.patch("blaze.serve.server.Server", new=MockServer()) as mock_server:
+            with tempfile.NamedTemporaryFile() as model_location:
+                with tempfile.TemporaryDirectory() as manifest_dir:
+                    serve(["--model", "PPO", "--sync_server", "--manifest_dir", manifest_dir, model_location.name])
+
+        assert mock_server.set_policy_service_args[0].saved_model.cls == PPOAgent
+        assert mock_server.set_policy_service_args[0].manifest_registry.directory == manifest_dir
         assert mock_server.start_called
         assert mock_server.stop_called
+
+    @mock.patch("time.sleep")
+    @mock.patch("ray.init")
+    @mock.patch("ray.shutdown")
+    def test_serve_preload_manifest(self, mock_shutdown, mock_init, mock_sleep):
+        mock_sleep.side_effect = KeyboardInterrupt()
+        env_config = get_env_config()
+        with mock.patch("blaze.serve.server.AsyncServer", new=MockServer()) as mock_server:
+            with mock.patch.object(SavedModel, "create_agent", side_effect=lambda config: object()) as create_agent:
+                with tempfile.NamedTemporaryFile() as model_location, tempfile.NamedTemporaryFile() as manifest_file:
+                    manifest.dump(env_config, manifest_file.name)
+                    serve(
+                        [
+                            "--model",
+                            "PPO",
+                            "--max_workers",
+                            "3",
+                            "--preload_manifest",
+                            manifest_file.name,
+                            model_location.name,
+                        ]
+                    )
+
+        agent_pool = mock_server.set_policy_service_args[0].agent_pool
+        assert agent_pool.num_agents == 3
+        assert len(agent_pool.idle_agents) == 3
+        assert create_agent.call_count == 3
+        assert create_agent.call_args[0][0].env_config == env_config
+
+    @mock.patch("time.sleep")
+    @mock.patch("ray.init")
+    @mock.patch("ray.shutdown")
+    def test_serve_observation_options(self, mock_shutdown, mock_init, mock_sleep):
+        mock_sleep.side_effect = KeyboardInterrupt()
+        with mock.patch("blaze.serve.server.AsyncServer", new=MockServer()) as mock_server:
+            with tempfile.NamedTemporaryFile() as model_location:
+                serve(["--model", "PPO", "--flat_observation", "--action_mask", model_location.name])
+
+        assert mock_server.set_policy_service_args[0].config.flat_observation
+        assert mock_server.set_policy_service_args[0].config.action_mask
+
+
+class TestPrecomputePolicies:
+    def test_precompute_policies_exits_with_invalid_arguments(self):
+        with pytest.raises(SystemExit):
+            precompute_policies([])
+
+    def test_precompute_policies_invalid_model_location(self):
+        with pytest.raises(IOError):
+            precompute_policies(["--model", "PPO", "--manifests", "a", "--output", "b", "/non/existent/file"])
+
+    @mock.patch("ray.init")
+    @mock.patch("ray.shutdown")
+    def test_precompute_policies(self, mock_shutdown, mock_init):
+        env_config = get_env_config()
+        action_space = ActionSpace(env_config.trainable_push_groups)
+        saved_model = SavedModel(mock_agent_with_action_space(action_space), Environment, "", {})
+        with mock.patch("blaze.model.ppo.get_model", return_value=saved_model):
+            with tempfile.NamedTemporaryFile() as model_location, tempfile.NamedTemporaryFile() as manifest_file:
+                with tempfile.NamedTemporaryFile(suffix=".db") as table_file:
+                    manifest.dump(env_config, manifest_file.name)
+                    precompute_policies(
+                        [
+                            "--model",
+                            "PPO",
+                            "--manifests",
+                            manifest_file.name,
+                            "--output",
+                            table_file.name,
+                            model_location.name,
+                        ]
+                    )
+                    table = PolicyTable(table_file.name)
+                    grid = get_client_environment_grid()
+                    assert len(table) == len(grid)
+                    digest = get_manifest_digest(manifest.dumps(env_config))
+                    for client_env in grid:
+                        policy = table.lookup(digest, client_env.bandwidth, client_env.latency, client_env.cpu_slowdown)
+                        assert isinstance(Policy.from_dict(json.loads(policy)), Policy)
+                    table.close()
+        mock_init.assert_called_once()
+        mock_shutdown.assert_called_once()
@@ -4,6 +4,7 @@ import tempfile
 from unittest import mock
 
 from blaze.command.train import train
+from blaze.config import manifest
 from blaze.config.config import get_config
 from blaze.config.train import TrainConfig
 from tests.mocks.config import get_env_config
@@ -26,9 +27,9 @@ class TestTrain:
     def test_train_a3c(self, mock_train):
         env_config = get_env_config()
         train_config = TrainConfig(experiment_name="experiment_name", num_workers=4)
-        config = get_config(env_config, reward_func=1, use_aft=False)
+        config = get_config(env_config, reward_func=1, use_aft=False, flat_observation=False, action_mask=False)
         with tempfile.NamedTemporaryFile() as env_file:
-            env_config.save_file(env_file.name)
+            manifest.dump(env_config, env_file.name)
             train(
                 [
                     train_config.experiment_name,
@@ -48,9 +49,9 @@ class TestTrain:
     def test_train_apex(self, mock_train):
         env_config = get_env_config()
         train_config = TrainConfig(experiment_name="experiment_name", num_workers=4)
-        config = get_config(env_config, reward_func=1, use_aft=False)
+        config = get_config(env_config, reward_func=1, use_aft=False, flat_observation=False, action_mask=False)
         with tempfile.NamedTemporaryFile() as env_file:
-            env_config.save_file(env_file.name)
+            manifest.dump(env_config, env_file.name)
             train(
                 [
                     train_config.experiment_name,
@@ -70,9 +71,9 @@ class TestTrain:
     def test_train_ppo(self, mock_train):
         env_config = get_env_config()
         train_config = TrainConfig(experiment_name="experiment_name", num_workers=4)
-        config = get_config(env_config, reward_func=1, use_aft=False)
+        config = get_config(env_config, reward_func=1, use_aft=False, flat_observation=False, action_mask=False)
         with tempfile.NamedTemporaryFile() as env_file:
-            env_config.save_file(env_file.name)
+            manifest.dump(env_config, env_file.name)
             train(
                 [
                     train_config.experiment_name,
@@ -92,9 +93,9 @@ class TestTrain:
     def test_train_resume(self, mock_train):
         env_config = get_env_config()
         train_config = TrainConfig(experiment_name="experiment_name", num_workers=4, resume=True)
-        config = get_config(env_config, reward_func=1, use_aft=False)
+        config = get_config(env_config, reward_func=1, use_aft=False, flat_observation=False, action_mask=False)
         with tempfile.NamedTemporaryFile() as env_file:
-            env_config.save_file(env_file.name)
+            manifest.dump(env_config, env_file.name)
             train(
                 [
                     train_config.experiment_name,
@@ -115,9 +116,9 @@ class TestTrain:
     def test_train_no_resume(self, mock_train):
         env_config = get_env_config()
         train_config = TrainConfig(experiment_name="experiment_name", num_workers=4, resume=False)
-        config = get_config(env_config, reward_func=1, use_aft=False)
+        config = get_config(env_config, reward_func=1, use_aft=False, flat_observation=False, action_mask=False)
         with tempfile.NamedTemporaryFile() as env_file:
-            env_config.save_file(env_file.name)
+            manifest.dump(env_config, env_file.name)
             train(
                 [
                     train_config.experiment_name,
@@ -138,9 +139,9 @@ class TestTrain:
     def test_train_with_use_aft(self, mock_train):
         env_config = get_env_config()
         train_config = TrainConfig(experiment_name="experiment_name", num_workers=4)
-        config = get_config(env_config, reward_func=1, use_aft=True)
+        config = get_config(env_config, reward_func=1, use_aft=True, flat_observation=False, action_mask=False)
         with tempfile.NamedTemporaryFile() as env_file:
-            env_config.save_file(env_file.name)
+            manifest.dump(env_config, env_file.name)
             train(
                 [
                     train_config.experiment_name,
@@ -161,9 +162,9 @@ class TestTrain:
     def test_train_with_reward_func(self, mock_train):
         env_config = get_env_config()
         train_config = TrainConfig(experiment_name="experiment_name", num_workers=4)
-        config = get_config(env_config, reward_func=3, use_aft=False)
+        config = get_config(env_config, reward_func=3, use_aft=False, flat_observation=False, action_mask=False)
         with tempfile.NamedTemporaryFile() as env_file:
-            env_config.save_file(env_file.name)
+            manifest.dump(env_config, env_file.name)
             train(
                 [
                     train_config.experiment_name,
@@ -180,3 +181,50 @@ class TestTrain:
 
         mock_train.assert_called_once()
         mock_train.assert_called_with(train_config, config)
+
+    @mock.patch("blaze.model.ppo.train")
+    def test_train_with_action_mask(self, mock_train):
+        env_config = get_env_config()
+        train_config = TrainConfig(experiment_name="experiment_name", num_workers=4)
+        config = get_config(env_config, reward_func=1, use_aft=False, flat_observation=False, action_mask=True)
+        with tempfile.NamedTemporaryFile() as env_file:
+            manifest.dump(env_config, env_file.name)
+            train(
+                [
+                    train_config.experiment_name,
+                    "--workers",
+                    str(train_config.num_workers),
+                    "--model",
+                    "PPO",
+                    "--manifest_file",
+                    env_file.name,
+                    "--action_mask",
+                ]
+            )
+
+        mock_train.assert_called_once()
+        mock_train.assert_called_with(train_config, config)
+
+    @mock.patch("blaze.model.ppo.train")
+    def test_train_with_envs_per_worker(self, mock_train):
+        env_config = get_env_config()
+        train_config = TrainConfig(experiment_name="experiment_name", num_workers=4, num_envs_per_worker=8)
+        config = get_config(env_config, reward_func=1, use_aft=False, flat_observation=False, action_mask=False)
+        with tempfile.NamedTemporaryFile() as env_file:
+            manifest.dump(env_config, env_file.name)
+            train(
+                [
+                    train_config.experiment_name,
+                    "--workers",
+                    str(train_config.num_workers),
+                    "--envs_per_worker",
+                    str(train_config.num_envs_per_worker),
+                    "--model",
+                    "PPO",
+                    "--manifest_file",
+                    env_file.name,
+                ]
+            )
+
+        mock_train.assert_called_once()
+        mock_train.assert_called_with(train_config, config)
@@ -1,3 +1,5 @@
+import pytest
+
 from blaze.config import client
 
 
@@ -62,6 +64,18 @@ class TestClientEnvironment:
         assert isinstance(env.bandwidth, int) and env.bandwidth > 0
         assert isinstance(env.latency, int) and env.latency > 0
 
+    def test_get_env_from_parameters(self):
+        env = client.get_client_environment_from_parameters(8000, 40, 2)
+        assert env.network_speed == client.NetworkSpeed.SLOW
+        assert env.device_speed == client.DeviceSpeed.FAST_MOBILE
+        assert (env.bandwidth, env.latency, env.cpu_slowdown) == (8000, 40, 2)
+
+    def test_get_env_from_invalid_parameters(self):
+        with pytest.raises(ValueError):
+            client.get_client_environment_from_parameters(10 ** 9, 40, 2)
+        with pytest.raises(ValueError):
+            client.get_client_environment_from_parameters(12000, 40, 7)
+
     def test_get_fast_mobile_env(self):
         env = client.get_fast_mobile_client_environment()
         assert env.latency == 20
@@ -103,3 +117,32 @@ class TestClientEnvironment:
         for _ in range(10):
             env = client.get_random_client_environment()
             assert env.latency % 2 == 0
+
+
+class TestGetClientEnvironmentGrid:
+    def test_covers_every_bucket(self):
+        grid = client.get_client_environment_grid()
+        buckets = {(env.network_type, env.network_speed, env.device_speed) for env in grid}
+        assert len(buckets) == len(client.NetworkType) * len(client.NetworkSpeed) * len(client.DeviceSpeed)
+        for env in grid:
+            bw_low, bw_high = client.network_to_bandwidth_range(env.network_type, env.network_speed)
+            latency_low, latency_high = client.network_to_latency_range(env.network_type)
+            assert bw_low <= env.bandwidth <= bw_high
+            assert latency_low <= env.latency <= latency_high
+            assert env.cpu_slowdown == client.device_speed_to_cpu_slowdown(env.device_speed)
+
+    def test_resolution(self):
+        grid = client.get_client_environment_grid(3)
+        assert len(grid) > len(client.get_client_environment_grid())
+        wired = {
+            (env.bandwidth, env.latency)
+            for env in grid
+            if env.network_type == client.NetworkType.WIRED
+            and env.network_speed == client.NetworkSpeed.FAST
+            and env.device_speed == client.DeviceSpeed.DESKTOP
+        }
+        assert len(wired) == 9
+
+    def test_no_duplicates(self):
+        grid = client.get_client_environment_grid(2)
+        assert len({(env.bandwidth, env.latency, env.cpu_slowdown) for env in grid}) == len(grid)
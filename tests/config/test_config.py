@@ -14,12 +14,15 @@ class TestConfig:
         assert conf.client_env is None
         assert conf.reward_func is None
         assert conf.use_aft is None
+        assert conf.flat_observation is None
+        assert conf.action_mask is None
+        assert conf.plt_store is None
 
     def test_items(self):
         conf = config.get_config()
         items = conf.items()
         assert all(len(v) == 2 for v in items)
-        assert len(items) == 7
+        assert len(items) == 10
 
     def test_with_mutations(self):
         conf = config.Config(http2push_image="", chrome_bin="")
@@ -1,4 +1,7 @@
+import pickle
 import tempfile
+
+from blaze.config import manifest
 from blaze.config.environment import PushGroup, Resource, ResourceType, EnvironmentConfig
 from tests.mocks.config import get_env_config
 
@@ -49,8 +52,8 @@ class TestEnvironmentConfig:
     def test_pickle(self):
         c = get_env_config()
         with tempfile.NamedTemporaryFile() as tmp_file:
-            c.save_file(tmp_file.name)
-            loaded_c = EnvironmentConfig.load_file(tmp_file.name)
+            manifest.dump(c, tmp_file.name)
+            loaded_c = manifest.load_file(tmp_file.name)
             assert c.request_url == loaded_c.request_url
             assert c.replay_dir == loaded_c.replay_dir
             assert len(c.push_groups) == len(loaded_c.push_groups)
@@ -59,3 +62,20 @@ class TestEnvironmentConfig:
                 assert len(loaded_c.push_groups[i].resources) == len(group.resources)
                 for j, res in enumerate(group.resources):
                     assert loaded_c.push_groups[i].resources[j] == res
+
+    def test_serialize(self):
+        c = get_env_config()
+        data = manifest.dumps(c)
+        assert data.startswith(b"BLZM")
+        assert manifest.deserialize(data) == c
+
+    def test_load_pickled_file(self):
+        c = get_env_config()
+        with tempfile.NamedTemporaryFile() as tmp_file:
+            with open(tmp_file.name, "wb") as f:
+                pickle.dump(c, f)
+            assert manifest.load_file(tmp_file.name) == c
+
+    def test_deserialize_pickle(self):
+        c = get_env_config()
+        assert manifest.deserialize(pickle.dumps(c)) == c
@@ -0,0 +1,195 @@
+import json
+import pickle
+import random
+import tempfile
+
+import numpy as np
+import pytest
+
+from blaze.config import manifest
+from blaze.config.environment import EnvironmentConfig, ResourceType
+
+from tests.mocks.config import get_env_config
+
+
+def get_header(data: bytes) -> dict:
+    (_, _, header_len) = manifest.PREAMBLE.unpack_from(data, 0)
+    return json.loads(data[manifest.PREAMBLE.size : manifest.PREAMBLE.size + header_len].decode("utf-8"))
+
+
+def with_header(data: bytes, header: dict) -> bytes:
+    (_, _, header_len) = manifest.PREAMBLE.unpack_from(data, 0)
+    encoded = json.dumps(header).encode("utf-8")
+    preamble = manifest.PREAMBLE.pack(manifest.MAGIC, manifest.VERSION, len(encoded))
+    # the section offsets are relative to the end of the header, so the sections can follow any header
+    return preamble + encoded + data[manifest.PREAMBLE.size + header_len :]
+
+
+def with_column(data: bytes, name: str, values: list) -> bytes:
+    (_, _, header_len) = manifest.PREAMBLE.unpack_from(data, 0)
+    (offset, dtype, _) = get_header(data)["sections"][name]
+    encoded = np.array(values, dtype=np.dtype(dtype)).tobytes()
+    start = manifest.PREAMBLE.size + header_len + offset
+    return data[:start] + encoded + data[start + len(encoded) :]
+
+
+class TestManifest:
+    def setup(self):
+        self.env_config = get_env_config()
+
+    def test_round_trip(self):
+        data = manifest.dumps(self.env_config)
+        assert manifest.is_manifest(data)
+        loaded = manifest.loads(data).to_environment_config()
+        assert loaded == self.env_config
+        assert all(isinstance(res.type, ResourceType) for res in loaded.har_resources)
+        assert all(isinstance(res.size, int) for res in loaded.har_resources)
+
+    def test_round_trip_empty(self):
+        env_config = EnvironmentConfig(replay_dir="", request_url="http://example.com", push_groups=[])
+        loaded = manifest.loads(manifest.dumps(env_config)).to_environment_config()
+        assert loaded == env_config
+
+    def test_dump_and_load(self):
+        with tempfile.NamedTemporaryFile() as tmp_file:
+            manifest.dump(self.env_config, tmp_file.name)
+            loaded = manifest.load(tmp_file.name)
+            assert loaded.request_url == self.env_config.request_url
+            assert loaded.replay_dir == self.env_config.replay_dir
+            assert loaded.to_environment_config() == self.env_config
+
+    def test_stores_each_url_and_record_once(self):
+        m = manifest.loads(manifest.dumps(self.env_config))
+        urls = {res.url for res in self.env_config.har_resources}
+        assert len(m.urls) == len(urls)
+        assert len(m.column("record.size")) == len(urls)
+        assert m.num_resources == len(self.env_config.har_resources)
+
+    def test_columns_are_lazy(self):
+        m = manifest.loads(manifest.dumps(self.env_config))
+        assert not m.columns
+        sizes = m.column("record.size")
+        assert list(m.columns) == ["record.size"]
+        assert sizes.dtype == np.int64
+        assert m.column("record.size") is sizes
+
+    def test_url(self):
+        m = manifest.loads(manifest.dumps(self.env_config))
+        urls = [m.url(i) for i in range(len(m.urls))]
+        assert urls == m.urls
+        assert m.url(0) == self.env_config.har_resources[0].url
+
+    def test_push_group(self):
+        m = manifest.loads(manifest.dumps(self.env_config))
+        for (i, group) in enumerate(self.env_config.push_groups):
+            assert m.push_group(i) == group
+
+    def test_rejects_pickle(self):
+        with pytest.raises(ValueError):
+            manifest.loads(pickle.dumps(self.env_config))
+
+    def test_rejects_unknown_version(self):
+        data = bytearray(manifest.dumps(self.env_config))
+        manifest.PREAMBLE.pack_into(data, 0, manifest.MAGIC, manifest.VERSION + 1, 0)
+        with pytest.raises(ValueError):
+            manifest.loads(bytes(data))
+
+    def test_rejects_truncated(self):
+        data = manifest.dumps(self.env_config)
+        with pytest.raises(ValueError):
+            manifest.loads(data[: len(data) // 2])
+
+    def test_convert(self):
+        with tempfile.NamedTemporaryFile() as pickle_file, tempfile.NamedTemporaryFile() as binary_file:
+            with open(pickle_file.name, "wb") as f:
+                pickle.dump(self.env_config, f)
+            manifest.convert(pickle_file.name, binary_file.name)
+            with open(pickle_file.name, "rb") as f:
+                assert not manifest.is_manifest(f.read())
+            assert manifest.load(binary_file.name).to_environment_config() == self.env_config
+
+    def test_convert_in_place(self):
+        with tempfile.NamedTemporaryFile() as pickle_file:
+            with open(pickle_file.name, "wb") as f:
+                pickle.dump(self.env_config, f)
+            manifest.convert(pickle_file.name)
+            assert manifest.load(pickle_file.name).to_environment_config() == self.env_config
+
+
+class TestManifestValidation:
+    def setup(self):
+        self.data = manifest.dumps(get_env_config())
+        self.header = get_header(self.data)
+
+    def test_accepts_rewritten_header(self):
+        assert manifest.loads(with_header(self.data, self.header)).to_environment_config() == get_env_config()
+
+    def test_rejects_missing_header_keys(self):
+        for key in ("request_url", "replay_dir", "groups", "sections"):
+            header = {k: v for (k, v) in self.header.items() if k != key}
+            with pytest.raises(ValueError):
+                manifest.loads(with_header(self.data, header))
+
+    def test_rejects_header_that_is_not_an_object(self):
+        with pytest.raises(ValueError):
+            manifest.loads(with_header(self.data, []))
+
+    def test_rejects_malformed_groups(self):
+        for group in ({}, {"id": "0", "name": "a", "trainable": True}, None):
+            with pytest.raises(ValueError):
+                manifest.loads(with_header(self.data, {**self.header, "groups": [group]}))
+
+    def test_rejects_missing_section(self):
+        sections = {k: v for (k, v) in self.header["sections"].items() if k != "record.size"}
+        with pytest.raises(ValueError):
+            manifest.loads(with_header(self.data, {**self.header, "sections": sections}))
+
+    def test_rejects_invalid_section_layout(self):
+        (offset, dtype, count) = self.header["sections"]["record.size"]
+        for section in ([-8, dtype, count], [offset, "<f8", count], [offset, "invalid", count], [offset, dtype, -1]):
+            sections = {**self.header["sections"], "record.size": section}
+            with pytest.raises(ValueError):
+                manifest.loads(with_header(self.data, {**self.header, "sections": sections}))
+
+    def test_rejects_section_beyond_buffer(self):
+        (offset, dtype, count) = self.header["sections"]["record.size"]
+        sections = {**self.header["sections"], "record.size": [offset + len(self.data), dtype, count]}
+        with pytest.raises(ValueError):
+            manifest.loads(with_header(self.data, {**self.header, "sections": sections}))
+
+    def test_rejects_columns_of_different_lengths(self):
+        (offset, dtype, count) = self.header["sections"]["har.group_id"]
+        sections = {**self.header["sections"], "har.group_id": [offset, dtype, count - 1]}
+        with pytest.raises(ValueError):
+            manifest.loads(with_header(self.data, {**self.header, "sections": sections}))
+
+    def test_rejects_unknown_resource_type(self):
+        with pytest.raises(ValueError):
+            manifest.loads(with_column(self.data, "record.type", [100]))
+
+    def test_rejects_out_of_range_indices(self):
+        for name in ("record.url", "har.index", "group.index"):
+            count = self.header["sections"][name][2]
+            for index in (-1, count + len(self.data)):
+                with pytest.raises(ValueError):
+                    manifest.loads(with_column(self.data, name, [index]))
+
+    def test_rejects_inconsistent_offsets(self):
+        for name in ("string_offsets", "group_offsets"):
+            for offsets in ([1], [0, len(self.data)]):
+                with pytest.raises(ValueError):
+                    manifest.loads(with_column(self.data, name, offsets))
+
+    def test_fuzz(self):
+        rand = random.Random(1024)
+        for _ in range(1000):
+            data = bytearray(self.data)
+            for _ in range(rand.randint(1, 4)):
+                data[rand.randrange(len(data))] = rand.randrange(256)
+            data = bytes(data[: rand.randint(0, len(data))] if rand.random() < 0.1 else data)
+            # a malformed manifest is rejected when it is opened, or decodes to some EnvironmentConfig
+            try:
+                env_config = manifest.loads(data).to_environment_config()
+            except ValueError:
+                continue
+            assert isinstance(env_config, EnvironmentConfig)
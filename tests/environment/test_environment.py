@@ -127,6 +127,38 @@ class TestEnvironment:
         assert obs and isinstance(obs, dict)
         assert self.environment.observation_space.contains(obs)
 
+    @mock.patch("blaze.evaluator.Analyzer.get_reward")
+    def test_flat_observation(self, mock_get_reward):
+        mock_get_reward.return_value = 1000
+        env = Environment(get_config(flat_observation=True))
+        assert env.observation_space.contains(env.observation)
+
+        action_id = get_action(env.action_space)
+        action = env.action_space.decode_action(action_id)
+        obs, _, _, _ = env.step(action_id)
+        assert env.observation_space.contains(obs)
+        if action.is_push:
+            assert obs["resources"][action.push.order][-2] == action.source.source_id + 1
+        if action.is_preload:
+            assert obs["resources"][action.push.order][-1] == action.source.order + 1
+
+    @mock.patch("blaze.evaluator.Analyzer.get_reward")
+    def test_action_mask(self, mock_get_reward):
+        mock_get_reward.return_value = 1000
+        env = Environment(get_config(action_mask=True))
+        obs = env.observation
+        assert env.observation_space.contains(obs)
+        assert (obs["action_mask"] == env.action_space.action_mask).all()
+
+        action_id = get_action(env.action_space)
+        obs, _, _, _ = env.step(action_id)
+        assert env.observation_space.contains(obs)
+        assert (obs["action_mask"] == env.action_space.action_mask).all()
+
+    def test_no_action_mask_by_default(self):
+        assert "action_mask" not in self.environment.observation
+        assert "action_mask" not in self.environment.observation_space.spaces
+
     def test_render(self):
         with pytest.raises(NotImplementedError):
             self.environment.render()
@@ -5,7 +5,14 @@ import numpy as np
 
 from blaze.action import ActionSpace, Policy
 from blaze.config.client import get_random_client_environment
-from blaze.environment.observation import get_observation, get_observation_space, MAX_RESOURCES
+from blaze.environment.observation import (
+    get_action_mask_size,
+    get_observation,
+    get_observation_space,
+    ObservationEncoder,
+    MAX_RESOURCES,
+    NUM_RESOURCE_FEATURES,
+)
 
 from tests.mocks.config import get_push_groups
 
@@ -15,6 +22,12 @@ class TestGetObservationSpace:
         space = get_observation_space()
         assert isinstance(space, gym.spaces.Dict)
 
+    def test_get_observation_space_with_action_mask(self):
+        action_space = ActionSpace(get_push_groups())
+        space = get_observation_space(action_mask_size=get_action_mask_size(action_space))
+        assert space.spaces["action_mask"].shape == (sum(s.n for s in action_space.spaces),)
+        assert space.spaces["action_mask"].contains(action_space.action_mask.astype(np.float32))
+
 
 class TestGetObservation:
     def setup(self):
@@ -151,3 +164,61 @@ class TestGetObservation:
         obs = get_observation(self.client_environment, self.push_groups, policy, cached_urls)
         for res in cached:
             assert obs["resources"][str(res.order)][1] == 1
+
+
+class TestObservationEncoder:
+    def setup(self):
+        self.push_groups = get_push_groups()
+        self.client_environment = get_random_client_environment()
+        resources = [res for group in self.push_groups for res in group.resources]
+        self.cached_urls = {res.url for res in resources[::3]}
+
+    def test_matches_get_observation(self):
+        action_space = ActionSpace(self.push_groups)
+        policy = Policy(action_space)
+        encoder = ObservationEncoder(self.push_groups)
+        encoder.reset(self.client_environment, self.cached_urls)
+
+        for _ in range(len(action_space) - 1):
+            action = action_space.decode_action(action_space.sample())
+            if policy.apply_action(action):
+                encoder.apply_action(action)
+            action_space.use_action(action)
+
+            obs = encoder.observation
+            expected = get_observation(self.client_environment, self.push_groups, policy, self.cached_urls)
+            assert obs["client"] == expected["client"]
+            assert all(np.array_equal(obs["resources"][i], expected["resources"][i]) for i in expected["resources"])
+
+    def test_flat_observation(self):
+        space = get_observation_space(flat=True)
+        action_space = ActionSpace(self.push_groups)
+        policy = Policy(action_space)
+        while not policy:
+            policy.apply_action(action_space.sample())
+
+        encoder = ObservationEncoder(self.push_groups, flat=True)
+        encoder.reset(self.client_environment, self.cached_urls, policy)
+        obs = encoder.observation
+        assert obs["resources"].shape == (MAX_RESOURCES, NUM_RESOURCE_FEATURES)
+        assert space.contains(obs)
+
+        expected = get_observation(self.client_environment, self.push_groups, policy, self.cached_urls)
+        for (i, row) in expected["resources"].items():
+            assert np.array_equal(obs["resources"][int(i)], row)
+
+    def test_observations_are_snapshots(self):
+        action_space = ActionSpace(self.push_groups)
+        encoder = ObservationEncoder(self.push_groups, flat=True)
+        encoder.reset(self.client_environment, set())
+        obs = encoder.observation
+
+        action = action_space.decode_action(action_space.sample())
+        while not action.is_push:
+            action = action_space.decode_action(action_space.sample())
+        encoder.apply_action(action)
+        assert encoder.observation["resources"][action.push.order][-2] == action.source.source_id + 1
+        assert obs["resources"][action.push.order][-2] == 0
+
+        encoder.reset(self.client_environment, set())
+        assert np.array_equal(encoder.observation["resources"], obs["resources"])
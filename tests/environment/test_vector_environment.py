@@ -0,0 +1,84 @@
+from unittest import mock
+
+import numpy as np
+
+from blaze.action import ActionSpace
+from blaze.action.action import NOOP_ACTION_ID
+from blaze.environment import Environment, VectorEnvironment
+from blaze.environment.environment import NOOP_ACTION_REWARD
+from blaze.environment.observation import MAX_RESOURCES, NUM_RESOURCE_FEATURES
+
+from tests.mocks.config import get_config
+
+
+def get_push_action(action_space: ActionSpace):
+    # pick a push action, which is always applied the first time
+    action = action_space.sample()
+    while not action_space.decode_action(action).is_push:
+        action = action_space.sample()
+    return action
+
+
+class TestVectorEnvironment:
+    def setup(self):
+        self.num_envs = 3
+        self.vector_env = VectorEnvironment(get_config(), self.num_envs)
+        self.vector_env.seed(1024)
+
+    def test_init(self):
+        assert self.vector_env.num_envs == self.num_envs
+        assert len(self.vector_env.get_unwrapped()) == self.num_envs
+        assert all(isinstance(env, Environment) for env in self.vector_env.get_unwrapped())
+        assert self.vector_env.resources.shape == (self.num_envs, MAX_RESOURCES, NUM_RESOURCE_FEATURES)
+
+    def test_vector_reset(self):
+        observations = self.vector_env.vector_reset()
+        assert len(observations) == self.num_envs
+        assert all(self.vector_env.observation_space.contains(obs) for obs in observations)
+
+    @mock.patch("blaze.evaluator.Analyzer.get_reward")
+    def test_vector_step(self, mock_get_reward):
+        mock_get_reward.return_value = 1000
+        envs = self.vector_env.get_unwrapped()
+        actions = [get_push_action(envs[0].action_space), NOOP_ACTION_ID, get_push_action(envs[2].action_space)]
+
+        observations, rewards, dones, infos = self.vector_env.vector_step(actions)
+        assert rewards == [1000, NOOP_ACTION_REWARD, 1000]
+        assert dones == [False, True, False]
+        assert mock_get_reward.call_count == 2
+        assert infos[1]["action"].is_noop
+        for (env, obs, info) in zip(envs, observations, infos):
+            assert self.vector_env.observation_space.contains(obs)
+            expected = env.observation_encoder.observation
+            assert all(np.array_equal(obs["resources"][i], expected["resources"][i]) for i in expected["resources"])
+            if info["action"].is_push:
+                action = info["action"]
+                assert obs["resources"][str(action.push.order)][-2] == action.source.source_id + 1
+
+    @mock.patch("blaze.evaluator.Analyzer.get_reward")
+    def test_reset_at(self, mock_get_reward):
+        mock_get_reward.return_value = 1000
+        envs = self.vector_env.get_unwrapped()
+        actions = [get_push_action(env.action_space) for env in envs]
+        self.vector_env.vector_step(actions)
+        assert all(env.policy.steps_taken == 1 for env in envs)
+
+        obs = self.vector_env.reset_at(1)
+        assert envs[1].policy.steps_taken == 0
+        assert envs[0].policy.steps_taken == 1
+        assert all(res[-2] == 0 for res in obs["resources"].values())
+        assert self.vector_env.resources[1, :, -2].sum() == 0
+        assert self.vector_env.resources[0, :, -2].sum() > 0
+
+    def test_flat_observations(self):
+        vector_env = VectorEnvironment(get_config(flat_observation=True), 2)
+        observations = vector_env.vector_reset()
+        assert all(obs["resources"].shape == (MAX_RESOURCES, NUM_RESOURCE_FEATURES) for obs in observations)
+        assert all(vector_env.observation_space.contains(obs) for obs in observations)
+
+    def test_action_mask_observations(self):
+        vector_env = VectorEnvironment(get_config(action_mask=True), 2)
+        observations = vector_env.vector_reset()
+        assert all(vector_env.observation_space.contains(obs) for obs in observations)
+        for (obs, env) in zip(observations, vector_env.get_unwrapped()):
+            assert (obs["action_mask"] == env.action_space.action_mask).all()
@@ -0,0 +1,82 @@
+import numpy as np
+
+from blaze.action import ActionSpace, Policy
+from blaze.config.client import get_fast_mobile_client_environment
+from blaze.evaluator.simulator import Simulator
+from blaze.evaluator.simulator.baseline import BaselineCache, baseline_cache
+from blaze.evaluator.simulator.execution_graph import MAX_CACHED_GRAPHS, get_execution_graph
+
+from tests.mocks.config import get_env_config
+
+
+class TestSimulateBaseline:
+    def setup(self):
+        self.env_config = get_env_config()
+        self.client_env = get_fast_mobile_client_environment()
+        self.simulator = Simulator(self.env_config)
+        baseline_cache.clear()
+
+    def test_matches_simulation_without_policy(self):
+        result = self.simulator.simulate_baseline(self.client_env)
+        plt = self.simulator.simulate_load_time(self.client_env)
+        assert result.plt_ms == plt
+        for node in self.simulator.graph.nodes:
+            assert result.completion_ms[node.index] == self.simulator.completed_nodes[node]
+            assert result.download_ms[node.index] == self.simulator.request_queue.time_spent_downloading(node)
+
+    def test_cached_per_client_environment_and_cached_urls(self):
+        result = self.simulator.simulate_baseline(self.client_env)
+        assert self.simulator.simulate_baseline(self.client_env) is result
+        assert Simulator(self.env_config).simulate_baseline(self.client_env) is result
+        assert self.simulator.simulate_baseline(self.client_env._replace(latency=500)) is not result
+
+        cached_url = self.env_config.har_resources[1].url
+        cached_result = self.simulator.simulate_baseline(self.client_env, cached_urls={cached_url})
+        assert cached_result is not result
+        assert self.simulator.simulate_baseline(self.client_env, cached_urls={cached_url}) is cached_result
+        assert len(baseline_cache) == 3
+
+    def test_simulates_on_evicted_graph(self):
+        expected = Simulator(get_env_config()).simulate_baseline(self.client_env)
+        for _ in range(MAX_CACHED_GRAPHS):
+            Simulator(get_env_config())
+        assert get_execution_graph(self.env_config) is not self.simulator.graph
+
+        result = self.simulator.simulate_baseline(self.client_env)
+        assert not np.isnan(result.completion_ms).any()
+        assert np.array_equal(result.completion_ms, expected.completion_ms)
+        assert np.array_equal(result.download_ms, expected.download_ms)
+        assert result.plt_ms == expected.plt_ms
+
+    def test_simulate_with_policy_uses_baseline(self):
+        action_space = ActionSpace(self.env_config.push_groups)
+        policy = Policy(action_space)
+        while not policy:
+            policy.apply_action(action_space.sample())
+        plt = self.simulator.simulate_load_time(self.client_env, policy=policy)
+        assert plt > 0
+        assert self.simulator.no_push is self.simulator.simulate_baseline(self.client_env)
+
+
+class TestBaselineCache:
+    def setup(self):
+        self.env_config = get_env_config()
+        self.client_env = get_fast_mobile_client_environment()
+        self.simulator = Simulator(self.env_config)
+        self.result = self.simulator.simulate_baseline(self.client_env)
+
+    def test_evicts_least_recently_used(self):
+        cache = BaselineCache(max_size=2)
+        graph = self.simulator.graph
+        cache.put(graph, self.client_env, frozenset(), self.result)
+        cache.put(graph, self.client_env, frozenset({"a"}), self.result)
+        assert cache.get(graph, self.client_env, frozenset()) is self.result
+        cache.put(graph, self.client_env, frozenset({"b"}), self.result)
+        assert len(cache) == 2
+        assert cache.get(graph, self.client_env, frozenset()) is self.result
+        assert cache.get(graph, self.client_env, frozenset({"a"})) is None
+
+    def test_results_are_read_only(self):
+        assert not self.result.completion_ms.flags.writeable
+        assert not self.result.download_ms.flags.writeable
+        assert not np.isnan(self.result.completion_ms).any()
@@ -0,0 +1,70 @@
+from blaze.chrome.har import har_from_json
+from blaze.config.environment import EnvironmentConfig
+from blaze.evaluator.simulator import Simulator
+from blaze.evaluator.simulator import execution_graph
+from blaze.evaluator.simulator.execution_graph import ExecutionGraph, cache_execution_graph, get_execution_graph
+from blaze.preprocess.har import har_entries_to_resources
+from blaze.preprocess.resource import resource_list_to_push_groups
+
+from tests.mocks.har import get_har_json
+
+
+def get_env_config() -> EnvironmentConfig:
+    har = har_from_json(get_har_json())
+    res_list = har_entries_to_resources(har)
+    push_groups = resource_list_to_push_groups(res_list)
+    return EnvironmentConfig(
+        replay_dir="", request_url="https://www.reddit.com/", push_groups=push_groups, har_resources=res_list
+    )
+
+
+class TestExecutionGraph:
+    def setup(self):
+        self.env_config = get_env_config()
+        self.graph = ExecutionGraph(self.env_config)
+
+    def test_nodes_are_indexed_by_order(self):
+        assert len(self.graph) == len(self.env_config.har_resources)
+        assert self.graph.root.resource.order == 0
+        for (i, node) in enumerate(self.graph.nodes):
+            assert node.index == i
+            assert self.graph.orders[i] == node.resource.order
+            if i > 0:
+                assert self.graph.orders[i - 1] < self.graph.orders[i]
+
+    def test_arrays_match_resources(self):
+        for (i, node) in enumerate(self.graph.nodes):
+            res = node.resource
+            assert self.graph.sizes[i] == res.size
+            assert self.graph.types[i] == res.type
+            assert self.graph.ttfb_ms[i] == res.time_to_first_byte_ms
+            assert self.graph.fetch_delay_ms[i] == res.fetch_delay_ms
+            assert self.graph.execution_ms[i] == res.execution_ms
+            assert self.graph.domains[self.graph.domain_ids[i]] == node.domain
+
+    def test_children_are_stored_in_csr_form(self):
+        assert self.graph.parents[0] == -1
+        assert len(self.graph.children) == len(self.graph) - 1
+        for (i, node) in enumerate(self.graph.nodes):
+            assert list(self.graph.children_of(i)) == [child.index for child in node.children]
+            for child in node.children:
+                assert self.graph.parents[child.index] == i
+                assert child.parent is node
+
+    def test_arrays_are_read_only(self):
+        for array in self.graph.arrays.values():
+            assert not array.flags.writeable
+
+    def test_graph_is_shared_between_simulators(self):
+        assert get_execution_graph(self.env_config) is get_execution_graph(self.env_config)
+        sim_a = Simulator(self.env_config)
+        sim_b = Simulator(self.env_config)
+        assert sim_a.graph is sim_b.graph
+        assert sim_a.root is sim_b.root
+
+    def test_cache_execution_graph_restores_evicted_graph(self):
+        graph = get_execution_graph(self.env_config)
+        execution_graph._graph_cache.pop(id(self.env_config))
+        assert get_execution_graph(self.env_config) is not graph
+        cache_execution_graph(graph)
+        assert get_execution_graph(self.env_config) is graph
@@ -0,0 +1,240 @@
+from blaze.config.environment import Resource, ResourceType
+from blaze.evaluator.simulator.request_queue import Node, QueueItemState, RequestQueue
+from blaze.evaluator.simulator.tcp_state import INITIAL_WINDOW_SIZE, MTU_BYTES
+
+
+def get_node(url: str, size: int, order: int = 0) -> Node:
+    return Node(resource=Resource(url=url, size=size, type=ResourceType.IMAGE, order=order), priority=order)
+
+
+def get_request_queue(bandwidth_kbps: int = 8000, rtt_latency_ms: int = 0) -> RequestQueue:
+    # 8000 kbps is 1000 bytes per millisecond
+    return RequestQueue(bandwidth_kbps, rtt_latency_ms, 0)
+
+
+class TestRequestQueue:
+    def test_empty(self):
+        rq = get_request_queue()
+        assert len(rq) == 0
+        assert rq.step() == ([], 0.0)
+
+    def test_add(self):
+        rq = get_request_queue()
+        node = get_node("http://example.com/a", 1000)
+        rq.add(node)
+        assert len(rq) == 1
+        assert node in rq
+        assert rq.remaining_delay(node) == 0
+
+    def test_step_single_item(self):
+        rq = get_request_queue()
+        node = get_node("http://example.com/a", 1000)
+        rq.add(node)
+        assert rq.step() == ([node], 1)
+        assert len(rq) == 0
+        assert node not in rq
+        assert rq.time_spent_downloading(node) == 1
+
+    def test_step_shares_bandwidth(self):
+        rq = get_request_queue()
+        a = get_node("http://example.com/a", 1000)
+        b = get_node("http://example.com/b", 3000)
+        rq.add(a)
+        rq.add(b)
+        # both items download at half of the link bandwidth until a finishes
+        assert rq.step() == ([a], 2)
+        assert rq.time_spent_downloading(b) == 2
+        # then b gets the entire link for its last 2000 bytes
+        assert rq.step() == ([b], 2)
+        assert rq.time_spent_downloading(b) == 4
+
+    def test_step_items_finishing_together(self):
+        rq = get_request_queue()
+        a = get_node("http://example.com/a", 1000)
+        b = get_node("http://example.com/b", 1000)
+        rq.add(a)
+        rq.add(b)
+        completed, time_ms = rq.step()
+        assert set(completed) == {a, b}
+        assert time_ms == 2
+
+    def test_step_delayed_item(self):
+        rq = get_request_queue()
+        node = get_node("http://example.com/a", 1000)
+        rq.add_with_delay(node, 10)
+        assert node in rq
+        assert rq.remaining_delay(node) == 10
+        assert rq.time_spent_downloading(node) == 0
+        # the first step only waits for the delay to expire
+        assert rq.step() == ([], 10)
+        assert rq.time_spent_downloading(node) == 0
+        assert rq.step() == ([node], 1)
+
+    def test_step_delayed_item_expires_during_download(self):
+        rq = get_request_queue()
+        a = get_node("http://example.com/a", 5000)
+        b = get_node("http://example.com/b", 1000)
+        rq.add(a)
+        rq.add_with_delay(b, 2)
+        assert rq.step() == ([a], 5)
+        assert rq.remaining_delay(b) == -3
+        assert rq.step() == ([b], 1)
+
+    def test_add_cached_item(self):
+        rq = get_request_queue()
+        node = get_node("http://example.com/a", 1000)
+        rq.add_with_delay(node, 0, cached=True)
+        assert rq.step() == ([node], 0)
+
+    def test_add_with_delay_adds_round_trips(self):
+        rq = get_request_queue(rtt_latency_ms=10)
+        a = get_node("http://example.com/a", 1000)
+        b = get_node("http://example.com/b", 2 * MTU_BYTES * INITIAL_WINDOW_SIZE)
+        # one round trip to download and one round trip to connect
+        rq.add_with_delay(a, 5)
+        assert rq.remaining_delay(a) == 25
+        rq.step()
+        # now that the origin is connected, it only takes the round trips to download
+        rq.add_with_delay(b, 5)
+        assert rq.remaining_delay(b) == 25
+
+    def test_remove(self):
+        rq = get_request_queue()
+        a = get_node("http://example.com/a", 1000)
+        b = get_node("http://example.com/b", 1000)
+        c = get_node("http://example.com/c", 1000)
+        rq.add(a)
+        rq.add(b)
+        rq.add_with_delay(c, 10)
+        rq.remove(b)
+        rq.remove(c)
+        assert len(rq) == 1
+        assert b not in rq
+        assert c not in rq
+        assert rq.step() == ([a], 1)
+        assert rq.step() == ([], 0.0)
+
+    def test_remove_completed_node(self):
+        rq = get_request_queue()
+        a = get_node("http://example.com/a", 1000)
+        rq.add(a)
+        rq.step()
+        rq.remove(a)
+        assert rq.state(a) is None
+        assert len(rq) == 0
+
+    def test_state(self):
+        rq = get_request_queue()
+        a = get_node("http://example.com/a", 1000)
+        b = get_node("http://example.com/b", 1000)
+        assert rq.state(a) is None
+        rq.add(a)
+        rq.add_with_delay(b, 1)
+        assert rq.state(a) == QueueItemState.QUEUED
+        assert rq.state(b) == QueueItemState.DELAYED
+        rq.step()
+        assert rq.state(a) == QueueItemState.DONE
+        assert rq.state(b) == QueueItemState.QUEUED
+        assert a not in rq
+        assert b in rq
+        # the time spent downloading is still available once the node is done
+        assert rq.time_spent_downloading(a) == 1
+
+    def test_add_replaces_scheduled_node(self):
+        rq = get_request_queue()
+        a = get_node("http://example.com/a", 1000)
+        rq.add_with_delay(a, 10)
+        rq.add(a)
+        assert len(rq) == 1
+        assert rq.state(a) == QueueItemState.QUEUED
+        assert rq.step() == ([a], 1)
+        assert rq.step() == ([], 0.0)
+
+    def test_copy_is_independent(self):
+        rq = get_request_queue()
+        a = get_node("http://example.com/a", 1000)
+        b = get_node("http://example.com/b", 3000)
+        rq.add(a)
+        rq.add(b)
+        rq_copy = rq.copy()
+        assert rq_copy.step() == ([a], 2)
+        assert len(rq) == 2
+        assert rq.time_spent_downloading(b) == 0
+        assert rq.step() == ([a], 2)
+
+    def test_fork_shares_items_until_modified(self):
+        rq = get_request_queue()
+        a = get_node("http://example.com/a", 1000)
+        b = get_node("http://example.com/b", 3000)
+        rq.add(a)
+        rq.add(b)
+        fork = rq.fork()
+        assert fork.node_to_queue_item_map[a] is rq.node_to_queue_item_map[a]
+        assert fork.tcp_state["example.com"] is rq.tcp_state["example.com"]
+
+        assert fork.step() == ([a], 2)
+        assert fork.node_to_queue_item_map[a] is not rq.node_to_queue_item_map[a]
+        assert fork.tcp_state["example.com"] is not rq.tcp_state["example.com"]
+        assert fork.state(a) == QueueItemState.DONE
+        assert rq.state(a) == QueueItemState.QUEUED
+        assert rq.get_tcp_state("example.com").window_size == INITIAL_WINDOW_SIZE
+
+    def test_fork_does_not_modify_parent(self):
+        rq = get_request_queue()
+        a = get_node("http://example.com/a", 1000)
+        b = get_node("http://example.com/b", 1000)
+        c = get_node("http://example.com/c", 1000)
+        rq.add(a)
+        rq.add_with_delay(b, 1)
+        fork = rq.fork()
+        fork.add(c)
+        fork.remove(a)
+        assert c not in rq
+        assert a in rq
+        # the parent can still be stepped after forking without affecting the fork
+        assert rq.step() == ([a], 1)
+        assert fork.state(b) == QueueItemState.DELAYED
+        assert fork.step() == ([c], 1)
+        assert fork.step() == ([b], 1)
+        assert rq.step() == ([b], 1)
+
+    def test_estimated_completion_time(self):
+        rq = get_request_queue()
+        a = get_node("http://example.com/a", 1000)
+        b = get_node("http://example.com/b", 3000)
+        rq.add(a)
+        rq.add(b)
+        assert rq.estimated_completion_time(b) == (4, 4)
+        assert rq.estimated_completion_time(get_node("http://example.com/c", 1000)) == (0, 0)
+        # the original queue is not modified
+        assert len(rq) == 2
+        assert rq.time_spent_downloading(b) == 0
+
+    def test_estimated_completion_time_with_delayed_items(self):
+        rq = get_request_queue()
+        a = get_node("http://example.com/a", 4000)
+        b = get_node("http://example.com/b", 1000)
+        c = get_node("http://example.com/c", 1000)
+        rq.add(a)
+        rq.add_with_delay(b, 1)
+        rq.add_with_delay(c, 10)
+        expected = rq.estimated_completion_time(c)
+        assert expected == rq.fork().estimated_completion_time(c)
+
+        total_time = 0
+        while c in rq:
+            _, time_ms = rq.step()
+            total_time += time_ms
+        assert expected == (total_time, rq.time_spent_downloading(c))
+
+    def test_idle_time_shrinks_window(self):
+        rq = get_request_queue()
+        a = get_node("http://example.com/a", 1000)
+        b = get_node("http://other.com/b", 1000000)
+        rq.add(a)
+        rq.step()
+        assert rq.get_tcp_state("example.com").window_size == INITIAL_WINDOW_SIZE + 1
+        rq.add(b)
+        rq.step()
+        # the example.com connection was idle for the entire download of b
+        assert rq.get_tcp_state("example.com").window_size == INITIAL_WINDOW_SIZE
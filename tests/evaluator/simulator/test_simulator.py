@@ -1,12 +1,18 @@
+import copy
 import json
 
+import numpy as np
+
+from blaze.action import ActionSpace, Policy
 from blaze.chrome.har import har_from_json
 from blaze.config.client import get_fast_mobile_client_environment
 from blaze.config.environment import EnvironmentConfig
-from blaze.evaluator.simulator.simulator import Simulator
+from blaze.evaluator.simulator.simulator import Simulator, get_policy_signature
+from blaze.evaluator.simulator.tcp_state import BBRTCPState, CongestionModel
 from blaze.preprocess.har import har_entries_to_resources
 from blaze.preprocess.resource import resource_list_to_push_groups
 
+from tests.mocks.config import get_env_config
 from tests.mocks.har import get_har_json
 
 
@@ -25,3 +31,102 @@ class TestSimulator:
         simulator = Simulator(env_config)
         time_ms = simulator.simulate_load_time(client_env)
         assert time_ms > 0
+
+    def test_congestion_model(self):
+        env_config = get_env_config()
+        client_env = get_fast_mobile_client_environment()
+        reno = Simulator(env_config)
+        bbr = Simulator(env_config, congestion_model=CongestionModel.BBR)
+        assert bbr.simulate_load_time(client_env) > 0
+        assert all(isinstance(state, BBRTCPState) for state in bbr.request_queue.tcp_state.values())
+        assert bbr.simulate_baseline(client_env) is not reno.simulate_baseline(client_env)
+
+
+class TestIncrementalSimulator:
+    def setup(self):
+        self.env_config = get_env_config()
+        self.client_env = get_fast_mobile_client_environment()
+        self.action_space = ActionSpace(self.env_config.push_groups)
+        self.action_space.seed(1)
+
+    def test_matches_full_simulation(self):
+        policy = Policy(self.action_space)
+        simulator = Simulator(self.env_config)
+        incremental_simulator = Simulator(self.env_config, incremental=True)
+        for _ in range(10):
+            policy.apply_action(self.action_space.sample())
+            time_ms = simulator.simulate_load_time(self.client_env, policy=policy)
+            assert incremental_simulator.simulate_load_time(self.client_env, policy=policy) == time_ms
+            assert incremental_simulator.completed_nodes == simulator.completed_nodes
+
+    def test_resumes_from_parent_of_changed_source(self):
+        simulator = Simulator(self.env_config, incremental=True)
+        simulator.simulate_load_time(self.client_env)
+        assert simulator.checkpoints
+
+        nodes = [node for node in simulator.graph.nodes if node.parent and node.parent.parent]
+        source, push = nodes[0], nodes[-1]
+        signature = {source.resource.url: (frozenset([push.resource.url]), frozenset())}
+        assert simulator.find_checkpoint(self.client_env, signature, None) == simulator.dispatched[source.parent]
+        assert simulator.find_checkpoint(self.client_env, {}, None) == len(simulator.checkpoints) - 1
+
+    def test_starts_over_in_new_client_environment(self):
+        simulator = Simulator(self.env_config, incremental=True)
+        simulator.simulate_load_time(self.client_env)
+        assert simulator.find_checkpoint(self.client_env._replace(latency=100), {}, None) is None
+        assert simulator.find_checkpoint(self.client_env, {}, {self.env_config.har_resources[1].url}) is None
+
+    def test_starts_over_when_root_policy_changes(self):
+        simulator = Simulator(self.env_config, incremental=True)
+        simulator.simulate_load_time(self.client_env)
+        signature = {simulator.root.resource.url: (frozenset([simulator.graph.nodes[-1].resource.url]), frozenset())}
+        assert simulator.find_checkpoint(self.client_env, signature, None) is None
+
+    def test_policy_signature(self):
+        policy = Policy(self.action_space)
+        assert get_policy_signature(policy) == {}
+        while not policy:
+            policy.apply_action(self.action_space.sample())
+        (source, push), *_ = list(policy.push) or list(policy.preload)
+        (push_urls, preload_urls) = get_policy_signature(policy)[source.url]
+        assert set(res.url for res in push) == (push_urls or preload_urls)
+
+
+class TestSimulateBatch:
+    def setup(self):
+        self.env_config = get_env_config()
+        self.client_envs = [
+            get_fast_mobile_client_environment(),
+            get_fast_mobile_client_environment()._replace(latency=80),
+        ]
+        self.cached_sets = [None, {self.env_config.har_resources[2].url}]
+        action_space = ActionSpace(self.env_config.push_groups)
+        action_space.seed(2)
+        self.policies = [None]
+        for _ in range(3):
+            policy = copy.deepcopy(self.policies[-1]) if self.policies[-1] else Policy(action_space)
+            while not policy.apply_action(action_space.sample()):
+                pass
+            self.policies.append(policy)
+
+    def test_matches_individual_simulations(self):
+        simulator = Simulator(self.env_config)
+        result = simulator.simulate_batch(self.policies, self.client_envs, self.cached_sets)
+        assert result.plt_ms.shape == (4, 2, 2)
+        assert result.completion_ms.shape == (4, 2, 2, len(simulator.graph))
+        assert result.urls == [node.resource.url for node in simulator.graph.nodes]
+        for (i, policy) in enumerate(self.policies):
+            for (j, client_env) in enumerate(self.client_envs):
+                for (k, cached_urls) in enumerate(self.cached_sets):
+                    plt = simulator.simulate_load_time(client_env, policy, cached_urls=cached_urls)
+                    assert result.plt_ms[i, j, k] == plt
+                    for node in simulator.graph.nodes:
+                        assert result.completion_ms[i, j, k, node.index] == simulator.completed_nodes[node]
+
+    def test_process_pool(self):
+        simulator = Simulator(self.env_config)
+        result = simulator.simulate_batch(self.policies, self.client_envs, self.cached_sets)
+        pool_result = simulator.simulate_batch(self.policies, self.client_envs, self.cached_sets, max_workers=2)
+        assert (pool_result.plt_ms == result.plt_ms).all()
+        assert (pool_result.completion_ms == result.completion_ms).all()
+        assert np.isnan(pool_result.aft_ms).all()
@@ -0,0 +1,57 @@
+from blaze.action import ActionSpace, Policy
+from blaze.config.client import get_fast_mobile_client_environment
+from blaze.evaluator.simulator import Simulator
+from blaze.evaluator.simulator.stats import PHASES, SimulationStats
+
+from tests.mocks.config import get_env_config
+
+
+class TestSimulationStats:
+    def setup(self):
+        self.env_config = get_env_config()
+        self.client_env = get_fast_mobile_client_environment()
+
+    def test_collected_after_simulation(self):
+        simulator = Simulator(self.env_config)
+        simulator.simulate_load_time(self.client_env)
+        stats = simulator.stats
+        assert stats.steps > 0
+        assert stats.nodes_scheduled == len(simulator.graph) - 1
+        assert stats.nodes_pushed == stats.nodes_preloaded == 0
+        assert stats.checkpoints_saved == stats.checkpoints_restored == 0
+        assert set(stats.phase_ms) == set(PHASES)
+        assert stats.phase_ms["baseline"] == 0
+        assert stats.total_ms > 0
+
+    def test_counts_what_if_estimates(self):
+        action_space = ActionSpace(self.env_config.push_groups)
+        action_space.seed(0)
+        policy = Policy(action_space)
+        while not policy:
+            policy.apply_action(action_space.sample())
+        simulator = Simulator(self.env_config)
+        simulator.simulate_load_time(self.client_env, policy)
+        stats = simulator.stats
+        assert stats.nodes_pushed > 0 or stats.nodes_preloaded > 0
+        assert stats.phase_ms["baseline"] > 0
+
+    def test_reset_for_each_simulation(self):
+        simulator = Simulator(self.env_config, incremental=True)
+        simulator.simulate_load_time(self.client_env)
+        first = simulator.stats
+        assert first.checkpoints_saved > 0
+        simulator.simulate_load_time(self.client_env)
+        assert simulator.stats is not first
+        assert simulator.stats.checkpoints_restored == 1
+        assert simulator.stats.steps < first.steps
+
+    def test_merge_and_as_dict(self):
+        stats = SimulationStats()
+        other = SimulationStats()
+        other.steps, other.forks = 3, 2
+        other.add_phase_time("step", 1.5)
+        stats.merge(other).merge(other)
+        assert stats.steps == 6
+        assert stats.forks == 4
+        assert stats.as_dict()["step_ms"] == 3.0
+        assert stats.as_dict()["total_ms"] == 3.0
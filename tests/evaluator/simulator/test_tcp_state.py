@@ -1,6 +1,14 @@
 import random
 
-from blaze.evaluator.simulator.tcp_state import INITIAL_WINDOW_SIZE, MTU_BYTES, RTO_MS, TCPState
+from blaze.evaluator.simulator.tcp_state import (
+    INITIAL_WINDOW_SIZE,
+    MTU_BYTES,
+    RTO_MS,
+    BBRTCPState,
+    CongestionModel,
+    TCPState,
+    get_tcp_state_class,
+)
 
 
 class TestTCPState:
@@ -87,6 +95,23 @@ class TestTCPState:
         bytes_to_send = 8 * MTU_BYTES * INITIAL_WINDOW_SIZE
         # First RTT sends INITIAL_WINDOW_SIZE packets, second sends 2, third sends 4, so we need 4 RTT
         assert tcp_state.round_trips_needed_for_bytes(bytes_to_send) == 4
+        # 4 RTTs send 15 initial windows
+        assert tcp_state.round_trips_needed_for_bytes(15 * MTU_BYTES * INITIAL_WINDOW_SIZE) == 4
+        assert tcp_state.round_trips_needed_for_bytes(15 * MTU_BYTES * INITIAL_WINDOW_SIZE + 1) == 5
+
+    def test_window_size_after_long_idle_period(self):
+        tcp_state = TCPState(cwnd=INITIAL_WINDOW_SIZE * 2 ** 20 + 7, time_since_last_byte=5 * RTO_MS + 3)
+        assert tcp_state.window_size == (INITIAL_WINDOW_SIZE * 2 ** 20 + 7) >> 5
+        assert tcp_state.time_since_last_byte == 3
+
+        tcp_state.add_time_since_last_byte(3600 * 1000)
+        assert tcp_state.window_size == INITIAL_WINDOW_SIZE
+        assert tcp_state.time_since_last_byte < RTO_MS
+
+    def test_uses_slots(self):
+        tcp_state = TCPState()
+        assert not hasattr(tcp_state, "__dict__")
+        assert not hasattr(BBRTCPState(), "__dict__")
 
     def test_add_time_since_last_byte(self):
         tcp_state = TCPState(cwnd=INITIAL_WINDOW_SIZE * 2, time_since_last_byte=12)
@@ -110,6 +135,20 @@ class TestTCPState:
         tcp_state.add_bytes_sent(MTU_BYTES * 3.5)
         assert tcp_state.window_size == INITIAL_WINDOW_SIZE + 4
 
+    def test_copy(self):
+        tcp_state = TCPState(loss_prop=0.01, cwnd=INITIAL_WINDOW_SIZE * 2, time_since_last_byte=100)
+        tcp_state.num_packets_to_drop(10)
+        tcp_state_copy = tcp_state.copy()
+        assert tcp_state_copy is not tcp_state
+        assert tcp_state_copy.loss_prop == tcp_state.loss_prop
+        assert tcp_state_copy.cwnd == tcp_state.cwnd
+        assert tcp_state_copy.time_since_last_byte == tcp_state.time_since_last_byte
+        assert tcp_state_copy.total_packets == tcp_state.total_packets
+
+        tcp_state_copy.add_bytes_sent(MTU_BYTES)
+        assert tcp_state.cwnd == INITIAL_WINDOW_SIZE * 2
+        assert tcp_state.time_since_last_byte == 100
+
     def test_packets_not_dropped_if_prop_is_zero(self):
         tcp_state = TCPState()
         assert tcp_state.num_packets_to_drop(10000) == 0
@@ -125,3 +164,30 @@ class TestTCPState:
         assert tcp_state.num_packets_to_drop(99) == 1
         assert tcp_state.num_packets_to_drop(91) == 1
         assert tcp_state.num_packets_to_drop(1000) == 10
+
+
+class TestBBRTCPState:
+    def test_window_does_not_shrink_when_idle(self):
+        tcp_state = BBRTCPState(cwnd=INITIAL_WINDOW_SIZE * 8, time_since_last_byte=10 * RTO_MS)
+        assert tcp_state.window_size == INITIAL_WINDOW_SIZE * 8
+
+    def test_round_trips_needed_for_bytes(self):
+        tcp_state = BBRTCPState()
+        assert tcp_state.round_trips_needed_for_bytes(0) == 0
+        assert tcp_state.round_trips_needed_for_bytes(1) == 1
+        assert tcp_state.round_trips_needed_for_bytes(MTU_BYTES * INITIAL_WINDOW_SIZE) == 1
+        assert tcp_state.round_trips_needed_for_bytes(MTU_BYTES * INITIAL_WINDOW_SIZE + 1) == 2
+        # grows faster than Reno slow start
+        bytes_to_send = 100 * MTU_BYTES * INITIAL_WINDOW_SIZE
+        assert tcp_state.round_trips_needed_for_bytes(bytes_to_send) < TCPState().round_trips_needed_for_bytes(
+            bytes_to_send
+        )
+
+    def test_copy(self):
+        tcp_state = BBRTCPState(cwnd=INITIAL_WINDOW_SIZE * 2)
+        assert isinstance(tcp_state.copy(), BBRTCPState)
+        assert tcp_state.copy().cwnd == INITIAL_WINDOW_SIZE * 2
+
+    def test_get_tcp_state_class(self):
+        assert get_tcp_state_class(CongestionModel.RENO) is TCPState
+        assert get_tcp_state_class(CongestionModel.BBR) is BBRTCPState
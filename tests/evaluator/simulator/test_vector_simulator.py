@@ -0,0 +1,66 @@
+import random
+
+import numpy as np
+
+from blaze.action import ActionSpace, Policy
+from blaze.config.client import get_client_environment_from_parameters, get_fast_mobile_client_environment
+from blaze.evaluator.simulator import Simulator
+from blaze.evaluator.simulator.vector_simulator import VectorSimulator
+
+from tests.mocks.config import get_env_config
+
+
+def get_client_envs():
+    client_env = get_fast_mobile_client_environment()
+    return [
+        client_env,
+        client_env._replace(bandwidth=1000, latency=200),
+        client_env._replace(bandwidth=24000, latency=20, cpu_slowdown=4),
+        client_env._replace(bandwidth=5000, latency=80, cpu_slowdown=2),
+    ]
+
+
+class TestVectorSimulator:
+    def setup(self):
+        self.env_config = get_env_config()
+        self.client_envs = get_client_envs()
+        self.simulator = Simulator(self.env_config)
+        self.vector_simulator = VectorSimulator(self.env_config)
+
+    def get_policy(self):
+        random.seed(1)
+        action_space = ActionSpace(self.env_config.push_groups)
+        policy = Policy(action_space)
+        while len(policy) < 4:
+            policy.apply_action(action_space.sample())
+        return policy
+
+    def test_matches_simulator_without_policy(self):
+        plts = self.vector_simulator.simulate_load_time(self.client_envs)
+        assert plts.shape == (len(self.client_envs),)
+        for (client_env, plt) in zip(self.client_envs, plts):
+            assert plt == self.simulator.simulate_load_time(client_env)
+        # every node is done in every environment once the page has loaded
+        assert not self.vector_simulator.request_queue.pending.any()
+        assert np.all(self.vector_simulator.request_queue.num_done == len(self.client_envs))
+
+    def test_matches_simulator_with_policy(self):
+        policy = self.get_policy()
+        plts = self.vector_simulator.simulate_load_time(self.client_envs, policy)
+        for (client_env, plt) in zip(self.client_envs, plts):
+            assert plt == self.simulator.simulate_load_time(client_env, policy)
+
+    def test_matches_simulator_with_cached_urls(self):
+        policy = self.get_policy()
+        cached_urls = {res.url for res in self.env_config.har_resources[1:4]}
+        plts = self.vector_simulator.simulate_load_time(self.client_envs, policy, cached_urls)
+        for (client_env, plt) in zip(self.client_envs, plts):
+            assert plt == self.simulator.simulate_load_time(client_env, policy, cached_urls)
+
+    def test_simulate_grid(self):
+        bandwidths, latencies, cpu_slowdowns = [1000, 12000], [20, 100, 200], [1, 2]
+        grid = self.vector_simulator.simulate_grid(bandwidths, latencies, cpu_slowdowns)
+        assert grid.shape == (2, 3, 2)
+        assert np.all(grid > 0)
+        client_env = get_client_environment_from_parameters(bandwidths[1], latencies[2], cpu_slowdowns[0])
+        assert grid[1, 2, 0] == self.simulator.simulate_load_time(client_env)
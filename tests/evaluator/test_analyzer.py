@@ -1,8 +1,12 @@
 import pytest
+from unittest import mock
 
 from blaze.action import ActionSpace, Policy
 from blaze.config.client import get_random_client_environment
 from blaze.evaluator import Analyzer
+from blaze.evaluator.analyzer import PLTCache, get_policy_key, plt_cache
+from blaze.evaluator.plt_store import LocalPLTStore, SharedPLTStore
+from blaze.evaluator.simulator import Simulator
 
 from tests.mocks.config import get_config
 
@@ -34,6 +38,16 @@ class TestAnalyzer:
         with pytest.raises(IndexError):
             self.get_analyzer(4)
 
+    def test_get_reward_uses_shared_cache(self):
+        plt_cache.clear()
+        a1 = Analyzer(self.config, 1, client_environment=self.client_environment)
+        a2 = Analyzer(self.config, 2, client_environment=self.client_environment)
+        r1 = a1.get_reward(self.policy)
+        r2 = a2.get_reward(self.policy)
+        assert r1 == pytest.approx(-1000000.0 / r2)
+        assert a1.cache_stats["hits"] == 1
+        assert a1.cache_stats["misses"] == 1
+
     # TODO: REWRITE THESE TESTS
 
     # @mock.patch("blaze.evaluator.lighthouse.get_metrics")
@@ -97,3 +111,123 @@ class TestAnalyzer:
     #     assert reward == BEST_REWARD_COEFF / speed_indexes[3]
     #     assert analyzer.min_speed_index == speed_indexes[3]
     #     assert analyzer.last_speed_index == speed_indexes[3]
+
+
+def get_policies(action_space: ActionSpace):
+    """ Returns two policies with the same actions applied in opposite orders """
+    actions = []
+    while len(actions) < 3:
+        action = action_space.decode_action(action_space.sample())
+        if not action.is_noop and action.push not in [a.push for a in actions]:
+            actions.append(action)
+    policy, reverse_policy = Policy(action_space), Policy(action_space)
+    for action in actions:
+        policy.apply_action(action)
+    for action in reversed(actions):
+        reverse_policy.apply_action(action)
+    return policy, reverse_policy
+
+
+class TestGetPolicyKey:
+    def setup(self):
+        self.config = get_config()
+        self.action_space = ActionSpace(self.config.env_config.push_groups)
+        self.action_space.seed(1024)
+
+    def test_empty_policy(self):
+        assert get_policy_key(None) == ((), ())
+        assert get_policy_key(Policy(self.action_space)) == ((), ())
+
+    def test_independent_of_action_order(self):
+        policy, reverse_policy = get_policies(self.action_space)
+        key = get_policy_key(policy)
+        assert key == get_policy_key(reverse_policy)
+        assert hash(key) == hash(get_policy_key(reverse_policy))
+        assert len(key[0]) + len(key[1]) == 3
+        assert key != get_policy_key(Policy(self.action_space))
+
+
+class TestPLTCache:
+    def setup(self):
+        self.config = get_config()
+        self.simulator = Simulator(self.config.env_config)
+        self.client_environment = get_random_client_environment()
+        self.action_space = ActionSpace(self.config.env_config.push_groups)
+        self.action_space.seed(1024)
+        self.cache = PLTCache(max_size=2)
+
+    def test_caches_policies_with_the_same_actions(self):
+        policy, reverse_policy = get_policies(self.action_space)
+        plt = self.cache.simulate_load_time(self.simulator, self.client_environment, policy)
+        assert plt == self.simulator.simulate_load_time(self.client_environment, policy)
+        with mock.patch.object(self.simulator, "simulate_load_time") as mock_simulate:
+            assert self.cache.simulate_load_time(self.simulator, self.client_environment, reverse_policy) == plt
+            mock_simulate.assert_not_called()
+        assert self.cache.stats["hits"] == 1
+        assert self.cache.stats["misses"] == 1
+        assert self.cache.stats["hit_rate"] == 0.5
+        assert self.cache.stats["saved_ms"] > 0
+
+    def test_keyed_by_client_environment_cached_urls_and_aft(self):
+        policy, _ = get_policies(self.action_space)
+        cached_urls = {res.url for res in self.config.env_config.har_resources[1:3]}
+        self.cache.simulate_load_time(self.simulator, self.client_environment, policy)
+        self.cache.simulate_load_time(self.simulator, self.client_environment, policy, cached_urls)
+        self.cache.simulate_load_time(self.simulator, self.client_environment, policy, use_aft=True)
+        self.cache.simulate_load_time(
+            self.simulator, self.client_environment._replace(latency=self.client_environment.latency + 10), policy
+        )
+        assert self.cache.stats["hits"] == 0
+        assert self.cache.stats["misses"] == 4
+
+    def test_evicts_least_recently_used(self):
+        policy, _ = get_policies(self.action_space)
+        self.cache.simulate_load_time(self.simulator, self.client_environment, None)
+        self.cache.simulate_load_time(self.simulator, self.client_environment, policy)
+        self.cache.simulate_load_time(self.simulator, self.client_environment, None)
+        self.cache.simulate_load_time(self.simulator, self.client_environment, policy, use_aft=True)
+        assert len(self.cache) == 2
+        self.cache.simulate_load_time(self.simulator, self.client_environment, None)
+        assert self.cache.stats["hits"] == 2
+        self.cache.simulate_load_time(self.simulator, self.client_environment, policy)
+        assert self.cache.stats["misses"] == 4
+
+    def test_clear(self):
+        self.cache.simulate_load_time(self.simulator, self.client_environment, None)
+        self.cache.simulate_load_time(self.simulator, self.client_environment, None)
+        self.cache.clear()
+        assert len(self.cache) == 0
+        assert self.cache.stats == {
+            "size": 0,
+            "hits": 0,
+            "shared_hits": 0,
+            "misses": 0,
+            "hit_rate": 0.0,
+            "saved_ms": 0.0,
+        }
+
+    def test_shared_store(self):
+        policy, reverse_policy = get_policies(self.action_space)
+        store = LocalPLTStore()
+        self.cache.attach(store)
+        plt = self.cache.simulate_load_time(self.simulator, self.client_environment, policy)
+        assert len(store) == 1
+
+        # a cache in another process only shares the store, and a different simulator of the same page
+        other_cache = PLTCache()
+        other_cache.attach(store)
+        env_config = self.config.env_config
+        other_simulator = Simulator(env_config._replace(har_resources=list(env_config.har_resources)))
+        assert other_simulator.graph is not self.simulator.graph
+        with mock.patch.object(other_simulator, "simulate_load_time") as mock_simulate:
+            assert other_cache.simulate_load_time(other_simulator, self.client_environment, reverse_policy) == plt
+            mock_simulate.assert_not_called()
+        assert other_cache.stats["shared_hits"] == 1
+        assert other_cache.stats["misses"] == 0
+        assert other_cache.stats["hit_rate"] == 1.0
+
+    def test_analyzer_attaches_shared_store(self):
+        with SharedPLTStore.create(num_slots=64) as store:
+            Analyzer(self.config.with_mutations(plt_store=store.path), 1, client_environment=self.client_environment)
+            assert plt_cache.store.path == store.path
+            plt_cache.attach(None)
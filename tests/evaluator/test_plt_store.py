@@ -0,0 +1,84 @@
+import multiprocessing
+import os
+
+import pytest
+
+from blaze.evaluator.plt_store import LocalPLTStore, SharedPLTStore, get_store_key, MAX_PROBES
+
+
+def publish(path: str, keys):
+    store = SharedPLTStore(path)
+    for key in keys:
+        store.put(key, key * 1.5)
+    store.close()
+
+
+class TestGetStoreKey:
+    def test_stable_and_nonzero(self):
+        key = get_store_key("page", ("a", "b"), 1.5, True)
+        assert key == get_store_key("page", ("a", "b"), 1.5, True)
+        assert key != get_store_key("page", ("b", "a"), 1.5, True)
+        assert 0 < key < 2 ** 64
+
+
+class TestLocalPLTStore:
+    def test_get_and_put(self):
+        store = LocalPLTStore()
+        assert store.get(1) is None
+        store.put(1, 1234.5)
+        assert store.get(1) == 1234.5
+        assert len(store) == 1
+
+
+class TestSharedPLTStore:
+    def setup(self):
+        self.store = SharedPLTStore.create(num_slots=64)
+
+    def teardown(self):
+        self.store.close()
+
+    def test_create(self):
+        assert os.path.exists(self.store.path)
+        assert self.store.num_slots == 64
+        assert len(self.store) == 0
+
+    def test_get_and_put(self):
+        assert self.store.get(12345) is None
+        self.store.put(12345, 1234.5)
+        assert self.store.get(12345) == 1234.5
+        self.store.put(12345, 2345.5)
+        assert self.store.get(12345) == 2345.5
+        assert len(self.store) == 1
+
+    def test_probes_colliding_keys(self):
+        keys = [3 + 64 * i for i in range(MAX_PROBES)]
+        for key in keys:
+            self.store.put(key, float(key))
+        assert all(self.store.get(key) == float(key) for key in keys)
+
+        # when all probed slots are taken, the home slot is overwritten
+        evicting_key = 3 + 64 * MAX_PROBES
+        self.store.put(evicting_key, 1.0)
+        assert self.store.get(evicting_key) == 1.0
+        assert self.store.get(keys[0]) is None
+
+    def test_rejects_torn_slots(self):
+        self.store.put(12345, 1234.5)
+        self.store.table[12345 % 64, 1] += 1
+        assert self.store.get(12345) is None
+
+    def test_shared_between_processes(self):
+        keys = list(range(1, 20))
+        process = multiprocessing.Process(target=publish, args=(self.store.path, keys))
+        process.start()
+        process.join()
+        assert all(self.store.get(key) == key * 1.5 for key in keys)
+
+    def test_close_removes_owned_file(self):
+        attached = SharedPLTStore(self.store.path)
+        attached.close()
+        assert os.path.exists(self.store.path)
+        self.store.close()
+        assert not os.path.exists(self.store.path)
+        with pytest.raises(FileNotFoundError):
+            SharedPLTStore(self.store.path)
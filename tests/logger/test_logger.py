@@ -1,8 +1,11 @@
+import io
+import json
 import re
 import sys
+import tempfile
 from unittest import mock
 
-from blaze.logger import Level, Logger
+from blaze.logger import JsonLinesSink, Lazy, Level, Logger
 
 
 def strip_ansi(text):
@@ -125,3 +128,64 @@ class TestLogger:
         print_fn, log = create_logger(min_level=Level.DEBUG)
         log.critical("")
         assert print_fn.called_with.startswith("[{}]".format(str(Level.CRITICAL)))
+
+    def test_is_enabled_for(self):
+        _, log = create_logger(min_level=Level.INFO)
+        assert log.is_enabled_for(Level.INFO)
+        assert log.is_enabled_for(Level.ERROR)
+        assert not log.is_enabled_for(Level.DEBUG)
+        log.set_silence(True)
+        assert not log.is_enabled_for(Level.ERROR)
+
+    def test_lazy_values_are_not_computed_when_disabled(self):
+        print_fn, log = create_logger(min_level=Level.INFO)
+        compute = mock.Mock(return_value="value")
+        log.debug(Lazy(compute), key=Lazy(compute))
+        assert not print_fn.called
+        compute.assert_not_called()
+
+    def test_lazy_values_are_computed_when_enabled(self):
+        print_fn, log = create_logger(min_level=Level.INFO)
+        log.info(Lazy(lambda: "message"), key=Lazy(lambda: 123))
+        assert print_fn.called_with == "[{}] message key=123".format(str(Level.INFO))
+
+    def test_namespaced_loggers_are_cached(self):
+        print_fn, log = create_logger(min_level=Level.INFO)
+        namespaced = log.namespaced("test")
+        assert namespaced is log.namespaced("test")
+        assert namespaced is not log.namespaced("other")
+        assert namespaced.namespace == "test"
+        namespaced.info("message")
+        assert print_fn.called_with == "[{}] test: message".format(str(Level.INFO))
+
+    def test_sink_receives_records(self):
+        sink = mock.Mock()
+        _, log = create_logger(namespace="blaze", min_level=Level.INFO, sink=sink, context={"a": 1})
+        log.with_namespace("test").info("message", b=Lazy(lambda: 2))
+        log.debug("ignored")
+        assert sink.call_count == 1
+        record = sink.call_args[0][0]
+        assert record["level"] == "info"
+        assert record["namespace"] == "test"
+        assert record["message"] == "message"
+        assert record["context"] == {"a": 1, "b": 2}
+
+
+class TestJsonLinesSink:
+    def test_writes_json_lines(self):
+        output = io.StringIO()
+        log = Logger(namespace="blaze", print_fn=lambda _: None, sink=JsonLinesSink(output))
+        log.info("first", value=object())
+        log.warn("second")
+        lines = output.getvalue().splitlines()
+        assert len(lines) == 2
+        assert json.loads(lines[0])["message"] == "first"
+        assert json.loads(lines[0])["context"]["value"].startswith("<object")
+        assert json.loads(lines[1])["level"] == "warn"
+
+    def test_writes_to_file_path(self):
+        with tempfile.NamedTemporaryFile("r") as output_file:
+            sink = JsonLinesSink(output_file.name)
+            sink({"message": "test"})
+            sink.close()
+            assert json.loads(output_file.read()) == {"message": "test"}
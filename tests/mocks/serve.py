@@ -1,5 +1,6 @@
 import grpc
 
+from blaze.config import manifest
 from blaze.config.client import get_random_client_environment
 from blaze.proto import policy_service_pb2
 
@@ -12,7 +13,7 @@ def get_page(url: str, client_environment=get_random_client_environment()) -> po
         bandwidth_kbps=client_environment.bandwidth,
         latency_ms=client_environment.latency,
         cpu_slowdown=client_environment.cpu_slowdown,
-        manifest=get_env_config().serialize(),
+        manifest=manifest.dumps(get_env_config()),
     )
 
 
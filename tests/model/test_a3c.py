@@ -6,7 +6,7 @@ from ray.rllib.agents.a3c import A3CAgent
 from blaze.config.config import get_config
 from blaze.environment import Environment
 from blaze.model import a3c
-from blaze.model.model import SavedModel
+from blaze.model.model import SavedModel, VECTOR_ENVIRONMENT
 from tests.mocks.config import get_env_config, get_train_config
 
 
@@ -32,6 +32,9 @@ class TestA3C:
     def test_train_compiles(self, mock_run_experiments, _):
         a3c.train(get_train_config(), get_config(get_env_config()))
         mock_run_experiments.assert_called_once()
+        (experiments,) = mock_run_experiments.call_args[0]
+        (experiment,) = experiments.values()
+        assert experiment["env"] == VECTOR_ENVIRONMENT
 
     def test_get_model(self):
         location = "/tmp/model_location"
@@ -4,7 +4,7 @@ from unittest import mock
 from blaze.config.config import get_config
 from blaze.environment import Environment
 from blaze.model import apex
-from blaze.model.model import SavedModel
+from blaze.model.model import SavedModel, VECTOR_ENVIRONMENT
 from tests.mocks.config import get_env_config, get_train_config
 
 
@@ -14,6 +14,9 @@ class TestApex:
     def test_train_compiles(self, mock_run_experiments, _):
         apex.train(get_train_config(), get_config(get_env_config()))
         mock_run_experiments.assert_called_once()
+        (experiments,) = mock_run_experiments.call_args[0]
+        (experiment,) = experiments.values()
+        assert experiment["env"] == VECTOR_ENVIRONMENT
 
     def test_get_model(self):
         location = "/tmp/model_location"
@@ -1,9 +1,23 @@
+import threading
+from unittest import mock
+
+import pytest
+
 from blaze.action import ActionSpace
 from blaze.config.config import get_config
 from blaze.config.client import get_random_client_environment
 from blaze.environment.environment import Environment
+from blaze.environment.vector_environment import VectorEnvironment
 from blaze.environment.observation import get_observation_space
-from blaze.model.model import ModelInstance, SavedModel
+from blaze.model.action_mask import ACTION_MASK_MODEL
+from blaze.model.model import (
+    AgentPool,
+    ModelInstance,
+    SavedModel,
+    VECTOR_ENVIRONMENT,
+    get_agent_config,
+    register_vector_environment,
+)
 
 from tests.mocks.agent import MockAgent
 from tests.mocks.config import get_env_config
@@ -61,3 +75,128 @@ class TestSavedModel:
         assert model_instance.agent.kwargs["config"] == {"env_config": config}
         assert model_instance.agent.file_path == saved_model.location
         assert model_instance.config == config
+
+
+class TestAgentPool:
+    def setup(self):
+        self.config = get_config(get_env_config(), get_random_client_environment())
+        self.saved_model = SavedModel(MockAgent, Environment, "/tmp/model_location", {})
+
+    def test_instantiate_restores_agent_once(self):
+        pool = AgentPool(self.saved_model)
+        with pool.instantiate(self.config) as first_instance:
+            assert isinstance(first_instance, ModelInstance)
+            assert first_instance.agent.file_path == self.saved_model.location
+            assert first_instance.config == self.config
+        other_config = self.config.with_mutations(cached_urls={"http://example.com"})
+        with pool.instantiate(other_config) as second_instance:
+            assert second_instance.agent is first_instance.agent
+            assert second_instance.config == other_config
+        assert pool.num_agents == 1
+
+    def test_creates_agents_up_to_size(self):
+        pool = AgentPool(self.saved_model, size=2)
+        agents = [pool.acquire(self.config), pool.acquire(self.config)]
+        assert agents[0] is not agents[1]
+        assert pool.num_agents == 2
+        for agent in agents:
+            pool.release(agent)
+        assert pool.acquire(self.config) in agents
+        assert pool.num_agents == 2
+
+    def test_acquire_waits_for_release(self):
+        pool = AgentPool(self.saved_model)
+        agent = pool.acquire(self.config)
+        acquired = []
+        thread = threading.Thread(target=lambda: acquired.append(pool.acquire(self.config)))
+        thread.start()
+        thread.join(0.1)
+        assert not acquired
+        pool.release(agent)
+        thread.join()
+        assert acquired == [agent]
+        assert pool.num_agents == 1
+
+    def test_failed_agent_creation_frees_slot(self):
+        pool = AgentPool(SavedModel(None, Environment, "/tmp/model_location", {}))
+        with pytest.raises(TypeError):
+            pool.acquire(self.config)
+        assert pool.num_agents == 0
+
+    def test_failed_agent_creation_wakes_waiting_caller(self):
+        pool = AgentPool(self.saved_model)
+        (creating, fail) = (threading.Event(), threading.Event())
+        agent = object()
+
+        def create_agent(config):
+            if not creating.is_set():
+                creating.set()
+                fail.wait()
+                raise RuntimeError("failed to restore the checkpoint")
+            return agent
+
+        def acquire_failing():
+            with pytest.raises(RuntimeError):
+                pool.acquire(self.config)
+
+        acquired = []
+        with mock.patch.object(SavedModel, "create_agent", side_effect=create_agent):
+            first = threading.Thread(target=acquire_failing)
+            first.start()
+            creating.wait()
+            # the caller would wait forever if the failed creation did not wake it
+            second = threading.Thread(target=lambda: acquired.append(pool.acquire(self.config)), daemon=True)
+            second.start()
+            second.join(0.1)
+            assert not acquired
+            fail.set()
+            first.join()
+            second.join(5)
+        assert acquired == [agent]
+        assert pool.num_agents == 1
+
+    def test_fill(self):
+        pool = AgentPool(self.saved_model, size=3)
+        agent = pool.acquire(self.config)
+        pool.fill(self.config)
+        assert pool.num_agents == 3
+        assert len(pool.idle_agents) == 2
+        pool.release(agent)
+        agents = [pool.acquire(self.config) for _ in range(3)]
+        assert len(set(map(id, agents))) == 3
+        assert pool.num_agents == 3
+
+
+class TestGetAgentConfig:
+    def test_without_action_mask(self):
+        config = get_config(get_env_config())
+        agent_config = get_agent_config({"num_workers": 2, "model": {"use_lstm": True}}, config)
+        assert agent_config == {"num_workers": 2, "model": {"use_lstm": True}, "env_config": config}
+
+    def test_with_action_mask(self):
+        config = get_config(get_env_config(), action_mask=True)
+        agent_config = get_agent_config({"num_workers": 2, "model": {"use_lstm": True}}, config)
+        assert agent_config == {"num_workers": 2, "model": {"custom_model": ACTION_MASK_MODEL}, "env_config": config}
+
+    def test_with_action_mask_keeps_other_model_options(self):
+        config = get_config(get_env_config(), action_mask=True)
+        model = {"use_lstm": True, "lstm_use_prev_action_reward": True, "fcnet_hiddens": [64, 64]}
+        agent_config = get_agent_config({"model": model}, config)
+        assert agent_config["model"] == {"fcnet_hiddens": [64, 64], "custom_model": ACTION_MASK_MODEL}
+        assert model["use_lstm"]
+
+    def test_with_action_mask_without_model(self):
+        config = get_config(get_env_config(), action_mask=True)
+        agent_config = get_agent_config({"num_workers": 2}, config)
+        assert agent_config["model"] == {"custom_model": ACTION_MASK_MODEL}
+
+
+class TestRegisterVectorEnvironment:
+    @mock.patch("ray.tune.registry.register_env")
+    def test_registers_env_creator(self, mock_register_env):
+        assert register_vector_environment(3) == VECTOR_ENVIRONMENT
+        (name, env_creator) = mock_register_env.call_args[0]
+        assert name == VECTOR_ENVIRONMENT
+        vector_env = env_creator(get_config(get_env_config()))
+        assert isinstance(vector_env, VectorEnvironment)
+        assert vector_env.num_envs == 3
@@ -1,10 +1,13 @@
+import os
+
 from ray.rllib.agents.ppo import PPOAgent
 
 from unittest import mock
 from blaze.config.config import get_config
 from blaze.environment import Environment
 from blaze.model import ppo
-from blaze.model.model import SavedModel
+from blaze.model.action_mask import ACTION_MASK_MODEL
+from blaze.model.model import SavedModel, VECTOR_ENVIRONMENT
 from tests.mocks.config import get_env_config, get_train_config
 
 
@@ -14,6 +17,19 @@ class TestPPO:
     def test_train_compiles(self, mock_run_experiments, _):
         ppo.train(get_train_config(), get_config(get_env_config()))
         mock_run_experiments.assert_called_once()
+        (experiments,) = mock_run_experiments.call_args[0]
+        (experiment,) = experiments.values()
+        assert experiment["env"] == VECTOR_ENVIRONMENT
+
+    @mock.patch("ray.init")
+    @mock.patch("ray.tune.run_experiments")
+    def test_train_with_action_mask(self, mock_run_experiments, _):
+        ppo.train(get_train_config(), get_config(get_env_config(), action_mask=True))
+        mock_run_experiments.assert_called_once()
+        (experiments,) = mock_run_experiments.call_args[0]
+        (experiment,) = experiments.values()
+        assert experiment["config"]["model"] == {"custom_model": ACTION_MASK_MODEL}
+        assert experiment["config"]["env_config"].action_mask
 
     def test_get_model(self):
         location = "/tmp/model_location"
@@ -22,3 +38,14 @@ class TestPPO:
         assert saved_model.cls is PPOAgent
         assert saved_model.env is Environment
         assert saved_model.location == location
+
+    @mock.patch("ray.init")
+    @mock.patch("ray.tune.run_experiments")
+    def test_train_shares_plt_store(self, mock_run_experiments, _):
+        ppo.train(get_train_config(), get_config(get_env_config()))
+        (experiments,) = mock_run_experiments.call_args[0]
+        (experiment,) = experiments.values()
+        plt_store = experiment["config"]["env_config"].plt_store
+        assert plt_store
+        # the store is removed once training is done
+        assert not os.path.exists(plt_store)
@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+from blaze.action import ActionSpace, Policy
+from blaze.config.client import get_random_client_environment
+from blaze.config.config import get_config
+from blaze.environment import Environment
+from blaze.model.model import AgentPool, SavedModel
+from blaze.serve.batcher import InferenceBatcher
+
+from tests.mocks.agent import MockAgent, mock_agent_with_action_space
+from tests.mocks.config import get_env_config
+
+
+class TestInferenceBatcher:
+    def setup(self):
+        self.env_config = get_env_config()
+        self.config = get_config(self.env_config, get_random_client_environment())
+        self.action_space = ActionSpace(self.env_config.trainable_push_groups)
+        self.saved_model = SavedModel(mock_agent_with_action_space(self.action_space), Environment, "", {})
+
+    def test_compute_policy(self):
+        batcher = InferenceBatcher(AgentPool(self.saved_model))
+        policy = batcher.compute_policy(self.config)
+        batcher.close()
+        assert isinstance(policy, Policy)
+        assert batcher.num_steps > 0
+
+    def test_batches_concurrent_requests(self):
+        pool = AgentPool(self.saved_model)
+        batcher = InferenceBatcher(pool, window_ms=100)
+        futures = [batcher.submit(self.config) for _ in range(4)]
+        policies = [future.result() for future in futures]
+        batcher.close()
+        assert all(isinstance(policy, Policy) for policy in policies)
+        # all requests arrived within the window, so the first step was batched
+        assert batcher.num_stepped > batcher.num_steps
+        assert batcher.mean_batch_size > 1
+        assert pool.num_agents == 1
+        assert len(pool.idle_agents) == 1
+
+    def test_max_batch_size(self):
+        batcher = InferenceBatcher(AgentPool(self.saved_model), window_ms=100, max_batch_size=2)
+        futures = [batcher.submit(self.config) for _ in range(5)]
+        for future in futures:
+            future.result()
+        batcher.close()
+        assert batcher.mean_batch_size <= 2
+
+    def test_concurrent_callers(self):
+        batcher = InferenceBatcher(AgentPool(self.saved_model), window_ms=20)
+        policies = []
+
+        def request_policy():
+            policies.append(batcher.compute_policy(self.config))
+
+        threads = [threading.Thread(target=request_policy) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        batcher.close()
+        assert len(policies) == 8
+
+    def test_agent_errors_fail_requests(self):
+        batcher = InferenceBatcher(AgentPool(SavedModel(MockAgent, Environment, "", {})))
+        # MockAgent without an action space cannot sample actions
+        with pytest.raises(AttributeError):
+            batcher.compute_policy(self.config)
+        assert batcher.thread.is_alive()
+        batcher.close()
+        assert not batcher.thread.is_alive()
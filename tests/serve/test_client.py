@@ -1,12 +1,16 @@
+import json
+
 import grpc
 import time
+from unittest import mock
 
-from blaze.action import ActionSpace
-from blaze.config import client
+from blaze.action import ActionSpace, Policy
+from blaze.config import client, manifest
 from blaze.environment import Environment
 from blaze.model.model import SavedModel
+from blaze.proto import policy_service_pb2
 from blaze.serve.client import Client
-from blaze.serve.server import Server
+from blaze.serve.server import AsyncServer, Server
 from blaze.serve.policy_service import PolicyService
 
 from tests.mocks.agent import mock_agent_with_action_space
@@ -44,3 +48,67 @@ class TestClient:
             assert len(list(policy.push)) + len(list(policy.preload)) > 0
         finally:
             server.stop()
+
+    def test_get_policy_with_registered_manifest(self):
+        server = AsyncServer(self.serve_config)
+        policy_service = PolicyService(self.saved_model)
+        server.set_policy_service(policy_service)
+        try:
+            server.start()
+            address = "{}:{}".format(self.serve_config.host, self.serve_config.port)
+            channel = grpc.insecure_channel(address)
+            client_stub = Client(channel)
+            digest = client_stub.register_manifest(self.env_config)
+            assert digest in policy_service.manifest_registry
+            policy = client_stub.get_policy(
+                url="https://www.example.com", client_env=client.get_random_client_environment(), manifest=digest
+            )
+            policies = client_stub.get_policies(
+                [("https://www.example.com", client.get_random_client_environment(), digest)] * 2
+            )
+
+            assert isinstance(policy, Policy)
+            assert len(policies) == 2
+            assert policy_service.manifest_cache.stats["misses"] == 1
+        finally:
+            server.stop()
+
+    def test_get_policies(self):
+        server = AsyncServer(self.serve_config)
+        policy_service = PolicyService(self.saved_model)
+        server.set_policy_service(policy_service)
+        client_envs = [client.get_random_client_environment() for _ in range(4)]
+        try:
+            server.start()
+            address = "{}:{}".format(self.serve_config.host, self.serve_config.port)
+            channel = grpc.insecure_channel(address)
+            client_stub = Client(channel)
+            with mock.patch("blaze.config.manifest.dumps", side_effect=manifest.dumps) as serialize:
+                policies = client_stub.get_policies(
+                    ("https://www.example.com", client_env, self.env_config) for client_env in client_envs
+                )
+
+            assert serialize.call_count == 1
+            assert len(policies) == len(client_envs)
+            assert all(isinstance(policy, Policy) for policy in policies)
+        finally:
+            server.stop()
+
+    def test_get_policies_orders_by_request_id(self):
+        client_stub = Client(grpc.insecure_channel("localhost:1"))
+        policies = [
+            {"push": {"https://www.example.com": [{"url": f"https://www.example.com/{i}.js", "type": "SCRIPT"}]}}
+            for i in range(3)
+        ]
+        responses = [
+            policy_service_pb2.Policy(policy=json.dumps(policy), request_id=request_id)
+            for (request_id, policy) in enumerate(policies)
+        ]
+        client_stub.stub = mock.Mock()
+        client_stub.stub.GetPolicies.return_value = reversed(responses)
+        client_env = client.get_random_client_environment()
+        result = client_stub.get_policies([("https://www.example.com", client_env, self.env_config)] * 3)
+
+        requests = list(client_stub.stub.GetPolicies.call_args[0][0])
+        assert [request.request_id for request in requests] == [0, 1, 2]
+        assert [policy.as_dict["push"] for policy in result] == [policy["push"] for policy in policies]
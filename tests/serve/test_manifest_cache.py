@@ -0,0 +1,86 @@
+import pickle
+
+import pytest
+from unittest import mock
+
+from blaze.config import manifest
+from blaze.evaluator.simulator import execution_graph
+from blaze.evaluator.simulator.execution_graph import get_execution_graph
+from blaze.serve.manifest_cache import ManifestCache, get_manifest_digest, get_page_manifest_digest
+
+from tests.mocks.config import get_env_config
+from tests.mocks.serve import get_page
+
+
+class TestGetManifestDigest:
+    def test_digest_depends_on_content(self):
+        data = manifest.dumps(get_env_config())
+        assert get_manifest_digest(data) == get_manifest_digest(bytes(data))
+        assert get_manifest_digest(data) != get_manifest_digest(data + b"\0")
+
+
+class TestGetPageManifestDigest:
+    def test_digest_of_inline_manifest(self):
+        page = get_page("http://example.com")
+        assert get_page_manifest_digest(page) == get_manifest_digest(page.manifest)
+
+    def test_digest_of_referenced_manifest(self):
+        page = get_page("http://example.com")
+        digest = get_manifest_digest(page.manifest)
+        page.manifest_digest = digest
+        assert not page.manifest
+        assert get_page_manifest_digest(page) == digest
+
+
+class TestManifestCache:
+    def setup(self):
+        self.env_config = get_env_config()
+        self.data = manifest.dumps(self.env_config)
+
+    def test_get_decodes_manifest(self):
+        cache = ManifestCache()
+        assert cache.get(self.data) == self.env_config
+        assert len(cache) == 1
+        assert cache.stats == {"size": 1, "hits": 0, "misses": 1}
+
+    def test_get_reuses_env_config_and_graph(self):
+        cache = ManifestCache()
+        env_config = cache.get(self.data)
+        graph = get_execution_graph(env_config)
+        assert cache.get(bytes(self.data)) is env_config
+        assert get_execution_graph(env_config) is graph
+        assert cache.stats == {"size": 1, "hits": 1, "misses": 1}
+
+    def test_get_restores_evicted_graph(self):
+        cache = ManifestCache()
+        env_config = cache.get(self.data)
+        graph = get_execution_graph(env_config)
+        execution_graph._graph_cache.pop(id(env_config))
+        assert cache.get(self.data) is env_config
+        assert get_execution_graph(env_config) is graph
+
+    def test_evicts_least_recently_used(self):
+        cache = ManifestCache(max_size=2)
+        manifests = [manifest.dumps(self.env_config._replace(request_url=f"http://example.com/{i}")) for i in range(3)]
+        first = cache.get(manifests[0])
+        cache.get(manifests[1])
+        cache.get(manifests[0])
+        cache.get(manifests[2])
+        assert len(cache) == 2
+        assert cache.get(manifests[0]) is first
+        assert cache.stats["misses"] == 3
+
+    def test_get_rejects_pickle(self):
+        cache = ManifestCache()
+        with pytest.raises(ValueError):
+            cache.get(pickle.dumps(self.env_config))
+        assert not cache
+
+    def test_get_by_digest_only_loads_misses(self):
+        cache = ManifestCache()
+        load = mock.Mock(return_value=self.data)
+        env_config = cache.get_by_digest(get_manifest_digest(self.data), load)
+        assert env_config == self.env_config
+        assert cache.get_by_digest(get_manifest_digest(self.data), load) is env_config
+        assert cache.get(self.data) is env_config
+        load.assert_called_once()
@@ -0,0 +1,69 @@
+import os
+import tempfile
+
+import pytest
+
+from blaze.config import manifest
+from blaze.serve.manifest_cache import get_manifest_digest
+from blaze.serve.manifest_registry import ManifestRegistry, UnknownManifestError
+
+from tests.mocks.config import get_env_config
+
+
+class TestManifestRegistry:
+    def setup(self):
+        self.env_config = get_env_config()
+        self.data = manifest.dumps(self.env_config)
+
+    def test_register_returns_digest(self):
+        registry = ManifestRegistry()
+        digest = registry.register(self.data)
+        assert digest == get_manifest_digest(self.data)
+        assert digest in registry
+        assert registry.get(digest) == self.data
+        assert len(registry) == 1
+        assert registry.stats == {"size": 1, "hits": 1, "misses": 0}
+
+    def test_get_unknown_digest(self):
+        registry = ManifestRegistry()
+        with pytest.raises(UnknownManifestError):
+            registry.get(get_manifest_digest(self.data))
+        with pytest.raises(KeyError):
+            registry.get("")
+        assert registry.stats["misses"] == 2
+
+    def test_evicts_least_recently_used(self):
+        registry = ManifestRegistry(max_size=2)
+        manifests = [manifest.dumps(self.env_config._replace(request_url=f"http://example.com/{i}")) for i in range(3)]
+        digests = [registry.register(data) for data in manifests]
+        assert len(registry) == 2
+        assert digests[0] not in registry
+        with pytest.raises(UnknownManifestError):
+            registry.get(digests[0])
+        assert registry.get(digests[2]) == manifests[2]
+
+    def test_reads_evicted_manifest_from_disk(self):
+        with tempfile.TemporaryDirectory() as directory:
+            registry = ManifestRegistry(directory, max_size=1)
+            first = registry.register(self.data)
+            registry.register(manifest.dumps(self.env_config._replace(request_url="http://example.com/other")))
+            assert len(registry) == 1
+            assert first in registry
+            assert registry.get(first) == self.data
+            assert registry.stats["misses"] == 1
+
+    def test_keeps_manifests_across_instances(self):
+        with tempfile.TemporaryDirectory() as directory:
+            digest = ManifestRegistry(directory).register(self.data)
+            assert os.listdir(directory) == [f"{digest}.manifest"]
+            assert ManifestRegistry(directory).get(digest) == self.data
+
+    def test_ignores_digests_that_are_not_hex(self):
+        with tempfile.TemporaryDirectory() as directory:
+            registry = ManifestRegistry(os.path.join(directory, "manifests"))
+            with open(os.path.join(directory, "secret.manifest"), "wb") as f:
+                f.write(self.data)
+            assert registry.get_path("../secret") is None
+            assert "../secret" not in registry
+            with pytest.raises(UnknownManifestError):
+                registry.get("../secret")
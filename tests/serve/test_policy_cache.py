@@ -0,0 +1,143 @@
+import threading
+
+import pytest
+
+from blaze.config import manifest
+from blaze.proto import policy_service_pb2
+from blaze.serve.policy_cache import PolicyCache
+
+from tests.mocks.config import get_env_config
+from tests.mocks.serve import get_page
+
+
+class MockClock:
+    def __init__(self):
+        self.time = 0.0
+
+    def __call__(self):
+        return self.time
+
+
+def get_policy(name: str) -> policy_service_pb2.Policy:
+    return policy_service_pb2.Policy(policy=f'{{"name": "{name}"}}')
+
+
+class TestPolicyCache:
+    def setup(self):
+        self.page = get_page("http://example.com")
+        self.clock = MockClock()
+
+    def test_key_quantizes_client_environment(self):
+        cache = PolicyCache(bandwidth_step_kbps=1000, latency_step_ms=10)
+        page = get_page("http://example.com")
+        (page.bandwidth_kbps, page.latency_ms, page.cpu_slowdown) = (12000, 40, 2)
+        key = cache.key(page)
+        (page.bandwidth_kbps, page.latency_ms) = (12200, 42)
+        assert cache.key(page) == key
+        page.latency_ms = 60
+        assert cache.key(page) != key
+        (page.latency_ms, page.cpu_slowdown) = (40, 4)
+        assert cache.key(page) != key
+        page.cpu_slowdown = 2
+        page.manifest = manifest.dumps(get_env_config()._replace(request_url="http://example.com/other"))
+        assert cache.key(page) != key
+
+    def test_get_caches_policy(self):
+        cache = PolicyCache()
+        policy = get_policy("a")
+        assert cache.get(self.page, lambda: policy) is policy
+        assert cache.get(self.page, lambda: get_policy("b")) is policy
+        assert len(cache) == 1
+        assert cache.stats["hits"] == 1
+        assert cache.stats["misses"] == 1
+
+    def test_get_expires_policy(self):
+        cache = PolicyCache(ttl_s=10, clock=self.clock)
+        cache.get(self.page, lambda: get_policy("a"))
+        self.clock.time = 9
+        assert cache.get(self.page, lambda: get_policy("b")).policy == '{"name": "a"}'
+        self.clock.time = 10
+        assert cache.get(self.page, lambda: get_policy("b")).policy == '{"name": "b"}'
+        assert cache.stats["expirations"] == 1
+        assert cache.stats["misses"] == 2
+
+    def test_evicts_least_recently_used(self):
+        cache = PolicyCache(max_size=2)
+        pages = [get_page("http://example.com") for _ in range(3)]
+        for (i, page) in enumerate(pages):
+            page.bandwidth_kbps = 6000 * (i + 1)
+        cache.get(pages[0], lambda: get_policy("0"))
+        cache.get(pages[1], lambda: get_policy("1"))
+        cache.get(pages[0], lambda: get_policy("0"))
+        cache.get(pages[2], lambda: get_policy("2"))
+        assert len(cache) == 2
+        assert cache.stats["evictions"] == 1
+        assert cache.get(pages[0], lambda: get_policy("new")).policy == '{"name": "0"}'
+        assert cache.get(pages[1], lambda: get_policy("new")).policy == '{"name": "new"}'
+
+    def test_errors_are_not_cached(self):
+        cache = PolicyCache()
+
+        def fail():
+            raise ValueError("invalid manifest")
+
+        with pytest.raises(ValueError):
+            cache.get(self.page, fail)
+        assert not cache
+        assert not cache.in_flight
+        assert cache.get(self.page, lambda: get_policy("a")).policy == '{"name": "a"}'
+
+    def test_concurrent_requests_share_computation(self):
+        cache = PolicyCache()
+        (started, release) = (threading.Event(), threading.Event())
+        computations = []
+
+        def compute():
+            computations.append(1)
+            started.set()
+            release.wait()
+            return get_policy("a")
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get(self.page, compute))) for _ in range(4)]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        while cache.stats["shared"] < 3:
+            pass
+        release.set()
+        for thread in threads:
+            thread.join()
+        assert len(computations) == 1
+        assert len(results) == 4
+        assert all(result is results[0] for result in results)
+        assert cache.stats["misses"] == 1
+
+    def test_concurrent_requests_share_errors(self):
+        cache = PolicyCache()
+        (started, release) = (threading.Event(), threading.Event())
+
+        def fail():
+            started.set()
+            release.wait()
+            raise ValueError("invalid manifest")
+
+        errors = []
+
+        def request():
+            try:
+                cache.get(self.page, fail)
+            except ValueError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=request) for _ in range(2)]
+        threads[0].start()
+        started.wait()
+        threads[1].start()
+        while cache.stats["shared"] < 1:
+            pass
+        release.set()
+        for thread in threads:
+            thread.join()
+        assert len(errors) == 2
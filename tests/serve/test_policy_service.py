@@ -1,14 +1,24 @@
 import json
+import pickle
+import tempfile
+
+import grpc
+import pytest
+from unittest import mock
 
 from blaze.action import ActionSpace, Policy
+from blaze.config import manifest
 from blaze.config.client import get_random_client_environment
 from blaze.environment import Environment
 from blaze.model.model import ModelInstance, SavedModel
 from blaze.proto import policy_service_pb2
-from blaze.serve.policy_service import PolicyService
+from blaze.serve.manifest_cache import get_manifest_digest
+from blaze.serve.manifest_registry import ManifestRegistry
+from blaze.serve.policy_service import InvalidPageError, PolicyService
+from blaze.serve.policy_table import PolicyTable
 
 from tests.mocks.agent import MockAgent, mock_agent_with_action_space
-from tests.mocks.config import get_push_groups, convert_push_groups_to_push_pairs
+from tests.mocks.config import get_env_config, get_push_groups, convert_push_groups_to_push_pairs
 from tests.mocks.serve import get_page, MockGRPCServicerContext
 
 
@@ -33,18 +43,125 @@ class TestPolicyService:
         policy = ps.GetPolicy(self.page, MockGRPCServicerContext())
         assert policy
         assert isinstance(policy, policy_service_pb2.Policy)
-        # Temporarily disable caching policies
-        # assert len(ps.policies) == 1
-        # assert ps.policies[self.page.url] is policy
+        assert len(ps.policies) == 1
+
+    def test_get_policy_rejects_pickled_manifest(self):
+        ps = PolicyService(self.saved_model)
+        page = get_page("http://example.com", self.client_environment)
+        page.manifest = pickle.dumps(get_env_config())
+        context = MockGRPCServicerContext()
+        with mock.patch.object(context, "abort") as mock_abort:
+            with pytest.raises(ValueError):
+                ps.GetPolicy(page, context)
+        mock_abort.assert_called_once()
+        assert mock_abort.call_args[0][0] == grpc.StatusCode.INVALID_ARGUMENT
+
+    def test_get_policy_rejects_invalid_client_environment(self):
+        ps = PolicyService(self.saved_model)
+        for (field, value) in (("bandwidth_kbps", 10 ** 9), ("latency_ms", 10 ** 6), ("cpu_slowdown", 7)):
+            page = get_page("http://example.com", self.client_environment)
+            setattr(page, field, value)
+            context = MockGRPCServicerContext()
+            with mock.patch.object(context, "abort") as mock_abort:
+                with pytest.raises(InvalidPageError):
+                    ps.GetPolicy(page, context)
+            assert mock_abort.call_args[0][0] == grpc.StatusCode.INVALID_ARGUMENT
+            assert mock_abort.call_args[0][1].startswith("invalid page")
+        assert not ps.policies
+
+    def test_get_policy_rejects_invalid_client_environment_with_cached_key(self):
+        ps = PolicyService(self.saved_model)
+        page = get_page("http://example.com", self.client_environment)
+        page.latency_ms = 120
+        ps.GetPolicy(page, MockGRPCServicerContext())
+
+        invalid_page = get_page("http://example.com", self.client_environment)
+        invalid_page.latency_ms = 122
+        assert ps.policies.key(invalid_page) == ps.policies.key(page)
+        context = MockGRPCServicerContext()
+        with mock.patch.object(context, "abort") as mock_abort:
+            with pytest.raises(InvalidPageError):
+                ps.GetPolicy(invalid_page, context)
+        assert mock_abort.call_args[0][0] == grpc.StatusCode.INVALID_ARGUMENT
+        assert ps.stats["policies"]["hits"] == 0
 
     def test_get_policy_returns_cached(self):
         ps = PolicyService(self.saved_model)
         first_policy = ps.GetPolicy(self.page, MockGRPCServicerContext())
         second_policy = ps.GetPolicy(self.page, MockGRPCServicerContext())
-        # assert first_policy is second_policy
-        # Temporarily disable caching policies
-        # assert len(ps.policies) == 1
-        # assert ps.policies[self.page.url] is first_policy
+        assert first_policy is second_policy
+        assert len(ps.policies) == 1
+        assert ps.stats["policies"]["hits"] == 1
+        assert ps.stats["policies"]["misses"] == 1
+
+    def test_get_policies(self):
+        ps = PolicyService(self.saved_model)
+        pages = [get_page("http://example.com", self.client_environment) for _ in range(3)]
+        for (request_id, page) in enumerate(pages):
+            page.request_id = request_id
+        policies = list(ps.GetPolicies(iter(pages), MockGRPCServicerContext()))
+        assert [policy.request_id for policy in policies] == [0, 1, 2]
+        assert all(policy.policy == policies[0].policy for policy in policies)
+        # the cached response is not tagged with the request_id of the page that computed it
+        assert ps.create_policy(pages[1]).request_id == 0
+        assert ps.stats["policies"]["hits"] == 3
+
+    def test_get_policies_rejects_pickled_manifest(self):
+        ps = PolicyService(self.saved_model)
+        page = get_page("http://example.com", self.client_environment)
+        page.manifest = pickle.dumps(get_env_config())
+        context = MockGRPCServicerContext()
+        with mock.patch.object(context, "abort") as mock_abort:
+            with pytest.raises(ValueError):
+                list(ps.GetPolicies(iter([self.page, page]), context))
+        mock_abort.assert_called_once()
+        assert mock_abort.call_args[0][0] == grpc.StatusCode.INVALID_ARGUMENT
+
+    def test_register_manifest(self):
+        ps = PolicyService(self.saved_model)
+        request = policy_service_pb2.Manifest(manifest=self.page.manifest)
+        response = ps.RegisterManifest(request, MockGRPCServicerContext())
+        assert isinstance(response, policy_service_pb2.ManifestDigest)
+        assert response.digest == get_manifest_digest(self.page.manifest)
+        assert ps.manifest_registry.get(response.digest) == self.page.manifest
+        assert ps.manifest_cache.stats == {"size": 1, "hits": 0, "misses": 1}
+
+    def test_register_manifest_rejects_pickled_manifest(self):
+        ps = PolicyService(self.saved_model)
+        request = policy_service_pb2.Manifest(manifest=pickle.dumps(get_env_config()))
+        context = MockGRPCServicerContext()
+        with mock.patch.object(context, "abort") as mock_abort:
+            with pytest.raises(ValueError):
+                ps.RegisterManifest(request, context)
+        assert mock_abort.call_args[0][0] == grpc.StatusCode.INVALID_ARGUMENT
+        assert not ps.manifest_registry
+
+    def test_get_policy_with_manifest_digest(self):
+        with tempfile.TemporaryDirectory() as directory:
+            ps = PolicyService(self.saved_model, manifest_registry=ManifestRegistry(directory))
+            digest = ps.RegisterManifest(
+                policy_service_pb2.Manifest(manifest=self.page.manifest), MockGRPCServicerContext()
+            ).digest
+            # a new service must read the manifest from the registry rather than its manifest cache
+            ps = PolicyService(self.saved_model, manifest_registry=ManifestRegistry(directory))
+            page = get_page("http://example.com", self.client_environment)
+            page.manifest_digest = digest
+            policy = ps.GetPolicy(page, MockGRPCServicerContext())
+            assert isinstance(Policy.from_dict(json.loads(policy.policy)), Policy)
+            assert ps.manifest_registry.stats["misses"] == 1
+            # pages that send the same manifest inline share the cached policy
+            assert ps.GetPolicy(self.page, MockGRPCServicerContext()) is policy
+
+    def test_get_policy_with_unknown_manifest_digest(self):
+        ps = PolicyService(self.saved_model)
+        page = get_page("http://example.com", self.client_environment)
+        page.manifest_digest = get_manifest_digest(page.manifest)
+        context = MockGRPCServicerContext()
+        with mock.patch.object(context, "abort") as mock_abort:
+            with pytest.raises(KeyError):
+                ps.GetPolicy(page, context)
+        mock_abort.assert_called_once()
+        assert mock_abort.call_args[0][0] == grpc.StatusCode.NOT_FOUND
 
     def test_create_push_policy(self):
         ps = PolicyService(self.saved_model)
@@ -60,9 +177,54 @@ class TestPolicyService:
 
     def test_create_model_instance(self):
         ps = PolicyService(self.saved_model)
-        model_instance = ps.create_model_instance(self.page)
+        with ps.create_model_instance(self.page) as model_instance:
+            pass
         assert isinstance(model_instance, ModelInstance)
         assert isinstance(model_instance.agent, MockAgent)
         assert model_instance.config.client_env.bandwidth == self.client_environment.bandwidth
         assert model_instance.config.client_env.latency == self.client_environment.latency
         assert model_instance.config.env_config.push_groups == self.push_groups
+
+    def test_create_model_instance_reuses_manifest(self):
+        ps = PolicyService(self.saved_model)
+        with ps.create_model_instance(self.page) as first_instance:
+            pass
+        with ps.create_model_instance(self.page) as second_instance:
+            pass
+        assert first_instance.config.env_config is second_instance.config.env_config
+        assert ps.manifest_cache.stats == {"size": 1, "hits": 1, "misses": 1}
+
+    def test_create_policy_reuses_agent(self):
+        ps = PolicyService(self.saved_model, num_agents=2)
+        ps.create_policy(self.page)
+        with ps.create_model_instance(self.page) as first_instance:
+            with ps.create_model_instance(self.page) as second_instance:
+                assert first_instance.agent is not second_instance.agent
+        assert ps.agent_pool.num_agents == 2
+        with ps.create_model_instance(self.page) as third_instance:
+            assert third_instance.agent in (first_instance.agent, second_instance.agent)
+        assert ps.agent_pool.num_agents == 2
+
+    def test_create_policy_with_batcher(self):
+        ps = PolicyService(self.saved_model, batch_window_ms=1)
+        policy = ps.create_policy(self.page)
+        ps.batcher.close()
+        assert isinstance(policy, policy_service_pb2.Policy)
+        assert isinstance(Policy.from_dict(json.loads(policy.policy)), Policy)
+        assert ps.batcher.num_steps > 0
+
+    def test_create_policy_from_policy_table(self):
+        with tempfile.NamedTemporaryFile(suffix=".db") as table_file:
+            table = PolicyTable(table_file.name)
+            table.put(get_manifest_digest(self.page.manifest), self.client_environment, '{"push": {}}')
+            ps = PolicyService(self.saved_model, policy_table=table)
+            policy = ps.create_policy(self.page)
+            assert policy.policy == '{"push": {}}'
+            assert ps.agent_pool.num_agents == 0
+
+            page = get_page("http://example.com", self.client_environment)
+            page.manifest = manifest.dumps(get_env_config()._replace(request_url="http://example.com/other"))
+            ps.create_policy(page)
+            assert ps.agent_pool.num_agents == 1
+            assert table.stats == {"hits": 1, "misses": 1}
+            table.close()
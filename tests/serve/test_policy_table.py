@@ -0,0 +1,69 @@
+import tempfile
+
+from blaze.config import client
+from blaze.config.client import get_client_environment_grid
+from blaze.serve.policy_table import PolicyBucket, PolicyTable, get_bucket_distance
+
+
+class TestGetBucketDistance:
+    def test_distance(self):
+        bucket = PolicyBucket(bandwidth=12000, latency=20, cpu_slowdown=1, policy="{}")
+        assert get_bucket_distance(bucket, 12000, 20) == 0
+        assert get_bucket_distance(bucket, 13000, 20) < get_bucket_distance(bucket, 24000, 20)
+        assert get_bucket_distance(bucket, 12000, 22) < get_bucket_distance(bucket, 12000, 40)
+
+
+class TestPolicyTable:
+    def setup(self):
+        self.tmp_file = tempfile.NamedTemporaryFile(suffix=".db")
+        self.table = PolicyTable(self.tmp_file.name)
+        self.grid = get_client_environment_grid()
+        for (i, client_env) in enumerate(self.grid):
+            self.table.put("digest", client_env, f'{{"bucket": {i}}}')
+
+    def teardown(self):
+        self.table.close()
+        self.tmp_file.close()
+
+    def test_put(self):
+        assert len(self.table) == len(self.grid)
+        client_env = self.grid[0]
+        self.table.put("digest", client_env, "{}")
+        assert len(self.table) == len(self.grid)
+        assert self.table.lookup("digest", client_env.bandwidth, client_env.latency, client_env.cpu_slowdown) == "{}"
+
+    def test_lookup_exact_bucket(self):
+        for (i, client_env) in enumerate(self.grid):
+            policy = self.table.lookup("digest", client_env.bandwidth, client_env.latency, client_env.cpu_slowdown)
+            assert policy == f'{{"bucket": {i}}}'
+        assert self.table.stats == {"hits": len(self.grid), "misses": 0}
+
+    def test_lookup_nearest_bucket(self):
+        slow_umts = client.ClientEnvironment(
+            network_type=client.NetworkType.UMTS,
+            network_speed=client.NetworkSpeed.SLOW,
+            device_speed=client.DeviceSpeed.SLOW_MOBILE,
+            bandwidth=2000,
+            latency=110,
+            cpu_slowdown=4,
+        )
+        i = next(
+            i
+            for (i, env) in enumerate(self.grid)
+            if (env.network_type, env.network_speed, env.device_speed)
+            == (slow_umts.network_type, slow_umts.network_speed, slow_umts.device_speed)
+        )
+        policy = self.table.lookup("digest", slow_umts.bandwidth, slow_umts.latency, slow_umts.cpu_slowdown)
+        assert policy == f'{{"bucket": {i}}}'
+
+    def test_lookup_misses(self):
+        assert self.table.lookup("other_digest", 12000, 20, 1) is None
+        assert self.table.lookup("digest", 12000, 20, 3) is None
+        assert self.table.stats == {"hits": 0, "misses": 2}
+
+    def test_persists(self):
+        other_table = PolicyTable(self.tmp_file.name)
+        client_env = self.grid[-1]
+        policy = other_table.lookup("digest", client_env.bandwidth, client_env.latency, client_env.cpu_slowdown)
+        assert policy == f'{{"bucket": {len(self.grid) - 1}}}'
+        other_table.close()
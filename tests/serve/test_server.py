@@ -1,4 +1,7 @@
+import pickle
+
 import grpc
+import pytest
 from unittest import mock
 
 from blaze.action import ActionSpace
@@ -6,11 +9,11 @@ from blaze.environment import Environment
 from blaze.model.model import SavedModel
 from blaze.proto import policy_service_pb2
 from blaze.proto import policy_service_pb2_grpc
-from blaze.serve.server import Server
+from blaze.serve.server import AsyncServer, Server
 from blaze.serve.policy_service import PolicyService
 
 from tests.mocks.agent import mock_agent_with_action_space
-from tests.mocks.config import get_push_groups, get_serve_config, convert_push_groups_to_push_pairs
+from tests.mocks.config import get_env_config, get_push_groups, get_serve_config, convert_push_groups_to_push_pairs
 from tests.mocks.serve import get_page
 
 
@@ -68,3 +71,107 @@ class TestServer:
             assert isinstance(policy, policy_service_pb2.Policy)
         finally:
             server.stop()
+
+
+class TestAsyncServer:
+    def setup(self):
+        self.push_groups = get_push_groups()
+        self.trainable_push_groups = [group for group in self.push_groups if group.trainable]
+        self.serve_config = get_serve_config()
+        self.action_space = ActionSpace(self.trainable_push_groups)
+        self.mock_agent = mock_agent_with_action_space(self.action_space)
+        self.saved_model = SavedModel(self.mock_agent, Environment, "/tmp/model_location", {})
+
+    def test_init(self):
+        server = AsyncServer(self.serve_config)
+        try:
+            assert server.config is self.serve_config
+            assert not server.server_started
+            assert server.thread.is_alive()
+        finally:
+            server.stop()
+        assert not server.thread.is_alive()
+
+    def test_server_serves_policy(self):
+        server = AsyncServer(self.serve_config)
+        server.set_policy_service(PolicyService(self.saved_model))
+        try:
+            server.start()
+            assert server.server_started
+            address = "{}:{}".format(self.serve_config.host, self.serve_config.port)
+            with grpc.insecure_channel(address) as channel:
+                stub = policy_service_pb2_grpc.PolicyServiceStub(channel)
+                policy = stub.GetPolicy(get_page("https://example.com"))
+            assert policy
+            assert isinstance(policy, policy_service_pb2.Policy)
+        finally:
+            server.stop()
+
+    def test_server_streams_policies(self):
+        server = AsyncServer(self.serve_config)
+        server.set_policy_service(PolicyService(self.saved_model))
+        pages = [get_page("https://example.com/{}".format(i)) for i in range(8)]
+        for (request_id, page) in enumerate(pages):
+            page.request_id = request_id
+        try:
+            server.start()
+            address = "{}:{}".format(self.serve_config.host, self.serve_config.port)
+            with grpc.insecure_channel(address) as channel:
+                stub = policy_service_pb2_grpc.PolicyServiceStub(channel)
+                policies = list(stub.GetPolicies(iter(pages)))
+            assert sorted(policy.request_id for policy in policies) == list(range(len(pages)))
+            assert all(isinstance(policy, policy_service_pb2.Policy) for policy in policies)
+        finally:
+            server.stop()
+
+    def test_server_rejects_pickled_manifest(self):
+        server = AsyncServer(self.serve_config)
+        server.set_policy_service(PolicyService(self.saved_model))
+        page = get_page("https://example.com")
+        page.manifest = pickle.dumps(get_env_config())
+        try:
+            server.start()
+            address = "{}:{}".format(self.serve_config.host, self.serve_config.port)
+            with grpc.insecure_channel(address) as channel:
+                stub = policy_service_pb2_grpc.PolicyServiceStub(channel)
+                with pytest.raises(grpc.RpcError) as error:
+                    list(stub.GetPolicies(iter([page])))
+            assert error.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+        finally:
+            server.stop()
+
+    def test_server_rejects_out_of_range_page(self):
+        server = AsyncServer(self.serve_config)
+        server.set_policy_service(PolicyService(self.saved_model))
+        (out_of_range, unknown_slowdown) = (get_page("https://example.com"), get_page("https://example.com"))
+        out_of_range.bandwidth_kbps = 10 ** 9
+        unknown_slowdown.cpu_slowdown = 7
+        try:
+            server.start()
+            address = "{}:{}".format(self.serve_config.host, self.serve_config.port)
+            with grpc.insecure_channel(address) as channel:
+                stub = policy_service_pb2_grpc.PolicyServiceStub(channel)
+                with pytest.raises(grpc.RpcError) as error:
+                    stub.GetPolicy(out_of_range, timeout=10)
+                assert error.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+                with pytest.raises(grpc.RpcError) as error:
+                    list(stub.GetPolicies(iter([unknown_slowdown]), timeout=10))
+                assert error.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+        finally:
+            server.stop()
+
+    def test_server_fails_rpc_on_stop_iteration(self):
+        server = AsyncServer(self.serve_config)
+        server.set_policy_service(PolicyService(self.saved_model))
+        try:
+            server.start()
+            address = "{}:{}".format(self.serve_config.host, self.serve_config.port)
+            with mock.patch.object(PolicyService, "create_policy", side_effect=StopIteration):
+                with grpc.insecure_channel(address) as channel:
+                    stub = policy_service_pb2_grpc.PolicyServiceStub(channel)
+                    with pytest.raises(grpc.RpcError) as error:
+                        stub.GetPolicy(get_page("https://example.com"), timeout=10)
+            # the RPC fails instead of waiting for a future that never completes
+            assert error.value.code() == grpc.StatusCode.UNKNOWN
+        finally:
+            server.stop()